@@ -0,0 +1,135 @@
+"""convert course and assignment dates to date types
+
+Revision ID: 2f9a9fe9b15b
+Revises: d69a76fea207
+Create Date: 2026-10-17 01:33:31.043419
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from datetime import date, datetime, time, timezone
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2f9a9fe9b15b'
+down_revision: Union[str, None] = 'd69a76fea207'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+BATCH_SIZE = 1000
+
+# Unparsed dates listed in the error, at most
+MAX_REPORTED = 100
+
+# Formats tried, in order, for dates entered as free text before the columns were typed.
+# Ambiguous numeric dates are read day first (01/02/2024 is 1 February); month first is only
+# tried when that fails (12/25/2024 is 25 December).
+DATE_FORMATS = ("%Y-%m-%d", "%Y/%m/%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%m/%d/%Y", "%m-%d-%Y", "%m.%d.%Y",
+                "%d %B %Y", "%d %b %Y", "%B %d, %Y", "%b %d, %Y", "%B %d %Y", "%b %d %Y")
+DATETIME_FORMATS = ("%Y-%m-%d %H:%M", "%Y/%m/%d %H:%M", "%d/%m/%Y %H:%M", "%d-%m-%Y %H:%M", "%d.%m.%Y %H:%M",
+                    "%m/%d/%Y %H:%M", "%m-%d-%Y %H:%M", "%m.%d.%Y %H:%M")
+
+
+def parse_date(text):
+    text = text.strip()
+    try:
+        return datetime.fromisoformat(text).date()
+    except ValueError:
+        pass
+    for date_format in DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).date()
+        except ValueError:
+            pass
+    return None
+
+
+# A due date without a time is due at the end of that day; times without a zone are UTC.
+def parse_due(text):
+    text = text.strip()
+    due = None
+    try:
+        due = datetime.fromisoformat(text)
+    except ValueError:
+        for datetime_format in DATETIME_FORMATS:
+            try:
+                due = datetime.strptime(text, datetime_format)
+                break
+            except ValueError:
+                pass
+    if due is not None and len(text) == 10:
+        due = datetime.combine(due.date(), time.max)
+    if due is None:
+        day = parse_date(text)
+        if day is None:
+            return None
+        due = datetime.combine(day, time.max)
+    return due if due.tzinfo is not None else due.replace(tzinfo=timezone.utc)
+
+
+# Fill the typed columns from the text ones in primary key order, BATCH_SIZE rows at a time.
+# columns: text column -> parser. Blank text becomes null; returns the values that couldn't be parsed.
+def backfill(table, key, columns):
+    connection = op.get_bind()
+    last_key, unparsed = 0, []
+    while True:
+        rows = connection.execute(
+            sa.text(f"SELECT {key}, {', '.join(columns)} FROM {table} WHERE {key} > :last_key ORDER BY {key} LIMIT :batch_size"),
+            {"last_key": last_key, "batch_size": BATCH_SIZE},
+        ).fetchall()
+        if not rows:
+            break
+
+        values = []
+        for row in rows:
+            parsed = {column: parse(text) if text.strip() else None for (column, parse), text in zip(columns.items(), row[1:])}
+            unparsed += [
+                f"{table} {key}={row[0]} {column}: {text!r}"
+                for (column, value), text in zip(parsed.items(), row[1:]) if value is None and text.strip()
+            ]
+            values.append({"key": row[0], **parsed})
+        connection.execute(
+            sa.text(f"UPDATE {table} SET {', '.join(f'{column}_typed = :{column}' for column in columns)} WHERE {key} = :key"),
+            values,
+        )
+        last_key = rows[-1][0]
+
+    return unparsed
+
+
+# Replace each text column by its typed copy.
+def swap(table, columns):
+    for column in columns:
+        op.drop_column(table, column)
+        op.alter_column(table, f"{column}_typed", new_column_name=column)
+
+
+def upgrade() -> None:
+    op.add_column('courses', sa.Column('start_date_typed', sa.Date(), nullable=True))
+    op.add_column('courses', sa.Column('end_date_typed', sa.Date(), nullable=True))
+    op.add_column('assignments', sa.Column('due_date_typed', sa.TIMESTAMP(timezone=True), nullable=True))
+
+    unparsed = backfill('courses', 'course_id', {"start_date": parse_date, "end_date": parse_date})
+    unparsed += backfill('assignments', 'assignment_id', {"due_date": parse_due})
+    # Stop before the text columns are dropped (the migration's transaction is rolled back), so no date
+    # is lost; the listed values must be corrected by hand before running the upgrade again.
+    if unparsed:
+        listed = "\n".join(unparsed[:MAX_REPORTED])
+        more = f"\n... and {len(unparsed) - MAX_REPORTED} more" if len(unparsed) > MAX_REPORTED else ""
+        raise RuntimeError(f"Dates that can't be parsed; correct them and upgrade again:\n{listed}{more}")
+
+    swap('courses', ['start_date', 'end_date'])
+    swap('assignments', ['due_date'])
+    op.create_index('ix_courses_end_date_start_date', 'courses', ['end_date', 'start_date'], unique=False)
+    op.create_index('ix_assignments_due_date', 'assignments', ['due_date'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_assignments_due_date', table_name='assignments')
+    op.drop_index('ix_courses_end_date_start_date', table_name='courses')
+    for table, column in (('courses', 'start_date'), ('courses', 'end_date'), ('assignments', 'due_date')):
+        op.alter_column(table, column, type_=sa.String(), nullable=False,
+                        postgresql_using=f"coalesce({column}::text, '')")
@@ -0,0 +1,36 @@
+import hashlib
+import math
+
+
+# Fixed-size Bloom filter over strings.
+# might_contain() never misses a key that was added; it wrongly answers True for roughly
+# error_rate of other keys while fewer than capacity keys have been added.
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        # Standard sizing: m = -n ln(p) / ln(2)^2 bits and k = (m / n) ln(2) hash functions
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.count = 0
+        self._bits = bytearray((self.size + 7) // 8)
+
+    # Bit positions for a key, from one 128-bit digest split into two halves (double hashing)
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hash_count)]
+
+    def add(self, key):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def might_contain(self, key):
+        bits = self._bits
+        return all(bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def clear(self):
+        self._bits = bytearray(len(self._bits))
+        self.count = 0
@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import OrderedDict, defaultdict
+
+
+# In-process LRU cache with per-entry expiry and tag-based invalidation.
+# Entries are evicted least-recently-used first once max_entries is reached.
+# Tags let one write invalidate every entry derived from the same row (e.g. "user:alice").
+# If sizeof is given (value -> bytes), the memory held by cached values is tracked too.
+class TTLCache:
+    def __init__(self, name, max_entries, ttl, sizeof=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.sizeof = sizeof
+        self._entries = OrderedDict()  # key -> (expires_at, value, tags)
+        self._keys_by_tag = defaultdict(set)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.memory_bytes = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            expires_at, value, tags = entry
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            # Mark the entry as most recently used
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None, tags=()):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tuple(tags))
+            if self.sizeof is not None:
+                self.memory_bytes += self.sizeof(value)
+            for tag in tags:
+                self._keys_by_tag[tag].add(key)
+
+            # Drop least recently used entries once over capacity
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def invalidate_tag(self, tag):
+        with self._lock:
+            for key in list(self._keys_by_tag.get(tag, ())):
+                self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_tag.clear()
+            self.memory_bytes = 0
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "name": self.name,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "memory_bytes": self.memory_bytes if self.sizeof is not None else None,
+        }
+
+    # Remove an entry and its tag references; the caller holds the lock.
+    def _remove(self, key):
+        _, value, tags = self._entries.pop(key)
+        if self.sizeof is not None:
+            self.memory_bytes -= self.sizeof(value)
+        for tag in tags:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
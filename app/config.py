@@ -10,8 +10,85 @@ class AppSettings(BaseSettings):
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
 
+    # Lifetime of a refresh token; each use rotates it and starts a new lifetime
+    REFRESH_TOKEN_EXPIRE_DAYS: int = 30
+
+    # In-memory Bloom filter of revoked access tokens, rebuilt from the database at startup.
+    # Past CAPACITY revoked (unexpired) tokens the false positive rate, and with it the
+    # number of fallback database lookups, starts to climb.
+    REVOKED_TOKEN_BLOOM_CAPACITY: int = 1_000_000
+    REVOKED_TOKEN_BLOOM_ERROR_RATE: float = 0.01
+
+    # Use the asyncpg driver with AsyncSession (True) or the blocking psycopg2
+    # Session run in the threadpool (False)
+    DATABASE_ASYNC: bool = True
+
+    # Connection pool sizing, applied to whichever engine is in use.
+    # Keep (POOL_SIZE + MAX_OVERFLOW) * workers below Postgres max_connections.
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_RECYCLE: int = 1800  # seconds, -1 disables recycling
+    DATABASE_POOL_PRE_PING: bool = False
+    DATABASE_POOL_TIMEOUT: int = 30  # seconds to wait for a free connection
+
+    # Size of the anyio threadpool used for sync dependencies and run_in_threadpool calls
+    THREADPOOL_LIMIT: int = 40
+
+    # Password hashing runs in its own process pool; requests beyond MAX_PENDING get a 429
+    PASSWORD_HASH_WORKERS: int = 2
+    PASSWORD_HASH_MAX_PENDING: int = 64
+    BCRYPT_ROUNDS: int = 12  # changing this rehashes each user's password at their next login
+
+    # Bulk provisioning hashes on its own pool of BULK_HASH_WORKERS processes (0 = one per core).
+    # Its hashes use BCRYPT_ROUNDS unless BULK_BCRYPT_ROUNDS opts in to a lower cost, for faster
+    # imports; such hashes are upgraded to BCRYPT_ROUNDS at each user's first login.
+    BULK_BCRYPT_ROUNDS: int | None = None
+    BULK_HASH_WORKERS: int = 0
+    BULK_PROVISION_MAX_ROWS: int = 100_000
+
+    # Cache of decoded access tokens -> authenticated principal, per worker
+    PRINCIPAL_CACHE_SIZE: int = 10000
+    PRINCIPAL_CACHE_TTL: int = 60  # seconds a user change can take to be seen
+
+    # max-age sent with public catalog responses (courses, lessons); clients and proxies
+    # revalidate with If-None-Match afterwards and get a 304 if nothing changed
+    HTTP_CACHE_MAX_AGE: int = 5
+
+    # Server-side cache of serialized responses for the public catalog endpoints.
+    # In-process LRU by default; set RESPONSE_CACHE_URL (redis://...) to share one cache
+    # between workers, which needs the optional "redis" package.
+    RESPONSE_CACHE_SIZE: int = 5000
+    RESPONSE_CACHE_TTL: int = 30  # seconds, bounds staleness if an invalidation is missed
+    RESPONSE_CACHE_URL: str | None = None
+
+    # In-process caches are kept coherent across workers by a LISTEN/NOTIFY bus. While its
+    # connection is down, cache entries live at most FALLBACK_TTL seconds.
+    CACHE_INVALIDATION_FALLBACK_TTL: int = 5
+    CACHE_INVALIDATION_RETRY_SECONDS: int = 5
+
+    # Background jobs (python -m app.jobs). Each worker process runs up to WORKER_CONCURRENCY jobs and
+    # polls for new ones every POLL_SECONDS. A running job whose heartbeat is older than STALE_SECONDS
+    # (its worker died) is requeued, at most MAX_ATTEMPTS times in all. Each user may have at most
+    # MAX_PENDING_PER_USER jobs queued or running.
+    JOB_WORKER_CONCURRENCY: int = 2
+    JOB_POLL_SECONDS: float = 1.0
+    JOB_HEARTBEAT_SECONDS: int = 10
+    JOB_STALE_SECONDS: int = 60
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_MAX_PENDING_PER_USER: int = 10
+
+    # Matches of each type (course, lesson, assignment) ranked per search. A very common term can
+    # match most rows; the results are then the best of the first MAX_CANDIDATES matches, which
+    # keeps the cost of a search bounded.
+    SEARCH_MAX_CANDIDATES: int = 10_000
+
+    # Rows fetched from the server-side cursor per chunk of a streaming export
+    EXPORT_BATCH_SIZE: int = 1000
+
+    # Add an X-DB-Statement-Count header to every response (debugging/N+1 checks)
+    DATABASE_STATEMENT_COUNT_HEADER: bool = False
+
     class Config:
         env_file = ".env"  # Specify the path to your .env file
 
 app_settings = AppSettings()
-
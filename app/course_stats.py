@@ -0,0 +1,109 @@
+import asyncio
+import sys
+
+from sqlalchemy import bindparam, func, select, tuple_, update
+
+from . import models
+from .database import async_engine, session_scope
+from .response_cache import response_cache
+
+# Counters shown with each course (CourseResponseData): its enrollments, lessons and assignments.
+# The write routes keep them in step, updating the course row in the same transaction as the row
+# they add or delete. Rows deleted outside the API (or by a cascade, e.g. deleting a user) make them
+# drift; reconcile() recounts them from the tables and repairs them. Run it as a background job
+# (kind reconcile_course_stats) or from the command line:
+#     python -m app.course_stats            (add --check to report drift without repairing it)
+
+# Courses recounted per transaction; their rows stay locked until the batch commits
+RECONCILE_BATCH_COURSES = 500
+
+# Drifted courses listed in the report (all of them are counted and repaired)
+RECONCILE_MAX_REPORTED = 1000
+
+# Counter column -> foreign key of the rows it counts
+COUNTERS = {
+    "seats_taken": models.Enrollment.course_fkey,
+    "lesson_count": models.Lesson.course_fkey,
+    "assignment_count": models.Assignment.course_fkey,
+}
+
+
+# Recount every course's counters, in course ID order, and repair the ones that drifted (unless repair
+# is False). report(progress, result), if given, is called after each batch with the courses checked so far.
+async def reconcile(db, repair=True, report=None):
+    stored = [getattr(models.Course, name) for name in COUNTERS]
+    actual = [select(func.count()).where(course_fkey == models.Course.course_id).scalar_subquery().label(f"actual_{name}")
+              for name, course_fkey in COUNTERS.items()]
+    repair_counters = (
+        update(models.Course.__table__)
+        .where(models.Course.course_id == bindparam("b_course_id"))
+        .values({name: bindparam(f"b_{name}") for name in COUNTERS})
+    )
+
+    summary = {"checked": 0, "drifted": 0, "repaired": 0, "courses": []}
+    last_id = 0
+    while True:
+        # Lock the batch before counting. A write route updates the counter after inserting or deleting
+        # its row, so it waits here until the batch commits, and the counts below see either both of its
+        # changes or neither. FOR NO KEY UPDATE doesn't block inserting rows that reference the courses.
+        course_ids = (await db.scalars(
+            select(models.Course.course_id)
+            .where(models.Course.course_id > last_id)
+            .order_by(models.Course.course_id)
+            .limit(RECONCILE_BATCH_COURSES)
+            .with_for_update(key_share=True)
+        )).all()
+        if not course_ids:
+            break
+
+        # Recount the batch through the course_fkey indexes, keeping the courses whose counters are off
+        drifted = (await db.execute(
+            select(models.Course.course_id, *stored, *actual)
+            .where(models.Course.course_id.between(course_ids[0], course_ids[-1]))
+            .where(tuple_(*stored) != tuple_(*actual))
+        )).all()
+
+        for row in drifted:
+            if len(summary["courses"]) < RECONCILE_MAX_REPORTED:
+                summary["courses"].append({
+                    "course_id": row.course_id,
+                    **{name: {"stored": row[1 + i], "actual": row[1 + len(COUNTERS) + i]}
+                       for i, name in enumerate(COUNTERS) if row[1 + i] != row[1 + len(COUNTERS) + i]},
+                })
+        summary["drifted"] += len(drifted)
+
+        # Repair the drifted counters, and drop the cached responses showing them
+        if repair and drifted:
+            await db.execute(repair_counters, [
+                {"b_course_id": row.course_id, **{f"b_{name}": row[1 + len(COUNTERS) + i] for i, name in enumerate(COUNTERS)}}
+                for row in drifted
+            ])
+            await response_cache.commit_and_invalidate(db, *(f"course:{row.course_id}" for row in drifted))
+            summary["repaired"] += len(drifted)
+        else:
+            await db.commit()
+
+        summary["checked"] += len(course_ids)
+        last_id = course_ids[-1]
+        if report is not None:
+            await report(summary["checked"], summary)
+    return summary
+
+
+async def _reconcile(repair):
+    try:
+        async with session_scope() as db:
+            return await reconcile(db, repair=repair)
+    finally:
+        if async_engine is not None:
+            await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] not in ([], ["--check"]):
+        sys.exit("usage: python -m app.course_stats [--check]")
+    summary = asyncio.run(_reconcile(repair=sys.argv[1:] != ["--check"]))
+    for course in summary["courses"]:
+        print(f"Course {course['course_id']}: " + ", ".join(
+            f"{name} {counts['stored']} -> {counts['actual']}" for name, counts in course.items() if name != "course_id"))
+    print(f"Checked {summary['checked']} courses, {summary['drifted']} drifted, {summary['repaired']} repaired")
@@ -1,6 +1,13 @@
-from sqlalchemy import create_engine
+import asyncio
+import time as timer
+from contextlib import asynccontextmanager, nullcontext
+from contextvars import ContextVar
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+from starlette.concurrency import run_in_threadpool
 import psycopg2
 from psycopg2.extras import RealDictCursor
 from datetime import time
@@ -9,25 +16,186 @@ from .config import app_settings
 # Define the database URL using app_settings for database configuration
 SQLALCHEMY_DATABASE_URL = f"postgresql://{app_settings.DATABASE_USERNAME}:{app_settings.DATABASE_PASSWORD}@{app_settings.DATABASE_HOSTNAME}/{app_settings.DATABASE_NAME}"
 
+# Same database, reached through the asyncpg driver
+SQLALCHEMY_ASYNC_DATABASE_URL = f"postgresql+asyncpg://{app_settings.DATABASE_USERNAME}:{app_settings.DATABASE_PASSWORD}@{app_settings.DATABASE_HOSTNAME}/{app_settings.DATABASE_NAME}"
+
+
+# Running totals of how long checkouts waited for a pooled connection.
+class PoolWaitStats:
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited, timed_out=False):
+        self.checkouts += 1
+        self.total_wait += waited
+        self.max_wait = max(self.max_wait, waited)
+        if timed_out:
+            self.timeouts += 1
+
+
+# QueuePool that records the time spent waiting for a connection on every checkout.
+class TimedQueuePool(QueuePool):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def _do_get(self):
+        started = timer.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            self.wait_stats.record(timer.perf_counter() - started, timed_out=True)
+            raise
+        self.wait_stats.record(timer.perf_counter() - started)
+        return connection
+
+
+# Same as TimedQueuePool, for engines created with create_async_engine().
+class TimedAsyncAdaptedQueuePool(AsyncAdaptedQueuePool, TimedQueuePool):
+    pass
+
+
+# Pool options shared by the sync and async engines
+POOL_OPTIONS = dict(
+    pool_size=app_settings.DATABASE_POOL_SIZE,
+    max_overflow=app_settings.DATABASE_MAX_OVERFLOW,
+    pool_recycle=app_settings.DATABASE_POOL_RECYCLE,
+    pool_pre_ping=app_settings.DATABASE_POOL_PRE_PING,
+    pool_timeout=app_settings.DATABASE_POOL_TIMEOUT,
+)
+
 # Create a database engine using SQLAlchemy
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_engine(SQLALCHEMY_DATABASE_URL, poolclass=TimedQueuePool, **POOL_OPTIONS)
+
+# Create a session maker with specific settings for database sessions.
+# Objects stay loaded after commit so responses can be built without another round-trip.
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# Create the async engine and session maker only when the async path is selected,
+# so the sync path doesn't require asyncpg to be installed
+if app_settings.DATABASE_ASYNC:
+    async_engine = create_async_engine(SQLALCHEMY_ASYNC_DATABASE_URL, poolclass=TimedAsyncAdaptedQueuePool, **POOL_OPTIONS)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+else:
+    async_engine = None
+    AsyncSessionLocal = None
+
+# The engine that serves requests, as selected by DATABASE_ASYNC
+active_engine = async_engine.sync_engine if app_settings.DATABASE_ASYNC else engine
+
+# Per-request SQL statement counter, a one-item list set by the statement count middleware
+statement_counter = ContextVar("statement_counter", default=None)
 
-# Create a session maker with specific settings for database sessions
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Count every statement sent to the database while a counter is active
+@event.listens_for(active_engine, "before_cursor_execute")
+def count_statement(conn, cursor, statement, parameters, context, executemany):
+    counter = statement_counter.get()
+    if counter is not None:
+        counter[0] += 1
 
 # Define the base class for SQLAlchemy models
 Base = declarative_base()
 
+
+# Wrap a blocking Session in the subset of the AsyncSession API used by the routers.
+# Every call that can touch the database runs in Starlette's threadpool.
+class SyncSessionAdapter:
+    def __init__(self, sync_session):
+        self.sync_session = sync_session
+
+    def add(self, instance):
+        self.sync_session.add(instance)
+
+    def add_all(self, instances):
+        self.sync_session.add_all(instances)
+
+    async def execute(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs)
+
+    async def scalar(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalar, statement, *args, **kwargs)
+
+    async def scalars(self, statement, *args, **kwargs):
+        return await run_in_threadpool(self.sync_session.scalars, statement, *args, **kwargs)
+
+    async def get(self, entity, ident, **kwargs):
+        return await run_in_threadpool(self.sync_session.get, entity, ident, **kwargs)
+
+    # Like AsyncSession.stream(): rows come from a server-side cursor instead of being buffered
+    async def stream(self, statement, *args, **kwargs):
+        statement = statement.execution_options(stream_results=True)
+        return SyncResultAdapter(await run_in_threadpool(self.sync_session.execute, statement, *args, **kwargs))
+
+    async def delete(self, instance):
+        await run_in_threadpool(self.sync_session.delete, instance)
+
+    async def flush(self):
+        await run_in_threadpool(self.sync_session.flush)
+
+    async def refresh(self, instance, attribute_names=None):
+        await run_in_threadpool(self.sync_session.refresh, instance, attribute_names)
+
+    async def commit(self):
+        await run_in_threadpool(self.sync_session.commit)
+
+    async def rollback(self):
+        await run_in_threadpool(self.sync_session.rollback)
+
+    async def close(self):
+        await run_in_threadpool(self.sync_session.close)
+
+
+# Wrap a streaming Result in the subset of the AsyncResult API used by the routers.
+class SyncResultAdapter:
+    def __init__(self, result):
+        self.result = result
+
+    # Yield lists of rows, fetching each one from the server-side cursor in the threadpool
+    async def partitions(self, size=None):
+        batches = self.result.partitions(size)
+        while True:
+            rows = await run_in_threadpool(next, batches, None)
+            if rows is None:
+                break
+            yield rows
+
+    async def close(self):
+        await run_in_threadpool(self.result.close)
+
+
+# Sync sessions hold a pooled connection across several threadpool calls. Requests wait here,
+# on the event loop, for a free connection slot rather than blocking a thread inside the pool;
+# otherwise threads blocked on a checkout can starve the requests that hold connections.
+# With unlimited overflow (DATABASE_MAX_OVERFLOW=-1) a checkout never waits, so nothing needs to queue.
+if app_settings.DATABASE_MAX_OVERFLOW < 0:
+    sync_session_slots = nullcontext()
+else:
+    sync_session_slots = asyncio.Semaphore(app_settings.DATABASE_POOL_SIZE + app_settings.DATABASE_MAX_OVERFLOW)
+
+
 # Dependency function to get a database session
-def get_db():
-    # Create a new database session
-    db = SessionLocal()
-    try:
-        # Yield the session for use in a route or function
-        yield db
-    finally:
-        # Close the session when it's no longer needed
-        db.close()
+async def get_db():
+    if app_settings.DATABASE_ASYNC:
+        # Create a new async database session and close it when the request is done
+        async with AsyncSessionLocal() as db:
+            yield db
+    else:
+        async with sync_session_slots:
+            # Create a new blocking database session behind the async interface
+            db = SyncSessionAdapter(SessionLocal())
+            try:
+                # Yield the session for use in a route or function
+                yield db
+            finally:
+                # Close the session when it's no longer needed
+                await db.close()
+
+# The same session as a context manager, for code that runs outside a request (e.g. startup hooks)
+session_scope = asynccontextmanager(get_db)
 
 # Establish a connection to a PostgreSQL database using psycopg2
 # while True:
@@ -42,4 +210,3 @@ def get_db():
 #         # If the connection fails, print an error message and retry after a delay
 #         print("Connection to online-classroom-api database failed❌")
 #         time.sleep(2)
-
@@ -0,0 +1,43 @@
+import hashlib
+
+from fastapi import Request, Response, status
+
+from .config import app_settings
+
+# Cache-Control for responses anyone may see: shared caches (a proxy/CDN) can serve them for
+# HTTP_CACHE_MAX_AGE seconds and then revalidate with If-None-Match.
+PUBLIC = f"public, max-age={app_settings.HTTP_CACHE_MAX_AGE}"
+
+# Cache-Control for responses that need a bearer token: only the client may keep a copy,
+# and it must revalidate before reusing it.
+PRIVATE = "private, no-cache"
+
+
+# Strong ETag for a representation, derived from the versions of the rows it is built from
+# (e.g. primary keys and updated_at), so it can be computed without loading the rows.
+def make_etag(*versions):
+    digest = hashlib.sha256(repr(versions).encode()).hexdigest()[:32]
+    return f'"{digest}"'
+
+
+# Whether the request's If-None-Match header already names this ETag (weak comparison, RFC 9110).
+def matches(request: Request, etag: str):
+    header = request.headers.get("if-none-match")
+    if header is None:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in header.split(","))
+    return etag in (candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates)
+
+
+# Empty 304 response telling the client its cached copy is still current.
+def not_modified(etag: str, cache_control: str):
+    return Response(status_code=status.HTTP_304_NOT_MODIFIED,
+                    headers={"ETag": etag, "Cache-Control": cache_control})
+
+
+# Attach the validator and caching policy to a full (200) response.
+def set_headers(response: Response, etag: str, cache_control: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = cache_control
@@ -0,0 +1,160 @@
+import asyncio
+import json
+import uuid
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+from sqlalchemy import func, select
+from starlette.concurrency import run_in_threadpool
+
+from .config import app_settings
+from .database import SQLALCHEMY_DATABASE_URL
+
+# Cross-worker cache invalidation bus.
+# Write paths publish change events with pg_notify() inside their transaction, so an event is
+# delivered exactly when the change commits. Every worker LISTENs on the channel and evicts the
+# affected keys from its own in-process caches.
+# While the listener is disconnected events can be missed, so caches fall back to a short TTL
+# and are cleared; after reconnecting they are cleared again and go back to their normal TTL.
+
+CHANNEL = "cache_invalidation"
+
+# Identifies this worker process, so it can skip its own events (it already applied them locally)
+WORKER_ID = uuid.uuid4().hex
+
+# Event kind -> function(keys) that applies an incoming event to this worker's caches
+_handlers = {}
+
+# async function(connected) called when the listener disconnects, or reconnects after a disconnect
+_state_hooks = []
+
+
+# Register the function applying events of a kind (e.g. "responses", "principals").
+def subscribe(kind, handler):
+    _handlers[kind] = handler
+
+
+# Register a function to resynchronize a cache when the bus goes down or comes back.
+def on_state_change(hook):
+    _state_hooks.append(hook)
+
+
+# Postgres refuses NOTIFY payloads of 8000 bytes or more; an event with more keys is sent in parts
+MAX_PAYLOAD_BYTES = 7900
+
+
+def _payloads(kind, keys):
+    keys = list(keys)
+    payload = json.dumps({"o": WORKER_ID, "k": kind, "v": keys}, separators=(",", ":"))
+    if len(payload.encode()) < MAX_PAYLOAD_BYTES or len(keys) <= 1:
+        return [payload]
+    half = len(keys) // 2
+    return _payloads(kind, keys[:half]) + _payloads(kind, keys[half:])
+
+
+# Queue an event in db's current transaction; it is only delivered if the transaction commits.
+async def publish(db, kind, keys):
+    for payload in _payloads(kind, keys):
+        await db.execute(select(func.pg_notify(CHANNEL, payload)))
+
+
+# Same as publish(), from a Connection inside a flush (ORM event listeners).
+def publish_on_connection(connection, kind, keys):
+    for payload in _payloads(kind, keys):
+        connection.execute(select(func.pg_notify(CHANNEL, payload)))
+
+
+# Background task holding the LISTEN connection.
+# It uses psycopg2 (available on both driver paths), with its socket watched by the event loop.
+class Listener:
+    def __init__(self):
+        self.connected = None  # None until the first connection attempt finishes
+        self._task = None
+
+    async def start(self):
+        connection = await self._connect()
+        self._task = asyncio.create_task(self._run(connection))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _connect(self):
+        try:
+            connection = await run_in_threadpool(
+                psycopg2.connect, SQLALCHEMY_DATABASE_URL,
+                # Let the kernel notice a silently dropped connection
+                keepalives=1, keepalives_idle=30, keepalives_interval=10, keepalives_count=3,
+            )
+            connection.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+            with connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+        except psycopg2.Error as error:
+            print(f"Cache invalidation listener failed to connect❌ {error}")
+            await self._set_connected(False)
+            return None
+        await self._set_connected(True)
+        return connection
+
+    async def _run(self, connection):
+        loop = asyncio.get_running_loop()
+        while True:
+            if connection is not None:
+                # psycopg2 closes the connection on a fatal error, so keep the socket number
+                fd = connection.fileno()
+                lost = loop.create_future()
+                loop.add_reader(fd, self._drain, connection, lost)
+                try:
+                    await lost
+                finally:
+                    loop.remove_reader(fd)
+                    connection.close()
+                await self._set_connected(False)
+
+            # Retry until the database is reachable again
+            await asyncio.sleep(app_settings.CACHE_INVALIDATION_RETRY_SECONDS)
+            connection = await self._connect()
+
+    # Called by the event loop when the LISTEN socket is readable.
+    def _drain(self, connection, lost):
+        try:
+            connection.poll()
+        except psycopg2.Error as error:
+            if not lost.done():
+                print(f"Cache invalidation listener disconnected❌ {error}")
+                lost.set_result(None)
+            return
+
+        while connection.notifies:
+            event = json.loads(connection.notifies.pop(0).payload)
+            handler = _handlers.get(event["k"])
+            if handler is not None and event["o"] != WORKER_ID:
+                handler(event["v"])
+
+    async def _set_connected(self, connected):
+        previous, self.connected = self.connected, connected
+        # Nothing was cached under a stale view on the very first connection
+        if connected == previous or (connected and previous is None):
+            return
+        for hook in _state_hooks:
+            await hook(connected)
+
+
+listener = Listener()
+
+
+# Shorten a TTLCache's lifetime and drop its entries while events may be missed;
+# restore it (dropping entries cached meanwhile) once the bus is back.
+def degrade_with_bus(cache):
+    normal_ttl = cache.ttl
+
+    async def resync(connected):
+        cache.ttl = normal_ttl if connected else min(normal_ttl, app_settings.CACHE_INVALIDATION_FALLBACK_TTL)
+        cache.clear()
+
+    on_state_change(resync)
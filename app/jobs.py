@@ -0,0 +1,276 @@
+import asyncio
+import signal
+import time
+import traceback
+from datetime import timedelta
+from typing import Callable, NamedTuple, Optional
+
+from sqlalchemy import delete, func, select, update
+
+from . import course_stats, models, provisioning, schemas, utils
+from .config import app_settings
+from .database import async_engine, session_scope
+from .response_cache import response_cache
+
+# Background jobs for work too slow for a request (bulk provisioning, roster imports, cascading
+# deletes). The API inserts a row into the jobs table and answers 202; worker processes
+#     python -m app.jobs
+# claim queued rows with SELECT ... FOR UPDATE SKIP LOCKED, so any number of them can share the
+# table without a broker and without two workers taking the same job. A running job's worker
+# refreshes its heartbeat; a job whose worker died is requeued once the heartbeat goes stale.
+
+# Roster rows provisioned per transaction; progress is saved after each batch
+PROVISION_BATCH_ROWS = 5000
+
+
+# A failure to report as the job's error as is (e.g. the course was deleted meanwhile)
+class JobError(Exception):
+    pass
+
+
+# A kind of job: its params schema, its size (for progress), the handler running it, what to store
+# of its params (e.g. passwords encrypted) and what to keep of them once it is over.
+class JobKind(NamedTuple):
+    params: type
+    total: Callable[[dict], Optional[int]]
+    run: Callable
+    seal: Callable[[dict], dict] = lambda params: params
+    scrub: Callable[[dict], dict] = lambda params: params
+
+
+# Saves a running job's progress, with its partial result so a retry can resume from there.
+# Writes go through their own session, so they are visible while the handler's transaction is open.
+class Progress:
+    def __init__(self, job_id):
+        self.job_id = job_id
+
+    async def __call__(self, progress, result=None):
+        async with session_scope() as db:
+            await db.execute(
+                update(models.Job)
+                .where(models.Job.job_id == self.job_id)
+                .values(progress=progress, result=result, heartbeat_at=func.now())
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+
+########################### ⏳ JOB HANDLERS ###########################
+# Each handler gets a session, the claimed job row (params, progress and result so far) and a
+# Progress, and returns the job's result.
+
+async def _provision_users(db, job, report):
+    rows = utils.decrypt_secret(job.params["roster"])
+    summary = job.result or {"created": 0, "errors": []}
+
+    # Resume after the last batch saved, if an earlier attempt got that far
+    for start in range(job.progress, len(rows), PROVISION_BATCH_ROWS):
+        batch = await provisioning.provision_users(db, rows[start:start + PROVISION_BATCH_ROWS], first_row=start + 1)
+        summary = {"created": summary["created"] + batch["created"], "errors": summary["errors"] + batch["errors"]}
+        await report(min(start + PROVISION_BATCH_ROWS, len(rows)), summary)
+    return summary
+
+
+async def _enroll_roster(db, job, report):
+    course_id = job.params["course_id"]
+    if await db.get(models.Course, course_id) is None:
+        raise JobError(f"Course with ID: {course_id} is not found")
+    return await provisioning.enroll_students(db, course_id, job.params["students"])
+
+
+async def _delete_course(db, job, report):
+    course_id = job.params["course_id"]
+    deleted = await db.scalar(
+        delete(models.Course)
+        .where(models.Course.course_id == course_id)
+        .returning(models.Course.course_id)
+        .execution_options(synchronize_session=False)
+    )
+
+    # Drop the cached responses showing the course, in every API worker
+    await response_cache.commit_and_invalidate(db, f"course:{course_id}")
+    return {"course_id": course_id, "deleted": deleted is not None}
+
+
+async def _reconcile_course_stats(db, job, report):
+    return await course_stats.reconcile(db, repair=job.params["repair"], report=report)
+
+
+# A provisioning job's roster holds plaintext passwords: the jobs table stores it encrypted next to
+# its row count, and keeps only the count once the job is over.
+KINDS = {
+    "provision_users": JobKind(schemas.ProvisionUsersJobParams, lambda params: len(params["users"]), _provision_users,
+                               seal=lambda params: {"users": len(params["users"]),
+                                                    "roster": utils.encrypt_secret(params["users"])},
+                               scrub=lambda params: {"users": params["users"]}),
+    "enroll_roster": JobKind(schemas.EnrollRosterJobParams, lambda params: len(params["students"]), _enroll_roster),
+    "delete_course": JobKind(schemas.DeleteCourseJobParams, lambda params: 1, _delete_course),
+    "reconcile_course_stats": JobKind(schemas.ReconcileCourseStatsJobParams, lambda params: None, _reconcile_course_stats),
+}
+
+
+# Queue a job (params already validated against its kind's schema) and commit.
+async def submit(db, kind, params, user_id):
+    job = models.Job(kind=kind, params=KINDS[kind].seal(params), total=KINDS[kind].total(params), user_fkey=user_id)
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    return job
+
+
+########################### ⏳ WORKER ###########################
+
+# Take the oldest queued job, skipping rows other workers have locked, and mark it running.
+async def _claim():
+    next_job = (
+        select(models.Job.job_id)
+        .where(models.Job.status == "queued")
+        .order_by(models.Job.job_id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+        .scalar_subquery()
+    )
+    async with session_scope() as db:
+        job = (await db.execute(
+            update(models.Job)
+            .where(models.Job.job_id == next_job)
+            .values(status="running", started_at=func.now(), heartbeat_at=func.now(),
+                    attempts=models.Job.attempts + 1)
+            .returning(models.Job.job_id, models.Job.kind, models.Job.params, models.Job.progress,
+                       models.Job.result, models.Job.attempts)
+            .execution_options(synchronize_session=False)
+        )).first()
+        await db.commit()
+        return job
+
+
+# Requeue running jobs whose worker stopped sending heartbeats, or fail them after JOB_MAX_ATTEMPTS.
+# A failed job's params are scrubbed in the same UPDATE, as when a worker fails it, so a roster's
+# encrypted passwords don't outlive the job.
+async def _reclaim_stale():
+    async with session_scope() as db:
+        # Lock the stale jobs, skipping any another worker is reclaiming right now
+        stale = (await db.execute(
+            select(models.Job.job_id, models.Job.kind, models.Job.params, models.Job.attempts)
+            .where((models.Job.status == "running")
+                   & (models.Job.heartbeat_at < func.now() - timedelta(seconds=app_settings.JOB_STALE_SECONDS)))
+            .with_for_update(skip_locked=True)
+        )).all()
+
+        for job in stale:
+            if job.attempts < app_settings.JOB_MAX_ATTEMPTS:
+                values = dict(status="queued")
+            else:
+                values = dict(status="failed", error="The job's worker stopped responding",
+                              params=KINDS[job.kind].scrub(job.params), finished_at=func.now())
+            await db.execute(
+                update(models.Job)
+                .where(models.Job.job_id == job.job_id)
+                .values(**values)
+                .execution_options(synchronize_session=False)
+            )
+        await db.commit()
+
+    for job in stale:
+        outcome = "requeued" if job.attempts < app_settings.JOB_MAX_ATTEMPTS else "failed"
+        print(f"Job {job.job_id} lost its worker, {outcome}⚠️")
+
+
+async def _heartbeat(job_id):
+    while True:
+        await asyncio.sleep(app_settings.JOB_HEARTBEAT_SECONDS)
+        try:
+            async with session_scope() as db:
+                await db.execute(
+                    update(models.Job)
+                    .where(models.Job.job_id == job_id)
+                    .values(heartbeat_at=func.now())
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        except Exception as error:
+            # Keep trying; the job is only reclaimed once heartbeats stop for JOB_STALE_SECONDS
+            print(f"Job {job_id} heartbeat failed❌ {error}")
+
+
+# Record how a job ended. The status check leaves alone a job reclaimed meanwhile by another worker.
+async def _finish(job_id, **values):
+    async with session_scope() as db:
+        await db.execute(
+            update(models.Job)
+            .where((models.Job.job_id == job_id) & (models.Job.status == "running"))
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+
+async def _execute(job):
+    kind = KINDS[job.kind]
+    heartbeat = asyncio.create_task(_heartbeat(job.job_id))
+    print(f"Job {job.job_id} ({job.kind}) started, attempt {job.attempts}")
+    try:
+        async with session_scope() as db:
+            result = await kind.run(db, job, Progress(job.job_id))
+    except asyncio.CancelledError:
+        # The worker is shutting down: put the job back without counting this attempt
+        await _finish(job.job_id, status="queued", attempts=models.Job.attempts - 1)
+        raise
+    except Exception as error:
+        if not isinstance(error, JobError):
+            traceback.print_exc()
+        await _finish(job.job_id, status="failed", error=str(error) or type(error).__name__,
+                      params=kind.scrub(job.params), finished_at=func.now())
+        print(f"Job {job.job_id} failed❌ {error}")
+    else:
+        await _finish(job.job_id, status="succeeded", result=result, params=kind.scrub(job.params),
+                      progress=func.coalesce(models.Job.total, models.Job.progress), finished_at=func.now())
+        print(f"Job {job.job_id} succeeded✅")
+    finally:
+        heartbeat.cancel()
+
+
+# Run jobs until SIGTERM/SIGINT, at most JOB_WORKER_CONCURRENCY at a time.
+# Jobs still running at shutdown are requeued for the next worker.
+async def work():
+    loop = asyncio.get_running_loop()
+    stopping = asyncio.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(signum, stopping.set)
+    stop = asyncio.create_task(stopping.wait())
+
+    running = set()
+    next_reclaim = 0
+    print(f"Job worker started, running up to {app_settings.JOB_WORKER_CONCURRENCY} jobs")
+    try:
+        while not stopping.is_set():
+            try:
+                if time.monotonic() >= next_reclaim:
+                    await _reclaim_stale()
+                    next_reclaim = time.monotonic() + app_settings.JOB_HEARTBEAT_SECONDS
+
+                # Claim jobs while there are free slots, then wait for a slot, new work or shutdown
+                job = await _claim() if len(running) < app_settings.JOB_WORKER_CONCURRENCY else None
+            except Exception as error:
+                print(f"Job worker can't reach the database❌ {error}")
+                job = None
+
+            if job is not None:
+                task = asyncio.create_task(_execute(job))
+                running.add(task)
+                task.add_done_callback(running.discard)
+                continue
+            await asyncio.wait({stop, *running}, timeout=app_settings.JOB_POLL_SECONDS,
+                               return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in running:
+            task.cancel()
+        await asyncio.gather(*running, return_exceptions=True)
+        stop.cancel()
+        if async_engine is not None:
+            await async_engine.dispose()
+    print("Job worker stopped")
+
+
+if __name__ == "__main__":
+    asyncio.run(work())
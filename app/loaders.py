@@ -0,0 +1,121 @@
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+
+from . import models
+
+# Loader options for the response schemas still serialized from ORM entities.
+# Every relationship a schema serializes is loaded in the same statement as its parent,
+# so a list endpoint issues one query no matter how many rows it returns.
+# Relationships are declared with lazy="raise_on_sql" in models.py, so a query that
+# forgets its loader fails loudly instead of issuing one query per row.
+# All of these are many-to-one relationships on non-null foreign keys, hence inner joins.
+
+# 🔵 EnrollmentResponseData -> course_info (EnrollCourseResponseData) -> lecturer_info
+ENROLLMENT_RESPONSE = (
+    joinedload(models.Enrollment.course_info, innerjoin=True)
+    .joinedload(models.Course.lecturer_info, innerjoin=True)
+    .load_only(models.User.username, models.User.email),
+)
+
+
+
+# Column projections for the other response schemas.
+# Rather than ORM entities, these select exactly the columns a response schema serializes and
+# rebuild its nested objects from the flat rows as plain dicts, which skips the identity map and
+# attribute instrumentation and never fetches columns the response doesn't show.
+# Relationships are joined with inner joins, like the loaders above.
+class Projection:
+    # columns: top-level columns; nested: field name -> (relationship to join, columns of the related row)
+    def __init__(self, columns, **nested):
+        self.columns = columns
+        self.nested = nested
+
+        # Nested columns are labelled "<field>__<column>" so names can't clash with the top level
+        self._selected = [*columns, *(column.label(f"{field}__{column.key}")
+                                      for field, (_, related) in nested.items() for column in related)]
+
+        # Precomputed (field, keys, start, end) slices for turning a row into a dict
+        self._layout = []
+        start = len(columns)
+        for field, (_, related) in nested.items():
+            self._layout.append((field, [column.key for column in related], start, start + len(related)))
+            start += len(related)
+        self._keys = [column.key for column in columns]
+        self._width = len(columns)
+
+        # Flat names of the selected columns in row order, e.g. "lecturer_info.email" (CSV headers)
+        self.fields = [*self._keys, *(f"{field}.{key}" for field, keys, _, _ in self._layout for key in keys)]
+
+    # SELECT of the projected columns with their relationships joined; add WHERE clauses as usual.
+    def select(self):
+        statement = select(*self._selected)
+        for relationship, _ in self.nested.values():
+            statement = statement.join(relationship)
+        return statement
+
+    # Turn result rows into nested dicts shaped like the response schema.
+    def shape(self, rows):
+        keys, width, layout = self._keys, self._width, self._layout
+        items = []
+        for row in rows:
+            item = dict(zip(keys, row[:width]))
+            for field, nested_keys, start, end in layout:
+                item[field] = dict(zip(nested_keys, row[start:end]))
+            items.append(item)
+        return items
+
+    # Run statement (built from select()) and return the shaped rows.
+    async def all(self, db, statement):
+        return self.shape(await db.execute(statement))
+
+    # Run statement and return its first shaped row, or None.
+    async def first(self, db, statement):
+        items = self.shape(await db.execute(statement.limit(1)))
+        return items[0] if items else None
+
+
+# Columns of the course summary embedded in lessons and assignments (CourseInfoResponseData)
+_COURSE_INFO = [models.Course.course_id, models.Course.course_name, models.Course.course_description]
+
+# 📒 CourseResponseData
+COURSE_COLUMNS = Projection(
+    [models.Course.course_name, models.Course.course_description, models.Course.course_instructor,
+     models.Course.course_capacity, models.Course.course_location, models.Course.start_date,
+     models.Course.end_date, models.Course.course_id, models.Course.seats_taken, models.Course.lesson_count,
+     models.Course.assignment_count, models.Course.created_at],
+    lecturer_info=(models.Course.lecturer_info, [models.User.username, models.User.email]),
+)
+
+# ⚛️ LessonResponseData
+LESSON_COLUMNS = Projection(
+    [models.Lesson.lesson_id, models.Lesson.lesson_title, models.Lesson.lesson_content, models.Lesson.created_at],
+    course_info=(models.Lesson.course_info, _COURSE_INFO),
+)
+
+# 📝 AssignmentResponseData
+ASSIGNMENT_COLUMNS = Projection(
+    [models.Assignment.assignment_id, models.Assignment.assignment_title, models.Assignment.assignment_description,
+     models.Assignment.assignment_questions, models.Assignment.assignment_instruction, models.Assignment.max_score,
+     models.Assignment.due_date, models.Assignment.created_at],
+    course_info=(models.Assignment.course_info, _COURSE_INFO),
+)
+
+# 👤 UserResponseData (never loads the password hash)
+USER_COLUMNS = Projection(
+    [models.User.user_id, models.User.username, models.User.email, models.User.role, models.User.created_at],
+)
+
+# 🔵 StudentEnrolledCourseResponseData
+STUDENT_ENROLLED_COLUMNS = Projection(
+    [models.Enrollment.enrollment_id],
+    course_info=(models.Enrollment.course_info, [models.Course.course_name, models.Course.course_instructor,
+                                                 models.Course.start_date, models.Course.end_date]),
+)
+
+# 🏠 DashboardCourseData, without the lessons and assignments loaded for each page of courses.
+# Selects from enrollments; join models.Enrollment.course_info to it.
+DASHBOARD_COURSE_COLUMNS = Projection(
+    [models.Enrollment.enrollment_id, models.Course.course_id, models.Course.course_name,
+     models.Course.course_instructor, models.Course.course_location, models.Course.start_date,
+     models.Course.end_date],
+)
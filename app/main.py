@@ -1,12 +1,15 @@
-from fastapi import FastAPI
-from .database import engine
-from . import models
+from anyio import to_thread
+from fastapi import FastAPI, Request
+from fastapi.responses import ORJSONResponse
+from .database import async_engine, engine, session_scope, statement_counter
+from . import invalidation, models, oauth2, utils
 from .config import app_settings
 from fastapi.middleware.cors import CORSMiddleware
-from .routers import courses, users, auth, course_enrollment, lessons, assignments
+from .routers import courses, users, auth, course_enrollment, lessons, assignments, admin, exports, jobs, search, dashboard
 
 # models.Base.metadata.create_all(bind=engine)
-app = FastAPI()
+# Encode route return values with orjson rather than the stdlib json module
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # Define a list of allowed origins, indicated by "*",
 # which means any origin is permitted to access this application.
@@ -34,10 +37,61 @@ app.include_router(auth.router)                # Router for authentication and a
 app.include_router(course_enrollment.router)   # Router for course enrollment
 app.include_router(lessons.router)             # Router for managing lessons within courses
 app.include_router(assignments.router)         # Router for handling assignments
+app.include_router(admin.router)               # Router for operational/admin endpoints
+app.include_router(exports.router)             # Router for streaming table exports (admin)
+app.include_router(jobs.router)                # Router for submitting and polling background jobs
+app.include_router(search.router)              # Router for full-text search and search-as-you-type
+app.include_router(dashboard.router)           # Router for the student dashboard (/me/dashboard)
 ###################### END ROUTERS #####################
 
+# Report how many SQL statements each request issued, so N+1 query patterns show up
+# as a count that grows with the number of rows returned.
+if app_settings.DATABASE_STATEMENT_COUNT_HEADER:
+    @app.middleware("http")
+    async def count_statements(request: Request, call_next):
+        counter = [0]
+        token = statement_counter.set(counter)
+        try:
+            response = await call_next(request)
+        finally:
+            statement_counter.reset(token)
+        response.headers["X-DB-Statement-Count"] = str(counter[0])
+        return response
+
+@app.on_event("startup")
+async def configure_threadpool():
+    # Apply the configured threadpool size (anyio defaults to 40 threads)
+    to_thread.current_default_thread_limiter().total_tokens = app_settings.THREADPOOL_LIMIT
+
+@app.on_event("startup")
+async def load_revoked_tokens():
+    # Rebuild the in-memory filter of revoked access tokens from the database
+    async with session_scope() as db:
+        await oauth2.load_revoked_tokens(db)
+
+@app.on_event("startup")
+async def start_invalidation_listener():
+    # Listen for cache invalidations published by the other workers
+    await invalidation.listener.start()
+
+@app.on_event("shutdown")
+async def stop_invalidation_listener():
+    await invalidation.listener.stop()
+
+@app.on_event("shutdown")
+def stop_password_pool():
+    # Stop the bcrypt worker processes
+    utils.shutdown_password_pool()
+
+@app.on_event("shutdown")
+async def close_database_pool():
+    # Close pooled connections while the event loop they belong to is still running
+    if async_engine is not None:
+        await async_engine.dispose()
+    engine.dispose()
+
 @app.get("/")
-def read_root():
+async def read_root():
     # This endpoint provides a simple response when accessing the root URL of the API
     return {"api_response": "Online Classroom API"}
 
@@ -1,21 +1,36 @@
-from sqlalchemy import ARRAY, TIMESTAMP, Column, ForeignKey, Integer, String, text
-from sqlalchemy.orm import relationship
+from sqlalchemy import ARRAY, TIMESTAMP, Boolean, Column, Computed, Date, ForeignKey, Index, Integer, LargeBinary, String, func, text
+from sqlalchemy.dialects.postgresql import JSONB, TSVECTOR, UUID
+from sqlalchemy.orm import deferred, relationship
 
 from .database import Base
 
+
+# Full-text search document of a row: the title weighted above the body (ts_rank scores A over B).
+# A generated column, so Postgres keeps it current on every INSERT and UPDATE. Deferred: only
+# search queries read it, loading a row never fetches it.
+def search_vector(title, body):
+    return deferred(Column(TSVECTOR, Computed(f"setweight(to_tsvector('english', {title}), 'A') || "
+                                              f"setweight(to_tsvector('english', {body}), 'B')", persisted=True),
+                           nullable=False))
+
+
+# GIN trigram index on a title, for search-as-you-type (ILIKE 'prefix%' and '% word%' matches)
+def trigram_index(name, column):
+    return Index(name, column, postgresql_using="gin", postgresql_ops={column: "gin_trgm_ops"})
+
 # Define a SQLAlchemy model for the 'users' table
 class User(Base):
     # Specify the table name in the database
     __tablename__ = "users"
 
-    # Unique identifier for the user
-    user_id = Column(Integer, primary_key=True, index=True, nullable=False)
+    # Unique identifier for the user (indexed as the primary key)
+    user_id = Column(Integer, primary_key=True, nullable=False)
 
     # User's username (must be unique)
     username = Column(String, unique=True, index=True, nullable=False)
 
-    # User's password (hashed)
-    password = Column(String, index=True, nullable=False)
+    # User's password (hashed); never searched, so not indexed
+    password = Column(String, nullable=False)
 
     # User's email address (must be unique)
     email = Column(String, unique=True, index=True, nullable=False)
@@ -27,30 +42,93 @@ class User(Base):
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
 
 
+# Define a SQLAlchemy model for the 'refresh_tokens' table.
+# Only a SHA-256 digest of each token is stored, so a leaked table can't be replayed.
+class RefreshToken(Base):
+    # Specify the table name in the database
+    __tablename__ = "refresh_tokens"
+
+    # Unique identifier for the refresh token
+    token_id = Column(Integer, primary_key=True, nullable=False)
+
+    # SHA-256 digest of the token handed to the client (32 bytes, looked up on every refresh)
+    token_hash = Column(LargeBinary(32), unique=True, nullable=False)
+
+    # Every token rotated from the same login shares a family, so a replayed token revokes them all
+    family_id = Column(UUID(as_uuid=True), index=True, nullable=False)
+
+    # The user the token was issued to; tokens go away with the user
+    user_fkey = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), index=True, nullable=False)
+
+    # Set once the token has been rotated or revoked; it can never be used again
+    revoked = Column(Boolean, server_default=text("false"), nullable=False)
+
+    # Expiry timestamp with timezone information
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False)
+
+    # Creation timestamp with timezone information, set to the current timestamp by default
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
+
+
+# Define a SQLAlchemy model for the 'revoked_tokens' table.
+# Access tokens are stateless JWTs, so a logout is recorded here by the token's jti claim.
+class RevokedToken(Base):
+    # Specify the table name in the database
+    __tablename__ = "revoked_tokens"
+
+    # The revoked token's jti claim; the primary key index serves the revocation check
+    jti = Column(UUID(as_uuid=True), primary_key=True, nullable=False)
+
+    # The token's own expiry, after which the row is no longer needed
+    expires_at = Column(TIMESTAMP(timezone=True), nullable=False)
+
+    # Revocation timestamp with timezone information, set to the current timestamp by default
+    revoked_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
+
+
 # Define a SQLAlchemy model class for the "courses" table.
 class Course(Base):
     # Set the table name for this model.
     __tablename__ = "courses"
 
     # Define columns for the "courses" table.
-    course_id = Column(Integer, primary_key=True, index=True, nullable=False)  # Primary key for course records.
-    course_name = Column(String, index=True, nullable=False)  # Name of the course.
+    course_id = Column(Integer, primary_key=True, nullable=False)  # Primary key for course records.
+    course_name = Column(String, unique=True, index=True, nullable=False)  # Name of the course (must be unique).
     course_description = Column(String, nullable=False)  # Description of the course.
     course_instructor = Column(String, nullable=False)  # Instructor's name for the course.
     course_capacity = Column(Integer, nullable=False)  # Maximum capacity of the course.
+    seats_taken = Column(Integer, nullable=False, server_default=text("0"))  # Number of enrollments, kept in step by the enrollment routes.
+    lesson_count = Column(Integer, nullable=False, server_default=text("0"))  # Number of lessons, kept in step by the lesson routes.
+    assignment_count = Column(Integer, nullable=False, server_default=text("0"))  # Number of assignments, kept in step by the assignment routes.
     course_location = Column(String, nullable=False)  # Location where the course is held.
 
-    start_date = Column(String, nullable=False)  # Start date of the course.
-    end_date = Column(String, nullable=False)  # End date of the course.
+    # First and last day of the course; null only for legacy free-text dates that couldn't be parsed.
+    start_date = Column(Date, nullable=True)
+    end_date = Column(Date, nullable=True)
 
     # Define a foreign key relationship to the "users" table, indicating the user's role in this course.
-    user_role = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
+    # Indexed, like every foreign key, so deleting a user doesn't scan the whole table for its rows.
+    user_role = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), index=True, nullable=False)
 
     # Define a timestamp for when the course record was created.
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
 
+    # Define a timestamp for the last change, set by every UPDATE; it versions the row for ETags.
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), onupdate=func.now(), nullable=False)
+
     # Define a relationship with the "User" model to access information about the course instructor.
-    lecturer_info = relationship("User")
+    # Relationships never lazy load; queries choose a loader from loaders.py instead.
+    lecturer_info = relationship("User", lazy="raise_on_sql")
+
+    # Full-text search over the name and description (GIN indexed), and name search-as-you-type.
+    search_vector = search_vector("course_name", "course_description")
+
+    # Courses running on a date are found by a range scan over the courses not yet ended.
+    __table_args__ = (
+        Index("ix_courses_end_date_start_date", "end_date", "start_date"),
+        Index("ix_courses_search_vector", "search_vector", postgresql_using="gin"),
+        trigram_index("ix_courses_course_name_trgm", "course_name"),
+    )
 
 
 # Define an SQLAlchemy model for representing enrollments in a database table.
@@ -59,24 +137,31 @@ class Enrollment(Base):
     __tablename__ = "enrollments"
 
     # Define the primary key column for enrollment records.
-    enrollment_id = Column(Integer, primary_key=True, index=True, nullable=False)
+    enrollment_id = Column(Integer, primary_key=True, nullable=False)
 
     # Define a column to store a message related to the enrollment, with a default value.
     enrollment_message = Column(String, nullable=False, default="Enrollment successful✅🎉")
 
     # Define a foreign key column to establish a relationship with the "users" table.
+    # Indexed as the first column of the unique (student_fkey, course_fkey) index below.
     student_fkey = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
 
     # Define a foreign key column to establish a relationship with the "courses" table.
     course_fkey = Column(Integer, ForeignKey("courses.course_id", ondelete="CASCADE"), nullable=False)
 
     # Define relationships between this table and the "User" and "Course" models.
-    student_info = relationship("User")
-    course_info = relationship("Course")
+    student_info = relationship("User", lazy="raise_on_sql")
+    course_info = relationship("Course", lazy="raise_on_sql")
 
     # Define a column to store the creation timestamp for each enrollment record.
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
 
+    # A student can enroll in a course only once.
+    __table_args__ = (
+        Index("ix_enrollments_student_fkey_course_fkey", "student_fkey", "course_fkey", unique=True),
+        Index("ix_enrollments_course_fkey", "course_fkey"),  # a course's enrollments, e.g. recounting seats_taken
+    )
+
 
 # Define a class named Lesson that represents lessons within a course.
 class Lesson(Base):
@@ -84,20 +169,38 @@ class Lesson(Base):
     __tablename__ = "lessons"
 
     # Define attributes for the Lesson class.
-    lesson_id = Column(Integer, primary_key=True, index=True, nullable=False)  # Unique lesson identifier.
+    lesson_id = Column(Integer, primary_key=True, nullable=False)  # Unique lesson identifier.
     lesson_title = Column(String, nullable=False)  # Title of the lesson.
     lesson_content = Column(String, nullable=False)  # Content or materials for the lesson.
+    lesson_content_hash = Column(String, nullable=False)  # SHA-256 of the normalized content, for duplicate checks.
 
     # Define foreign keys to link to related tables (users and courses).
-    user_fkey = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
+    # course_fkey is indexed as the first column of the composite indexes below.
+    user_fkey = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), index=True, nullable=False)
     course_fkey = Column(Integer, ForeignKey("courses.course_id", ondelete="CASCADE"), nullable=False)
 
     # Establish a relationship with the Course class.
-    course_info = relationship("Course")
+    course_info = relationship("Course", lazy="raise_on_sql")
 
     # Store the timestamp when the lesson was created.
     created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
 
+    # Store the timestamp of the last change, set by every UPDATE; it versions the row for ETags.
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), onupdate=func.now(), nullable=False)
+
+    # Full-text search over the title and content.
+    search_vector = search_vector("lesson_title", "lesson_content")
+
+    # Lesson titles are unique within a course; the index also serves lookups by course.
+    # Content duplicates are found through the digest index rather than comparing full text.
+    __table_args__ = (
+        Index("ix_lessons_course_fkey_lesson_title", "course_fkey", "lesson_title", unique=True),
+        Index("ix_lessons_course_fkey_lesson_content_hash", "course_fkey", "lesson_content_hash"),
+        Index("ix_lessons_course_fkey_lesson_id", "course_fkey", "lesson_id"),  # a course's lessons in order, e.g. its latest ones
+        Index("ix_lessons_search_vector", "search_vector", postgresql_using="gin"),
+        trigram_index("ix_lessons_lesson_title_trgm", "lesson_title"),
+    )
+
 
 # Define a class named Assignment that represents assignments within a course.
 class Assignment(Base):
@@ -105,20 +208,84 @@ class Assignment(Base):
     __tablename__ = "assignments"
 
     # Define attributes for the Assignment class.
-    assignment_id = Column(Integer, primary_key=True, index=True, nullable=False)  # Unique assignment identifier.
+    assignment_id = Column(Integer, primary_key=True, nullable=False)  # Unique assignment identifier.
     assignment_title = Column(String, nullable=False)  # Title of the assignment.
     assignment_description = Column(String, nullable=False)  # Description of the assignment.
+    assignment_description_hash = Column(String, nullable=False)  # SHA-256 of the normalized description, for duplicate checks.
     assignment_questions = Column(ARRAY(String), nullable=False)  # List of assignment questions.
     assignment_instruction = Column(String, nullable=False)  # Instructions for completing the assignment.
-    due_date = Column(String, nullable=False)  # Due date for the assignment.
+    due_date = Column(TIMESTAMP(timezone=True), nullable=True)  # Deadline; null only for a legacy assignment saved without one.
     max_score = Column(Integer, nullable=False)  # Maximum possible score for the assignment.
 
     # Define foreign keys to link to related tables (users and courses).
-    user_fkey = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), nullable=False)
+    # course_fkey is indexed as the first column of the composite indexes below.
+    user_fkey = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), index=True, nullable=False)
     course_fkey = Column(Integer, ForeignKey("courses.course_id", ondelete="CASCADE"), nullable=False)
 
     # Establish a relationship with the Course class.
-    course_info = relationship("Course")
+    course_info = relationship("Course", lazy="raise_on_sql")
 
     # Store the timestamp when the assignment was created.
-    created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
\ No newline at end of file
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
+
+    # Store the timestamp of the last change, set by every UPDATE; it versions the row for ETags.
+    updated_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), onupdate=func.now(), nullable=False)
+
+    # Full-text search over the title and description.
+    search_vector = search_vector("assignment_title", "assignment_description")
+
+    # Assignment titles are unique within a course; the index also serves lookups by course.
+    # Description duplicates are found through the digest index rather than comparing full text.
+    # Deadline windows ("due this week") are range scans over the due date index.
+    __table_args__ = (
+        Index("ix_assignments_course_fkey_assignment_title", "course_fkey", "assignment_title", unique=True),
+        Index("ix_assignments_course_fkey_assignment_description_hash", "course_fkey", "assignment_description_hash"),
+        Index("ix_assignments_due_date", "due_date"),
+        Index("ix_assignments_course_fkey_due_date", "course_fkey", "due_date"),  # a course's next deadlines
+        Index("ix_assignments_search_vector", "search_vector", postgresql_using="gin"),
+        trigram_index("ix_assignments_assignment_title_trgm", "assignment_title"),
+    )
+
+
+# Define a SQLAlchemy model for the 'jobs' table, the queue of background jobs run by app/jobs.py.
+# Workers claim queued jobs with SELECT ... FOR UPDATE SKIP LOCKED, so no broker is needed.
+class Job(Base):
+    # Specify the table name in the database
+    __tablename__ = "jobs"
+
+    # Unique identifier for the job; jobs are claimed oldest first
+    job_id = Column(Integer, primary_key=True, nullable=False)
+
+    # What to run (a handler registered in app/jobs.py) and its parameters
+    kind = Column(String, nullable=False)
+    params = Column(JSONB, nullable=False)
+
+    # queued -> running -> succeeded | failed
+    status = Column(String, nullable=False, server_default=text("'queued'"))
+
+    # Units of work done so far (e.g. roster rows), out of total when the job's size is known
+    progress = Column(Integer, nullable=False, server_default=text("0"))
+    total = Column(Integer, nullable=True)
+
+    # The handler's summary once succeeded, or why the job failed
+    result = Column(JSONB, nullable=True)
+    error = Column(String, nullable=True)
+
+    # How many times a worker has claimed the job (a job is requeued if its worker dies)
+    attempts = Column(Integer, nullable=False, server_default=text("0"))
+
+    # The user who submitted the job; jobs go away with the user
+    user_fkey = Column(Integer, ForeignKey("users.user_id", ondelete="CASCADE"), index=True, nullable=False)
+
+    # Lifecycle timestamps with timezone information; a running job's worker refreshes heartbeat_at
+    created_at = Column(TIMESTAMP(timezone=True), server_default=text("now()"), nullable=False)
+    started_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    heartbeat_at = Column(TIMESTAMP(timezone=True), nullable=True)
+    finished_at = Column(TIMESTAMP(timezone=True), nullable=True)
+
+    # Workers only ever look at queued and running jobs, so index just those; the
+    # index stays small however many finished jobs pile up.
+    __table_args__ = (
+        Index("ix_jobs_active_status_job_id", "status", "job_id",
+              postgresql_where=text("status IN ('queued', 'running')")),
+    )
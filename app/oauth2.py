@@ -1,24 +1,46 @@
-from datetime import datetime, timedelta
+import hashlib
+import secrets
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
-from . import models, schemas
-from sqlalchemy.orm import Session
-from .database import get_db
+from . import invalidation, models, schemas
+from sqlalchemy import delete, event, exists, func, insert, inspect, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from .bloom import BloomFilter
+from .cache import TTLCache
+from .database import get_db, session_scope
 from .config import app_settings
 
 
 # to get a string like this run:
 # openssl rand -hex 32
-SECRET_KEY = {app_settings.SECRET_KEY}
-ALGORITHM = {app_settings.ALGORITHM}
-ACCESS_TOKEN_EXPIRE_MINUTES = {app_settings.ACCESS_TOKEN_EXPIRE_MINUTES}
+SECRET_KEY = app_settings.SECRET_KEY
+ALGORITHM = app_settings.ALGORITHM
+ACCESS_TOKEN_EXPIRE_MINUTES = app_settings.ACCESS_TOKEN_EXPIRE_MINUTES
+REFRESH_TOKEN_EXPIRE_DAYS = app_settings.REFRESH_TOKEN_EXPIRE_DAYS
 
 # Create an instance of the OAuth2PasswordBearer class.
 # This instance will be used to authenticate users based on OAuth2 tokens.
 # The "tokenUrl" parameter specifies the URL where clients can request tokens (e.g., during login).
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+# Cache of raw access token -> Principal, so repeat requests with the same token skip both
+# the JWT signature check and the users lookup. Entries are tagged with the username so a
+# change to the user drops every cached token for them.
+principal_cache = TTLCache("principals", app_settings.PRINCIPAL_CACHE_SIZE, app_settings.PRINCIPAL_CACHE_TTL)
+
+# jti of every revoked, unexpired access token. A miss proves the token isn't revoked without
+# any I/O; a hit (real or false positive) is confirmed against the revoked_tokens table.
+revoked_token_filter = BloomFilter(app_settings.REVOKED_TOKEN_BLOOM_CAPACITY, app_settings.REVOKED_TOKEN_BLOOM_ERROR_RATE)
+
+# False while revocations made by other workers may be missing from the filter (invalidation bus down);
+# every jti is then checked against the database.
+revoked_token_filter_synced = True
+
 # Function to create an access token by encoding a payload with an expiration time.
 def create_access_token(data: dict):
     # Create a copy of the data to encode.
@@ -27,8 +49,8 @@ def create_access_token(data: dict):
     # Calculate the token's expiration time.
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     
-    # Add the expiration time to the payload.
-    to_encode.update({"exp": expire})
+    # Add the expiration time and a unique token id (used to revoke the token) to the payload.
+    to_encode.update({"exp": expire, "jti": str(uuid.uuid4())})
     
     # Encode the payload into a JSON Web Token (JWT) using the secret key and algorithm.
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
@@ -49,8 +71,9 @@ def verify_access_token(token: str, credentials_exception):
         if username is None:
             raise credentials_exception
         
-        # Create a TokenData object containing the extracted username.
-        token_data = schemas.TokenData(username=username)
+        # Create a TokenData object containing the extracted username and expiry.
+        token_data = schemas.TokenData(username=username, exp=payload.get("exp"),
+                                       jti=payload.get("jti"), sid=payload.get("sid"))
     except JWTError:
         # If there's a JWTError, raise a credentials exception.
         raise credentials_exception
@@ -58,8 +81,123 @@ def verify_access_token(token: str, credentials_exception):
     # Return the extracted token data.
     return token_data
 
+
+# Check whether an access token's jti has been revoked; only Bloom filter hits reach the database.
+async def is_token_revoked(db: AsyncSession, jti):
+    if jti is None:
+        return False
+    if revoked_token_filter_synced and not revoked_token_filter.might_contain(jti):
+        return False
+    return await db.scalar(select(exists().where(models.RevokedToken.jti == uuid.UUID(jti))))
+
+
+# Revoke an access token (and the refresh token family it was issued with) until it expires.
+async def revoke_access_token(db: AsyncSession, token: str, token_data: schemas.TokenData):
+    if token_data.jti is not None:
+        await db.execute(
+            pg_insert(models.RevokedToken)
+            .values(jti=uuid.UUID(token_data.jti), expires_at=datetime.fromtimestamp(token_data.exp, timezone.utc))
+            .on_conflict_do_nothing(index_elements=[models.RevokedToken.jti])
+        )
+        # Tell the other workers once the revocation commits
+        await invalidation.publish(db, "revoked", [token_data.jti])
+
+    # Stop the matching refresh tokens from minting new access tokens.
+    if token_data.sid is not None:
+        await db.execute(
+            update(models.RefreshToken)
+            .where(models.RefreshToken.family_id == uuid.UUID(token_data.sid))
+            .values(revoked=True)
+            .execution_options(synchronize_session=False)
+        )
+    await db.commit()
+
+    # Only update this worker's filter and cache once the revocation is durable.
+    if token_data.jti is not None:
+        revoked_token_filter.add(token_data.jti)
+    principal_cache.invalidate(token)
+
+
+# Rebuild the revoked token filter from the database (called at startup), dropping expired rows first.
+async def load_revoked_tokens(db: AsyncSession):
+    await db.execute(delete(models.RevokedToken).where(models.RevokedToken.expires_at <= func.now()))
+    await db.commit()
+
+    jtis = await db.scalars(select(models.RevokedToken.jti))
+    revoked_token_filter.clear()
+    for jti in jtis:
+        revoked_token_filter.add(str(jti))
+
+
+# Refresh tokens are opaque random strings; the database only keeps their SHA-256 digest.
+# A fast hash is enough here because the tokens carry 256 bits of entropy.
+def refresh_token_digest(token: str):
+    return hashlib.sha256(token.encode()).digest()
+
+
+# Function to issue a new refresh token for a user, continuing family_id when rotating.
+# The caller commits the transaction.
+async def create_refresh_token(db: AsyncSession, user_id: int, family_id=None):
+    token = secrets.token_urlsafe(32)
+    await db.execute(insert(models.RefreshToken).values(
+        token_hash=refresh_token_digest(token),
+        family_id=family_id or uuid.uuid4(),
+        user_fkey=user_id,
+        expires_at=datetime.now(timezone.utc) + timedelta(days=REFRESH_TOKEN_EXPIRE_DAYS),
+    ))
+    return token
+
+
+# Function to exchange a refresh token for the username it was issued to, its family and a new refresh token.
+# The old token is revoked in the same statement that validates it, so two concurrent
+# refreshes with one token can't both succeed.
+async def rotate_refresh_token(db: AsyncSession, token: str):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    digest = refresh_token_digest(token)
+
+    # Revoke the token if it is live and fetch its owner in one round-trip (UPDATE ... FROM users).
+    result = await db.execute(
+        update(models.RefreshToken.__table__)
+        .where(models.RefreshToken.token_hash == digest,
+               models.RefreshToken.revoked.is_(False),
+               models.RefreshToken.expires_at > func.now(),
+               models.RefreshToken.user_fkey == models.User.user_id)
+        .values(revoked=True)
+        .returning(models.RefreshToken.user_fkey, models.RefreshToken.family_id, models.User.username)
+    )
+    row = result.first()
+
+    if row is None:
+        # A revoked token being presented again means it was copied; revoke its whole family
+        # so neither the thief nor the client can keep refreshing.
+        family = select(models.RefreshToken.family_id).where(models.RefreshToken.token_hash == digest)
+        await db.execute(
+            update(models.RefreshToken)
+            .where(models.RefreshToken.family_id.in_(family))
+            .values(revoked=True)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        raise credentials_exception
+
+    new_token = await create_refresh_token(db, row.user_fkey, row.family_id)
+    await db.commit()
+    return row.username, row.family_id, new_token
+
+
+# Delete a user's expired refresh tokens; revoked ones are kept until expiry for replay detection.
+async def prune_refresh_tokens(db: AsyncSession, user_id: int):
+    await db.execute(
+        delete(models.RefreshToken)
+        .where(models.RefreshToken.user_fkey == user_id, models.RefreshToken.expires_at <= func.now())
+    )
+
 # Function to retrieve the current user based on the access token.
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     # Create an exception for handling credentials-related issues.
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -67,11 +205,72 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+    # Return the cached principal if this token was already verified recently.
+    principal = principal_cache.get(token)
+    if principal is not None:
+        return principal
+
     # Verify the access token and extract token data.
-    token = verify_access_token(token, credentials_exception)
+    token_data = verify_access_token(token, credentials_exception)
+
+    # Reject tokens that were revoked by a logout.
+    if await is_token_revoked(db, token_data.jti):
+        raise credentials_exception
     
     # Query the database to retrieve the user associated with the extracted username.
-    user = db.query(models.User).filter(models.User.username == token.username).first()
+    user = await db.scalar(select(models.User).where(models.User.username == token_data.username))
+
+    # Reject tokens for users that no longer exist.
+    if user is None:
+        raise credentials_exception
+
+    # Cache the principal, but never beyond the token's own expiry.
+    principal = schemas.Principal.model_validate(user)
+    if token_data.exp is not None:
+        principal_cache.set(token, principal, ttl=token_data.exp - time.time(),
+                            tags=(f"user:{user.username}", f"jti:{token_data.jti}"))
     
-    # Return the user object as the current user.
-    return user
+    # Return the principal as the current user.
+    return principal
+
+
+# Drop every cached principal for a user, e.g. after their role changes or they are deleted.
+def invalidate_user(username: str):
+    principal_cache.invalidate_tag(f"user:{username}")
+
+
+# Invalidate cached principals whenever a User row is updated or deleted through the ORM,
+# in this worker and (once the change commits) in every other worker.
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def invalidate_changed_user(mapper, connection, target):
+    # Cover a rename too, since cached entries are tagged with the old username.
+    usernames = [*inspect(target).attrs.username.history.deleted, target.username]
+    for username in usernames:
+        invalidate_user(username)
+    invalidation.publish_on_connection(connection, "principals", usernames)
+
+
+# Apply a revocation made by another worker.
+def apply_revocations(jtis):
+    for jti in jtis:
+        revoked_token_filter.add(jti)
+        principal_cache.invalidate_tag(f"jti:{jti}")
+
+
+# While the bus is down, check every token against the database; once it is back, rebuild
+# the filter to pick up the revocations that were missed.
+async def resync_revoked_tokens(connected):
+    global revoked_token_filter_synced
+    if not connected:
+        revoked_token_filter_synced = False
+        return
+    async with session_scope() as db:
+        await load_revoked_tokens(db)
+    revoked_token_filter_synced = True
+
+
+invalidation.subscribe("principals", lambda usernames: [invalidate_user(username) for username in usernames])
+invalidation.subscribe("revoked", apply_revocations)
+invalidation.on_state_change(resync_revoked_tokens)
+invalidation.degrade_with_bus(principal_cache)
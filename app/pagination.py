@@ -0,0 +1,72 @@
+import base64
+import json
+from typing import Optional
+
+from fastapi import HTTPException, Query, status
+
+# Default and maximum number of items returned in a single page
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+# Query parameters accepted by every paginated collection endpoint.
+class PageParams:
+    def __init__(self, cursor: Optional[str] = None,
+                 limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE)):
+        self.cursor = cursor
+        self.limit = limit
+
+
+# Encode the key of the last item on a page as an opaque cursor string.
+def encode_cursor(last_key: int) -> str:
+    raw = json.dumps({"k": last_key}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+# Decode a cursor back into the key to continue after.
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        last_key = json.loads(base64.urlsafe_b64decode(padded))["k"]
+    except (ValueError, KeyError, TypeError):
+        last_key = None
+
+    # Reject anything that isn't a cursor we issued
+    if not isinstance(last_key, int):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail="Invalid pagination cursor")
+    return last_key
+
+
+# Restrict a statement to the rows of one page, plus one extra row to find out whether there is a next page.
+def _page_window(statement, key_column, page: PageParams):
+    if page.cursor is not None:
+        statement = statement.where(key_column > decode_cursor(page.cursor))
+    return statement.order_by(key_column).limit(page.limit + 1)
+
+
+# Run a keyset-paginated query ordered by key_column (a unique, indexed column).
+# Rows after the cursor are found with an index range scan, so every page costs the same.
+# statement selects ORM entities, or, with projection, is built from projection.select()
+# and the items are dicts (see loaders.Projection).
+# Returns the page envelope expected by schemas.Page.
+async def paginate(db, statement, key_column, page: PageParams, projection=None):
+    window = _page_window(statement, key_column, page)
+    if projection is None:
+        items = (await db.scalars(window)).all()
+    else:
+        items = await projection.all(db, window)
+
+    next_cursor = None
+    if len(items) > page.limit:
+        items = items[:page.limit]
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, key_column.key) if projection is None else last[key_column.key])
+
+    return {"items": items, "next_cursor": next_cursor}
+
+
+# Versions of the rows the same page would contain, for building an ETag.
+# statement selects narrow columns only (e.g. the key and updated_at), so no full rows are loaded.
+async def page_versions(db, statement, key_column, page: PageParams):
+    return [tuple(row) for row in await db.execute(_page_window(statement, key_column, page))]
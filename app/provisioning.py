@@ -0,0 +1,233 @@
+import asyncio
+import csv
+import io
+import sys
+from collections import defaultdict
+
+import orjson
+from pydantic import ValidationError
+from sqlalchemy import ARRAY, Integer, String, any_, bindparam, delete, func, literal, or_, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from . import models, schemas, utils
+from .database import async_engine, session_scope
+from .response_cache import response_cache
+
+# Bulk user provisioning from a roster, used by POST /users/bulk and by the command line:
+#     python -m app.provisioning roster.csv      (or roster.json)
+# Rows are validated one by one and checked for uniqueness set-wise (one query for the whole
+# roster), passwords are hashed across every core, and the users are written with multi-row
+# INSERTs in a single transaction. Rows that can't be created are reported, not fatal.
+#
+# Bulk enrollment works the same way, used by POST /courses/{course_id}/roster and by
+#     python -m app.provisioning --enrollments enrollments.csv     (course_id,student header)
+
+
+# Parse a roster: a JSON array of user objects, or CSV with a username,password,email,role header.
+def parse_roster(body: bytes, is_csv: bool):
+    if is_csv:
+        return list(csv.DictReader(io.StringIO(body.decode("utf-8-sig"))))
+
+    rows = orjson.loads(body)
+    if not isinstance(rows, list):
+        raise ValueError("Expected a JSON array of users")
+    return rows
+
+
+def _error(row, detail):
+    return {"row": row, "detail": detail}
+
+
+def _validation_detail(error: ValidationError):
+    return "; ".join(f"{'.'.join(str(part) for part in problem['loc']) or 'row'}: {problem['msg']}"
+                     for problem in error.errors())
+
+
+# Create the users in rows (dicts). Returns the report expected by schemas.BulkUserResponseData.
+# first_row numbers the rows in the report when rows is one batch of a larger roster.
+async def provision_users(db, rows, first_row=1):
+    errors = []
+
+    # Validate every row against the same schema as POST /users
+    users = []
+    for number, row in enumerate(rows, start=first_row):
+        try:
+            users.append((number, schemas.UserCreate.model_validate(row)))
+        except ValidationError as error:
+            errors.append(_error(number, _validation_detail(error)))
+
+    # Drop later rows repeating a username or email already seen in the roster
+    seen_usernames, seen_emails, unique_users = set(), set(), []
+    for number, user in users:
+        if user.username in seen_usernames or user.email in seen_emails:
+            errors.append(_error(number, "Duplicate username or email in the roster"))
+            continue
+        seen_usernames.add(user.username)
+        seen_emails.add(user.email)
+        unique_users.append((number, user))
+
+    # Find the usernames and emails already taken with one query (each list is a single array parameter)
+    taken = (await db.execute(
+        select(models.User.username, models.User.email).where(or_(
+            models.User.username == any_(bindparam("usernames", list(seen_usernames), type_=ARRAY(String))),
+            models.User.email == any_(bindparam("emails", list(seen_emails), type_=ARRAY(String))),
+        ))
+    )).all()
+    taken_usernames = {username for username, _ in taken}
+    taken_emails = {email for _, email in taken}
+
+    new_users = []
+    for number, user in unique_users:
+        if user.username in taken_usernames or user.email in taken_emails:
+            errors.append(_error(number, f"User {user.username} or email {user.email} already exists"))
+        else:
+            new_users.append((number, user))
+
+    # End the read transaction so no connection is held while the passwords are hashed
+    await db.commit()
+    hashes = await utils.hash_passwords_bulk([user.password for _, user in new_users])
+
+    # Insert everything in one transaction; SQLAlchemy sends the rows as multi-row INSERT ... VALUES
+    # statements. A user created concurrently since the check above is skipped by ON CONFLICT.
+    created = set()
+    if new_users:
+        created = set(await db.scalars(
+            pg_insert(models.User).on_conflict_do_nothing().returning(models.User.username),
+            [dict(user.model_dump(), password=hashed) for (_, user), hashed in zip(new_users, hashes)],
+        ))
+        await db.commit()
+
+    for number, user in new_users:
+        if user.username not in created:
+            errors.append(_error(number, f"User {user.username} or email {user.email} already exists"))
+
+    errors.sort(key=lambda error: error["row"])
+    return {"created": len(created), "errors": errors}
+
+
+# Enroll students (usernames or emails, in roster order) in an existing course.
+# Students are resolved with one query and enrolled with one INSERT ... SELECT unnest(...), so the
+# cost doesn't grow with round-trips. When the roster needs more seats than are left, the
+# students listed first get them. Returns the report expected by schemas.RosterEnrollmentResponseData.
+async def enroll_students(db, course_id, students):
+    # Resolve every username/email to a user ID
+    identifiers = bindparam("identifiers", list(set(students)), type_=ARRAY(String))
+    user_ids = {}
+    for user_id, username, email in await db.execute(
+        select(models.User.user_id, models.User.username, models.User.email)
+        .where(or_(models.User.username == any_(identifiers), models.User.email == any_(identifiers)))
+    ):
+        user_ids[username] = user_id
+        user_ids[email] = user_id
+
+    # Keep each student once, in roster order, remembering the entry they were listed as
+    not_found, listed_as = [], {}
+    for student in students:
+        user_id = user_ids.get(student)
+        if user_id is None:
+            not_found.append(student)
+        elif user_id not in listed_as:
+            listed_as[user_id] = student
+
+    # Insert every enrollment in one statement; the unique (student_fkey, course_fkey) index skips
+    # students already enrolled. Rows go in user ID order so concurrent imports lock keys in the same order.
+    inserted = set(await db.scalars(
+        pg_insert(models.Enrollment)
+        .from_select(
+            ["student_fkey", "course_fkey", "enrollment_message"],
+            select(func.unnest(bindparam("user_ids", sorted(listed_as), type_=ARRAY(Integer))),
+                   literal(course_id), literal(models.Enrollment.enrollment_message.default.arg)),
+        )
+        .on_conflict_do_nothing(index_elements=[models.Enrollment.student_fkey, models.Enrollment.course_fkey])
+        .returning(models.Enrollment.student_fkey)
+    ))
+
+    # Then lock the course, in the same order as the single enrollment route (enrollment first,
+    # then the course row), and keep as many new enrollments as there are free seats
+    seats_taken, capacity = (await db.execute(
+        select(models.Course.seats_taken, models.Course.course_capacity)
+        .where(models.Course.course_id == course_id)
+        .with_for_update()
+    )).one()
+    new_students = [user_id for user_id in listed_as if user_id in inserted]
+    admitted = max(0, min(len(new_students), capacity - seats_taken))
+    surplus = new_students[admitted:]
+
+    if surplus:
+        await db.execute(
+            delete(models.Enrollment)
+            .where((models.Enrollment.course_fkey == course_id)
+                   & (models.Enrollment.student_fkey == any_(bindparam("surplus", surplus, type_=ARRAY(Integer)))))
+            .execution_options(synchronize_session=False)
+        )
+    await db.execute(
+        update(models.Course)
+        .where(models.Course.course_id == course_id)
+        .values(seats_taken=models.Course.seats_taken + admitted)
+        .execution_options(synchronize_session=False)
+    )
+    await response_cache.commit_and_invalidate(db, f"course:{course_id}")
+
+    return {
+        "course_id": course_id,
+        "enrolled": admitted,
+        "already_enrolled": [student for user_id, student in listed_as.items() if user_id not in inserted],
+        "not_found": not_found,
+        "over_capacity": [listed_as[user_id] for user_id in surplus],
+        "seats_taken": seats_taken + admitted,
+    }
+
+
+# Enroll the students of a course_id,student CSV, one course (and transaction) at a time.
+async def _enroll_file(path):
+    with open(path, "rb") as roster:
+        rows = parse_roster(roster.read(), is_csv=True)
+
+    students_by_course = defaultdict(list)
+    for row in rows:
+        students_by_course[int(row["course_id"])].append(row["student"])
+
+    try:
+        async with session_scope() as db:
+            existing = set(await db.scalars(
+                select(models.Course.course_id)
+                .where(models.Course.course_id == any_(bindparam("course_ids", list(students_by_course), type_=ARRAY(Integer))))
+            ))
+            reports = []
+            for course_id, students in students_by_course.items():
+                if course_id not in existing:
+                    print(f"Course with ID: {course_id} not found❌")
+                    continue
+                reports.append(await enroll_students(db, course_id, students))
+            return reports
+    finally:
+        if async_engine is not None:
+            await async_engine.dispose()
+
+
+async def _provision_file(path):
+    with open(path, "rb") as roster:
+        rows = parse_roster(roster.read(), is_csv=path.lower().endswith(".csv"))
+    try:
+        async with session_scope() as db:
+            return await provision_users(db, rows)
+    finally:
+        if async_engine is not None:
+            await async_engine.dispose()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "--enrollments":
+        for report in asyncio.run(_enroll_file(sys.argv[2])):
+            print(f"Course {report['course_id']}: enrolled {report['enrolled']}, "
+                  f"already enrolled {len(report['already_enrolled'])}, not found {len(report['not_found'])}, "
+                  f"over capacity {len(report['over_capacity'])}")
+        sys.exit()
+
+    if len(sys.argv) != 2:
+        sys.exit("usage: python -m app.provisioning ROSTER.csv|ROSTER.json\n"
+                 "       python -m app.provisioning --enrollments ENROLLMENTS.csv")
+    report = asyncio.run(_provision_file(sys.argv[1]))
+    for error in report["errors"]:
+        print(f"row {error['row']}: {error['detail']}❌")
+    print(f"Created {report['created']} users, {len(report['errors'])} rows failed")
@@ -0,0 +1,179 @@
+from typing import NamedTuple
+
+from fastapi import Request, Response
+
+from . import etags, invalidation, serializers
+from .cache import TTLCache
+from .config import app_settings
+
+
+# A cached response: the serialized JSON body and the ETag it was served with.
+class CachedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+
+# In-process backend: one LRU per worker, kept coherent with the others through the invalidation bus.
+class MemoryBackend:
+    shared = False
+
+    def __init__(self, max_entries, ttl):
+        self.entries = TTLCache("responses", max_entries, ttl,
+                                sizeof=lambda cached: len(cached.body) + len(cached.etag))
+        self._generation = 0
+
+    async def get(self, key):
+        return self.entries.get(key)
+
+    async def set(self, key, cached, tags):
+        self.entries.set(key, cached, tags=tags)
+
+    async def invalidate_tags(self, tags):
+        self.invalidate_tags_now(tags)
+
+    # Synchronous form, for events arriving from other workers.
+    def invalidate_tags_now(self, tags):
+        self._generation += 1
+        for tag in tags:
+            self.entries.invalidate_tag(tag)
+
+    async def generation(self):
+        return self._generation
+
+    async def clear(self):
+        self._generation += 1
+        self.entries.clear()
+
+    async def stats(self):
+        return self.entries.stats()
+
+
+# Shared backend: every worker reads and invalidates the same Redis keys, so no bus events are needed.
+# Each tag is a Redis set holding the keys of the entries carrying it.
+class RedisBackend:
+    shared = True
+
+    def __init__(self, url, ttl, prefix="responses:"):
+        # Optional dependency, only needed when RESPONSE_CACHE_URL is set
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+        self.hits = 0
+        self.misses = 0
+
+    async def get(self, key):
+        raw = await self.client.hmget(self.prefix + key, "body", "etag")
+        if raw[0] is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return CachedResponse(raw[0], raw[1].decode())
+
+    async def set(self, key, cached, tags):
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.hset(self.prefix + key, mapping={"body": cached.body, "etag": cached.etag})
+            pipe.expire(self.prefix + key, self.ttl)
+            for tag in tags:
+                pipe.sadd(self.prefix + "tag:" + tag, key)
+                # A tag set only needs to outlive the entries it points at
+                pipe.expire(self.prefix + "tag:" + tag, self.ttl)
+            await pipe.execute()
+
+    async def invalidate_tags(self, tags):
+        tag_keys = [self.prefix + "tag:" + tag for tag in tags]
+        async with self.client.pipeline(transaction=True) as pipe:
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            members = await pipe.execute()
+
+        keys = {self.prefix + key.decode() for keys in members for key in keys}
+        async with self.client.pipeline(transaction=True) as pipe:
+            pipe.incr(self.prefix + "generation")
+            pipe.delete(*tag_keys, *keys)
+            await pipe.execute()
+
+    async def generation(self):
+        return int(await self.client.get(self.prefix + "generation") or 0)
+
+    async def clear(self):
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+    async def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "name": "responses",
+            "entries": None,
+            "max_entries": None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "evictions": None,
+            "memory_bytes": (await self.client.info("memory"))["used_memory"],
+        }
+
+
+# Cache of fully serialized responses for the public catalog endpoints. A hit is answered
+# from stored bytes without touching the database, SQLAlchemy or Pydantic.
+# Entries are tagged with the rows they were built from, e.g. "course:3", "lesson:12", or
+# "courses" for a collection that grows, and the write routes invalidate those tags.
+class ResponseCache:
+    def __init__(self, backend):
+        self.backend = backend
+
+    # Requests differing only in parameter order share an entry.
+    def key(self, request: Request):
+        return request.url.path + "?" + "&".join(f"{name}={value}" for name, value in sorted(request.query_params.multi_items()))
+
+    # Answer the request from the cache (200 with the stored body, or 304), or return None on a miss.
+    async def lookup(self, request: Request, cache_control: str):
+        cached = await self.backend.get(self.key(request))
+        if cached is None:
+            # Note the invalidation generation, so a write racing this request isn't overwritten by stale data
+            request.state.response_cache_generation = await self.backend.generation()
+            return None
+        if etags.matches(request, cached.etag):
+            return etags.not_modified(cached.etag, cache_control)
+        return self._response(cached, cache_control)
+
+    # Serialize data with response_model, cache it under tags and return it as the response.
+    # Without an etag from row versions, the ETag is derived from the body itself.
+    async def store(self, request: Request, response_model, data, cache_control: str, tags, etag=None):
+        body = serializers.dump_json(response_model, data)
+        cached = CachedResponse(body, etag or etags.make_etag(body))
+
+        # Skip the store if anything was invalidated since lookup(); the data may predate that write
+        if await self.backend.generation() == request.state.response_cache_generation:
+            await self.backend.set(self.key(request), cached, tags)
+        return self._response(cached, cache_control)
+
+    # Drop every entry built from the given rows/collections (called after a write commits).
+    async def invalidate(self, *tags):
+        await self.backend.invalidate_tags(tags)
+
+    # Commit db's transaction and drop every entry built from the given rows/collections, in this
+    # worker right away and in the other workers through the invalidation bus.
+    async def commit_and_invalidate(self, db, *tags):
+        if not self.backend.shared:
+            await invalidation.publish(db, "responses", tags)
+        await db.commit()
+        await self.invalidate(*tags)
+
+    async def stats(self):
+        return await self.backend.stats()
+
+    def _response(self, cached: CachedResponse, cache_control: str):
+        return Response(content=cached.body, media_type="application/json",
+                        headers={"ETag": cached.etag, "Cache-Control": cache_control})
+
+
+if app_settings.RESPONSE_CACHE_URL:
+    response_cache = ResponseCache(RedisBackend(app_settings.RESPONSE_CACHE_URL, app_settings.RESPONSE_CACHE_TTL))
+else:
+    response_cache = ResponseCache(MemoryBackend(app_settings.RESPONSE_CACHE_SIZE, app_settings.RESPONSE_CACHE_TTL))
+
+    # Apply invalidations published by other workers
+    invalidation.subscribe("responses", response_cache.backend.invalidate_tags_now)
+    invalidation.degrade_with_bus(response_cache.backend.entries)
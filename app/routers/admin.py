@@ -0,0 +1,52 @@
+from typing import List
+from anyio import to_thread
+from fastapi import Depends, HTTPException, APIRouter, status
+
+from .. import schemas, oauth2
+from ..config import app_settings
+from ..database import active_engine
+from ..response_cache import response_cache
+
+router = APIRouter(
+    prefix='/admin'
+)
+
+
+# Dependency that only lets admin users through.
+async def require_admin(current_user: dict = Depends(oauth2.get_current_user)):
+    if current_user.role != 'admin':
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail="Only admins are allowed to access this resource")
+    return current_user
+
+
+########################### 🛠️ CONNECTION POOL STATS [ READ ] ###########################
+# Report live connection pool and threadpool usage for the engine serving requests.
+@router.get("/pool", response_model=schemas.PoolStatsResponseData)
+async def pool_stats(current_user: dict = Depends(require_admin)):
+    pool = active_engine.pool
+    wait_stats = pool.wait_stats
+    limiter = to_thread.current_default_thread_limiter()
+
+    return {
+        "driver": active_engine.dialect.driver,
+        "pool_size": pool.size(),
+        "max_overflow": app_settings.DATABASE_MAX_OVERFLOW,
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        # QueuePool reports overflow relative to pool_size, so clamp the idle case to zero
+        "overflow": max(pool.overflow(), 0),
+        "checkouts": wait_stats.checkouts,
+        "timeouts": wait_stats.timeouts,
+        "avg_wait_ms": wait_stats.total_wait / wait_stats.checkouts * 1000 if wait_stats.checkouts else 0.0,
+        "max_wait_ms": wait_stats.max_wait * 1000,
+        "threadpool_limit": int(limiter.total_tokens),
+        "threadpool_borrowed": limiter.borrowed_tokens,
+    }
+
+
+########################### 🛠️ CACHE STATS [ READ ] ###########################
+# Report hit ratio and size of this worker's caches.
+@router.get("/caches", response_model=List[schemas.CacheStatsResponseData])
+async def cache_stats(current_user: dict = Depends(require_admin)):
+    return [oauth2.principal_cache.stats(), await response_cache.stats()]
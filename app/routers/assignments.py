@@ -1,21 +1,64 @@
-from typing import List
-from fastapi import Depends, APIRouter
-from sqlalchemy.orm import Session
-from sqlalchemy import asc
+from typing import Optional
 
-from .. import models, schemas
+from fastapi import Depends, APIRouter, Request
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models, schemas, loaders, etags
 from ..database import get_db
+from ..pagination import PageParams, page_versions, paginate
+from ..response_cache import response_cache
 
 router = APIRouter(
     prefix='/assignments'
 )
 
 ###########################  📝 GET ALL ASSIGNMENTS [ READ ] ###########################
-# Define a route to handle HTTP GET requests for retrieving all assignments
-@router.get("/", response_model=List[schemas.AssignmentResponseData])
-def get_assignments(db: Session = Depends(get_db)):
-    # Retrieve all assignments from the database
-    assignments = db.query(models.Assignment).order_by(asc(models.Assignment.assignment_id)).all()
+# Define a route to handle HTTP GET requests for retrieving all assignments, optionally only those due
+# in a window: due_after <= due_date < due_before (either bound can be left out)
+@router.get("/", response_model=schemas.Page[schemas.AssignmentResponseData])
+async def get_assignments(request: Request, due_after: Optional[schemas.UTCDatetime] = None,
+                          due_before: Optional[schemas.UTCDatetime] = None,
+                          page: PageParams = Depends(), db: AsyncSession = Depends(get_db)):
+    # Serve the response straight from the response cache when possible.
+    cached = await response_cache.lookup(request, etags.PUBLIC)
+    if cached is not None:
+        return cached
+
+    # Assignments due in the window: a range scan of the due date index
+    def due(statement):
+        if due_after is not None:
+            statement = statement.where(models.Assignment.due_date >= due_after)
+        if due_before is not None:
+            statement = statement.where(models.Assignment.due_date < due_before)
+        return statement
+
+    # Version the page by its assignments and the course summary embedded in each, and answer 304
+    # if the client has it already.
+    versions = await page_versions(
+        db,
+        due(select(models.Assignment.assignment_id, func.greatest(models.Assignment.updated_at, models.Course.updated_at))
+            .join(models.Assignment.course_info)),
+        models.Assignment.assignment_id,
+        page,
+    )
+    etag = etags.make_etag(versions)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag, etags.PUBLIC)
+
+    # Retrieve a page of assignments from the database, ordered by assignment ID
+    assignments = await paginate(
+        db,
+        due(loaders.ASSIGNMENT_COLUMNS.select()),
+        models.Assignment.assignment_id,
+        page,
+        projection=loaders.ASSIGNMENT_COLUMNS,
+    )
     
-    # Return the list of assignments as a response
-    return assignments
+    # Return the page of assignments as a response, caching it under every assignment and course it shows
+    return await response_cache.store(
+        request, schemas.Page[schemas.AssignmentResponseData], assignments, etags.PUBLIC, etag=etag,
+        tags=("assignments", *(tag for assignment in assignments["items"]
+                               for tag in (f"assignment:{assignment['assignment_id']}",
+                                           f"course:{assignment['course_info']['course_id']}"))),
+    )
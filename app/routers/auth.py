@@ -1,5 +1,7 @@
+import uuid
 from fastapi import Depends, Response, HTTPException, APIRouter, status
-from sqlalchemy.orm import Session
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi.security import OAuth2PasswordRequestForm
 from .. import models, schemas, oauth2, utils
 from ..database import get_db
@@ -10,23 +12,74 @@ router = APIRouter(
 
 ########################### LOGIN USER [ CREATE ] ###########################
 @router.post("/", response_model=schemas.Token)
-def login_user(user_credentials: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(models.User).filter(models.User.email == user_credentials.username).first()
+async def login_user(user_credentials: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = await db.scalar(select(models.User).where(models.User.email == user_credentials.username))
 
     # Check if the user exists. If not, raise a 403 Forbidden HTTPException.
     if not user:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, 
                             detail=f"Invalid Credential")
+
+    # End the read transaction so no pooled connection is held while bcrypt runs.
+    await db.commit()
     
-    # Verify the user's password against the stored hashed password.
+    # Verify the user's password against the stored hashed password in the password pool.
     # If the password is invalid, raise a 403 Forbidden HTTPException.
-    if not utils.verify_password(user_credentials.password, user.password):
+    password_valid, new_hash = await utils.verify_and_update_password_async(user_credentials.password, user.password)
+    if not password_valid:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, 
                             detail=f"Invalid Credential")
 
+    # If the stored hash was made with outdated cost parameters, replace it now that we know the password.
+    if new_hash is not None:
+        await db.execute(
+            update(models.User)
+            .where(models.User.user_id == user.user_id)
+            .values(password=new_hash)
+            .execution_options(synchronize_session=False)
+        )
+
     # If the user is authenticated, create an access token for them.
     # The access token is based on the user's username and will be used for future API requests.
-    access_token = oauth2.create_access_token(data={"username": user.username})
+    # The session id ties the access token to this login's refresh tokens, so logout can revoke both.
+    session_id = uuid.uuid4()
+    access_token = oauth2.create_access_token(data={"username": user.username, "sid": str(session_id)})
+
+    # Start a new refresh token family for this login, clearing out the user's expired tokens.
+    await oauth2.prune_refresh_tokens(db, user.user_id)
+    refresh_token = await oauth2.create_refresh_token(db, user.user_id, session_id)
+    await db.commit()
     
-    # Return the access token along with the token type.
-    return {"access_token": access_token, "token_type": "bearer"}
+    # Return the access and refresh tokens along with the token type.
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+
+########################### REFRESH ACCESS TOKEN [ CREATE ] ###########################
+# Exchange a refresh token for a new access token without a password check.
+# The refresh token is single use: the response carries its replacement.
+@router.post("/refresh", response_model=schemas.Token)
+async def refresh_login(refresh_data: schemas.RefreshTokenRequest, db: AsyncSession = Depends(get_db)):
+    # Revoke the presented refresh token and issue its replacement (401 if it's not usable).
+    username, session_id, refresh_token = await oauth2.rotate_refresh_token(db, refresh_data.refresh_token)
+
+    # Create a fresh access token for the same user and login session.
+    access_token = oauth2.create_access_token(data={"username": username, "sid": str(session_id)})
+
+    # Return the access and refresh tokens along with the token type.
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer"}
+
+
+########################### LOGOUT USER [ DELETE ] ###########################
+# Revoke the access token used for this request, along with the refresh tokens from the same login.
+@router.delete("/", status_code=status.HTTP_204_NO_CONTENT)
+async def logout_user(token: str = Depends(oauth2.oauth2_scheme), db: AsyncSession = Depends(get_db),
+                      current_user: dict = Depends(oauth2.get_current_user)):
+    # Read the token's claims (jti and session id) to know what to revoke.
+    credentials_exception = HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                                          detail="Could not validate credentials",
+                                          headers={"WWW-Authenticate": "Bearer"})
+    token_data = oauth2.verify_access_token(token, credentials_exception)
+    await oauth2.revoke_access_token(db, token, token_data)
+
+    # Return a 204 No Content response.
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
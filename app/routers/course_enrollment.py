@@ -1,9 +1,11 @@
-from typing import List
 from fastapi import Depends, Response, HTTPException, APIRouter, status
-from sqlalchemy.orm import Session
+from sqlalchemy import delete, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import models, schemas, oauth2
+from .. import models, schemas, oauth2, loaders, serializers
 from ..database import get_db
+from ..pagination import PageParams, paginate
+from ..response_cache import response_cache
 
 router = APIRouter(
     prefix='/my-courses'
@@ -11,25 +13,35 @@ router = APIRouter(
 
 ########################### 🔵 STUDENT ENROLLED COURSES [ READ ] ###########################
 # Define a GET route to retrieve a list of student enrolled courses
-@router.get("/", response_model=List[schemas.StudentEnrolledCourseResponseData])
-def all_enrollments(db: Session = Depends(get_db), 
+@router.get("/", response_model=schemas.Page[schemas.StudentEnrolledCourseResponseData])
+async def all_enrollments(page: PageParams = Depends(), db: AsyncSession = Depends(get_db), 
                     current_user: dict = Depends(oauth2.get_current_user)):
 
-    # Query the database to retrieve all enrollments for the current user
-    enrollment = db.query(models.Enrollment).filter(models.Enrollment.student_fkey == current_user.user_id).all()
+    # Query the database to retrieve a page of enrollments for the current user
+    enrollment = await paginate(
+        db,
+        loaders.STUDENT_ENROLLED_COLUMNS.select().where(models.Enrollment.student_fkey == current_user.user_id),
+        models.Enrollment.enrollment_id,
+        page,
+        projection=loaders.STUDENT_ENROLLED_COLUMNS,
+    )
     
-    # Return the list of enrollments as a response
-    return enrollment
+    # Return the page of enrollments as a response, serialized with the prebuilt adapter
+    return serializers.json_response(schemas.Page[schemas.StudentEnrolledCourseResponseData], enrollment)
 
 
 ########################### 🔵 STUDENT ENROLLED COURSES ENROLLMENT BY ID [ READ ] ###########################
 # This endpoint allows retrieval of enrollment details for a specific course by its ID.
 @router.get("/{enrollment_id}", response_model=schemas.EnrollmentResponseData)
-def get_enrollment(enrollment_id: int, db: Session = Depends(get_db), 
+async def get_enrollment(enrollment_id: int, db: AsyncSession = Depends(get_db), 
                     current_user: dict = Depends(oauth2.get_current_user)):
 
     # Query the database to find the enrollment record with the given ID.
-    enrollment = db.query(models.Enrollment).filter(models.Enrollment.enrollment_id == enrollment_id).first()
+    enrollment = await db.scalar(
+        select(models.Enrollment)
+        .options(*loaders.ENROLLMENT_RESPONSE)
+        .where(models.Enrollment.enrollment_id == enrollment_id)
+    )
 
     # Check if the enrollment record exists.
     if enrollment is None:
@@ -38,7 +50,7 @@ def get_enrollment(enrollment_id: int, db: Session = Depends(get_db),
                             detail=f"Course Enrollment with ID: {enrollment_id} is not found")
     
     # Check if the current user is the owner of this enrollment.
-    if current_user.user_id != enrollment.student_info.user_id:
+    if current_user.user_id != enrollment.student_fkey:
         # If the current user is not the owner, raise a 403 Forbidden error.
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, 
                             detail="Your view of courses is limited to those that you have enrolled in")
@@ -49,14 +61,11 @@ def get_enrollment(enrollment_id: int, db: Session = Depends(get_db),
 
 ########################### 🔵 DELETE COURSE ENROLLMENT BY ID [ DELETE ] ❌ ###########################
 @router.delete("/{enrollment_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_course_enrollment(enrollment_id: int, db: Session = Depends(get_db), 
+async def delete_course_enrollment(enrollment_id: int, db: AsyncSession = Depends(get_db), 
                     current_user: dict = Depends(oauth2.get_current_user)):
 
-    # Create a query to retrieve the course enrollment with the specified ID from the database
-    enrollment_query = db.query(models.Enrollment).filter(models.Enrollment.enrollment_id == enrollment_id)
-    
-    # Fetch the enrollment record from the database
-    enrollment = enrollment_query.first()
+    # Fetch the enrollment record with the specified ID from the database
+    enrollment = await db.get(models.Enrollment, enrollment_id)
 
     # Check if the enrollment record exists; if not, raise a 403 Forbidden error
     if enrollment is None:
@@ -64,15 +73,31 @@ def delete_course_enrollment(enrollment_id: int, db: Session = Depends(get_db),
                             detail=f"Course Enrollment with ID: {enrollment_id} is not found")
     
     # Verify if the user attempting to delete the enrollment is the owner of the enrollment
-    if current_user.user_id != enrollment.student_info.user_id:
+    if current_user.user_id != enrollment.student_fkey:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, 
                             detail="You don't have permission to delete this enrollment data")
     
     # Delete the enrollment record from the database (synchronize_session=False for better performance)
-    enrollment_query.delete(synchronize_session=False)
-    
-    # Commit the changes to the database
-    db.commit()
+    course_id = await db.scalar(
+        delete(models.Enrollment)
+        .where(models.Enrollment.enrollment_id == enrollment_id)
+        .returning(models.Enrollment.course_fkey)
+        .execution_options(synchronize_session=False)
+    )
+
+    # Give the seat back, unless a concurrent request already deleted this enrollment
+    if course_id is None:
+        await db.commit()
+    else:
+        await db.execute(
+            update(models.Course)
+            .where(models.Course.course_id == course_id)
+            .values(seats_taken=models.Course.seats_taken - 1)
+            .execution_options(synchronize_session=False)
+        )
+
+        # Commit the changes to the database, then drop the cached responses showing the course's seats taken
+        await response_cache.commit_and_invalidate(db, f"course:{course_id}")
     
     # Return a response indicating a successful deletion with a status code 204 (No Content)
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -1,39 +1,70 @@
-from typing import List
-from fastapi import Depends, Response, HTTPException, APIRouter, status
-from sqlalchemy.orm import Session
+from datetime import date
+from typing import Optional
 
-from .. import models, schemas, oauth2
+from fastapi import Depends, Request, Response, HTTPException, APIRouter, status
+from sqlalchemy import delete, exists, func, literal, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models, schemas, oauth2, loaders, utils, etags, serializers, provisioning
+from ..config import app_settings
 from ..database import get_db
+from ..pagination import PageParams, page_versions, paginate
+from ..response_cache import response_cache
 
 router = APIRouter(
     prefix='/courses'
 )
 
+
+# Load the columns of a course and its lecturer required by CourseResponseData.
+async def _get_course(db: AsyncSession, course_id: int):
+    return await loaders.COURSE_COLUMNS.first(
+        db, loaders.COURSE_COLUMNS.select().where(models.Course.course_id == course_id)
+    )
+
+
+# Load the columns of a lesson and its course summary required by LessonResponseData.
+async def _get_lesson(db: AsyncSession, lesson_id: int):
+    return await loaders.LESSON_COLUMNS.first(
+        db, loaders.LESSON_COLUMNS.select().where(models.Lesson.lesson_id == lesson_id)
+    )
+
+
+# Load the columns of an assignment and its course summary required by AssignmentResponseData.
+async def _get_assignment(db: AsyncSession, assignment_id: int):
+    return await loaders.ASSIGNMENT_COLUMNS.first(
+        db, loaders.ASSIGNMENT_COLUMNS.select().where(models.Assignment.assignment_id == assignment_id)
+    )
+
 ########################### 📒 CREATE A NEW COURSE [ CREATE ] ✅ ###########################
 # Define a route for creating a new course using HTTP POST method.
 @router.post("/", response_model=schemas.CourseResponseData, status_code=status.HTTP_201_CREATED)
-def add_course(course_data: schemas.CourseCreate, db: Session = Depends(get_db), 
+async def add_course(course_data: schemas.CourseCreate, db: AsyncSession = Depends(get_db), 
                current_user: dict = Depends(oauth2.get_current_user)):
     
-    # Retrieve a list of existing course names from the database.
-    courses = [course.course_name for course in db.query(models.Course).all()]
-    
-    # Check if the provided course name already exists in the list of courses.
-    if course_data.course_name in courses:
-        # If it exists, raise a Forbidden HTTPException with a message indicating duplication.
-        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, 
-                            detail=f"{course_data.course_name} is already added")
-    
     # Check if the current user has the 'lecturer' role, allowing them to add a new course.
     if current_user.role == 'lecturer':
-        # Create a new course instance with the provided data and the user's ID as the owner.
-        new_course = models.Course(user_role=current_user.user_id, **course_data.model_dump())
-        # Add the new course to the database session.
-        db.add(new_course)
-        # Commit the changes to the database.
-        db.commit()
-        # Refresh the new_course object to ensure it reflects the database state.
-        db.refresh(new_course)
+        # Insert the new course with the user's ID as the owner. The unique index on course_name
+        # rejects duplicates in the same statement, so nothing is returned if the name is taken.
+        course_id = await db.scalar(
+            pg_insert(models.Course)
+            .values(user_role=current_user.user_id, **course_data.model_dump())
+            .on_conflict_do_nothing(index_elements=[models.Course.course_name])
+            .returning(models.Course.course_id)
+        )
+
+        # Check if the provided course name already exists.
+        if course_id is None:
+            # If it exists, raise a Forbidden HTTPException with a message indicating duplication.
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, 
+                                detail=f"{course_data.course_name} is already added")
+
+        # Commit the changes to the database, then drop cached course lists.
+        await response_cache.commit_and_invalidate(db, "courses")
+        # Load the new course with its lecturer so it reflects the database state.
+        new_course = await _get_course(db, course_id)
 
     else:
         # If the current user does not have the 'lecturer' role, raise a Forbidden HTTPException.
@@ -45,14 +76,37 @@ def add_course(course_data: schemas.CourseCreate, db: Session = Depends(get_db),
 
 
 ########################### 📒 GET LIST OF ALL COURSES [ READ ] ###########################
-@router.get("/", response_model=List[schemas.CourseResponseData])
-# Define a GET route to retrieve a list of all courses
-def all_courses(db: Session = Depends(get_db)):
-    # Query the database to retrieve all courses
-    courses = db.query(models.Course).all()
-
-    # Return the list of courses as a response
-    return courses
+@router.get("/", response_model=schemas.Page[schemas.CourseResponseData])
+# Define a GET route to retrieve a page of courses, optionally only those running on a date (?active_on=YYYY-MM-DD)
+async def all_courses(request: Request, active_on: Optional[date] = None, page: PageParams = Depends(),
+                      db: AsyncSession = Depends(get_db)):
+    # Serve the response straight from the response cache when possible.
+    cached = await response_cache.lookup(request, etags.PUBLIC)
+    if cached is not None:
+        return cached
+
+    # Courses running on active_on: a range scan of the (end_date, start_date) index over courses not ended yet
+    def running(statement):
+        if active_on is None:
+            return statement
+        return statement.where((models.Course.end_date >= active_on) & (models.Course.start_date <= active_on))
+
+    # Version the page by its course IDs and update times, and answer 304 if the client has it already
+    versions = await page_versions(db, running(select(models.Course.course_id, models.Course.updated_at)),
+                                   models.Course.course_id, page)
+    etag = etags.make_etag(versions)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag, etags.PUBLIC)
+
+    # Query the database to retrieve a page of courses, ordered by course ID, selecting only the response columns
+    courses = await paginate(db, running(loaders.COURSE_COLUMNS.select()), models.Course.course_id, page,
+                             projection=loaders.COURSE_COLUMNS)
+
+    # Return the page of courses as a response, caching it under every course it shows
+    return await response_cache.store(
+        request, schemas.Page[schemas.CourseResponseData], courses, etags.PUBLIC, etag=etag,
+        tags=("courses", *(f"course:{course['course_id']}" for course in courses["items"])),
+    )
 
 
 ########################### 📒 GET DETAILS OF A SPECIFIC COURSE [ READ ] ###########################
@@ -60,28 +114,40 @@ def all_courses(db: Session = Depends(get_db)):
 # The endpoint takes the 'course_id' as a parameter to identify the course.
 # The 'response_model' is specified to ensure the response follows the defined data schema.
 @router.get("/{course_id}", response_model=schemas.CourseResponseData)
-def get_course(course_id: int, db: Session = Depends(get_db)):
+async def get_course(course_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    # Serve the response straight from the response cache when possible.
+    cached = await response_cache.lookup(request, etags.PUBLIC)
+    if cached is not None:
+        return cached
+
+    # Check the course's version first, and answer 304 if the client has it already.
+    updated_at = await db.scalar(select(models.Course.updated_at).where(models.Course.course_id == course_id))
+    etag = None
+    if updated_at is not None:
+        etag = etags.make_etag(course_id, updated_at)
+        if etags.matches(request, etag):
+            return etags.not_modified(etag, etags.PUBLIC)
     
     # Query the database to retrieve the course with the provided 'course_id'.
-    course = db.query(models.Course).filter(models.Course.course_id == course_id).first()
+    course = await _get_course(db, course_id)
 
     # Check if the course exists in the database. If not, raise an HTTP exception.
     if course is None:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, 
                             detail=f"Course with ID: {course_id} not found")
 
-    # Return the details of the course as the response.
-    return course
+    # Return the details of the course as the response, caching it under the course.
+    return await response_cache.store(request, schemas.CourseResponseData, course, etags.PUBLIC,
+                                      etag=etag, tags=(f"course:{course_id}",))
 
 
 ########################### 📒 UPDATE AN EXISTING COURSE [ UPDATE ] ###########################
 @router.put("/{course_id}", response_model=schemas.CourseResponseData)
-def update_course(course_id: int, course_data: schemas.CourseUpdate, db: Session = Depends(get_db), 
+async def update_course(course_id: int, course_data: schemas.CourseUpdate, db: AsyncSession = Depends(get_db), 
                   current_user: dict = Depends(oauth2.get_current_user)):
     
     # Query the database to find the course with the specified course_id
-    course_query = db.query(models.Course).filter(models.Course.course_id == course_id)
-    course = course_query.first()
+    course = await db.get(models.Course, course_id)
 
     # Check if the course with the given ID exists
     if course is None:
@@ -94,26 +160,39 @@ def update_course(course_id: int, course_data: schemas.CourseUpdate, db: Session
                             detail=f"You don't have permission to update this course")
     
     # Update the course data with the provided changes (excluding unset fields)
-    course_query.update(course_data.model_dump(exclude_unset=True), synchronize_session=False)
-
-    # Commit the changes to the database
-    db.commit()
+    course_values = course_data.model_dump(exclude_unset=True)
+    try:
+        await db.execute(
+            update(models.Course)
+            .where(models.Course.course_id == course_id)
+            .values(**course_values)
+            .execution_options(synchronize_session=False)
+        )
+    except IntegrityError as error:
+        # The unique index on course_name rejects a name another course already has
+        if not utils.is_unique_violation(error):
+            raise
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail=f"{course_values['course_name']} is already added")
 
-    # Refresh the course object to reflect the updated data
-    db.refresh(course_query.first())
+    # Commit the changes to the database, then drop every cached response showing this course.
+    # New dates can also move the course into lists filtered by date (?active_on=), which aren't tagged with it.
+    tags = [f"course:{course_id}"]
+    if "start_date" in course_values or "end_date" in course_values:
+        tags.append("courses")
+    await response_cache.commit_and_invalidate(db, *tags)
 
-    # Return the updated course data
-    return course_query.first()
+    # Reload the course object to reflect the updated data and return it
+    return await _get_course(db, course_id)
 
 
 ########################### 📒 DELETE A COURSE [ DELETE ] ❌ ###########################
 # This endpoint handles the deletion of a course based on its unique course_id.
 @router.delete("/{course_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_course(course_id: int, db: Session = Depends(get_db), 
+async def delete_course(course_id: int, db: AsyncSession = Depends(get_db), 
                   current_user: dict = Depends(oauth2.get_current_user)):
     # Query the database to find the course with the specified course_id.
-    course_query = db.query(models.Course).filter(models.Course.course_id == course_id)
-    course = course_query.first()
+    course = await db.get(models.Course, course_id)
 
     # If the course is not found, raise a 403 Forbidden HTTP exception.
     if course is None:
@@ -127,8 +206,15 @@ def delete_course(course_id: int, db: Session = Depends(get_db),
                             detail=f"You don't have permission to delete this course")
     
     # Delete the course from the database without synchronizing the session.
-    course_query.delete(synchronize_session=False)
-    db.commit()
+    await db.execute(
+        delete(models.Course)
+        .where(models.Course.course_id == course_id)
+        .execution_options(synchronize_session=False)
+    )
+
+    # Commit, then drop every cached response showing the course; its lessons and assignments
+    # went with it, and responses showing them are tagged with the course too.
+    await response_cache.commit_and_invalidate(db, f"course:{course_id}")
 
     # Return a successful response with a status code of 204 (No Content) to indicate successful deletion.
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -140,43 +226,95 @@ def delete_course(course_id: int, db: Session = Depends(get_db),
 ########################### ENROLL IN A COURSE ###########################
 ########################### 🔵 ENROLL IN A COURSE [ CREATE ] ✅ ###########################
 @router.post("/{course_id}/enroll", response_model=schemas.EnrollmentResponseData)
-def course_enrollment(course_id: int, db: Session = Depends(get_db), 
+async def course_enrollment(course_id: int, db: AsyncSession = Depends(get_db), 
                       current_user: dict = Depends(oauth2.get_current_user)):
 
-    # Check if the course exists in the database
-    course = db.query(models.Course).filter(models.Course.course_id == course_id).first()
-    if not course:
-        # If the course is not found, raise an HTTP exception with a 403 status code and a relevant error message
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail=f"Course with ID: {course_id} is not found"
+    # Create the enrollment in a single statement. Selecting from courses makes a missing course
+    # insert nothing, and the unique (student_fkey, course_fkey) index makes a repeat enrollment
+    # insert nothing, even when several requests race.
+    enrollment_id = await db.scalar(
+        pg_insert(models.Enrollment)
+        .from_select(
+            ["student_fkey", "course_fkey"],
+            select(literal(current_user.user_id), models.Course.course_id).where(models.Course.course_id == course_id),
         )
+        .on_conflict_do_nothing(index_elements=[models.Enrollment.student_fkey, models.Enrollment.course_fkey])
+        .returning(models.Enrollment.enrollment_id)
+    )
+
+    if enrollment_id is None:
+        # Nothing was inserted; find out whether the course is missing or the user is already enrolled
+        if await db.get(models.Course, course_id) is None:
+            # If the course is not found, raise an HTTP exception with a 403 status code and a relevant error message
+            raise HTTPException(
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail=f"Course with ID: {course_id} is not found"
+            )
 
-    # Check if the user is already enrolled in this course
-    enrolled_courses = [enrollment.course_info.course_name for enrollment in db.query(models.Enrollment).filter(models.Enrollment.student_fkey == current_user.user_id).all()]
-    if course.course_name in enrolled_courses:
         # If the user is already enrolled in the course, raise an HTTP exception with a 403 status code and a relevant error message
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"You've already enrolled in this course."
         )
 
-    # Create a new enrollment record for the user and the selected course
-    enrollment = models.Enrollment(
-        student_fkey=current_user.user_id,
-        course_fkey=course_id,
+    # Reserve a seat. The conditional UPDATE locks the course row, so concurrent enrollments
+    # are checked one at a time against the capacity and can't overbook the course.
+    seat_reserved = await db.scalar(
+        update(models.Course)
+        .where((models.Course.course_id == course_id) & (models.Course.seats_taken < models.Course.course_capacity))
+        .values(seats_taken=models.Course.seats_taken + 1)
+        .returning(models.Course.course_id)
+        .execution_options(synchronize_session=False)
     )
+    if seat_reserved is None:
+        # The course is full; undo the enrollment inserted above
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Course with ID: {course_id} is full"
+        )
 
-    # Add the new enrollment record to the database, commit the transaction, and refresh the enrollment object
-    db.add(enrollment)
-    db.commit()
-    db.refresh(enrollment)
+    # Load the new enrollment with everything EnrollmentResponseData needs in one query, then commit
+    # and drop the cached responses showing the course's seats taken
+    enrollment = await db.scalar(
+        select(models.Enrollment)
+        .options(*loaders.ENROLLMENT_RESPONSE)
+        .where(models.Enrollment.enrollment_id == enrollment_id)
+    )
+    await response_cache.commit_and_invalidate(db, f"course:{course_id}")
 
     # Return the newly created enrollment record as a response
     return enrollment
 
 
 
+########################### 🔵 ENROLL A ROSTER IN A COURSE [ CREATE ] ✅ ###########################
+# Lets the course's lecturer (or an admin) enroll a whole class at once, by usernames or emails.
+@router.post("/{course_id}/roster", response_model=schemas.RosterEnrollmentResponseData)
+async def enroll_roster(course_id: int, roster: schemas.RosterEnrollmentRequest, db: AsyncSession = Depends(get_db),
+                        current_user: dict = Depends(oauth2.get_current_user)):
+
+    # Check if the specified course exists in the database.
+    course = await db.get(models.Course, course_id)
+    if course is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail=f"Course with ID: {course_id} is not found")
+
+    # Only the course's lecturer or an admin may enroll other users.
+    if current_user.role != 'admin' and (current_user.role != 'lecturer' or course.user_role != current_user.user_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail=f"You don't have permission to enroll students in: [ {course.course_name} ] ")
+
+    # Refuse rosters too large to process in one request.
+    if len(roster.students) > app_settings.BULK_PROVISION_MAX_ROWS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"A roster can have at most {app_settings.BULK_PROVISION_MAX_ROWS} students")
+
+    # Enroll the students and return the summary.
+    return await provisioning.enroll_students(db, course_id, roster.students)
+
+
+
 ########################### CREATE a NEW LESSON IN a COURSE ###########################
 # ⚛️⚛️⚛️⚛️⚛️⚛️
 ########################### CREATE a NEW LESSON IN a COURSE ###########################
@@ -184,11 +322,11 @@ def course_enrollment(course_id: int, db: Session = Depends(get_db),
 ########################### ⚛️ CREATE a NEW LESSON IN a COURSE [ CREATE ] ✅ ###########################
 # This endpoint handles the creation of a new lesson within a course.
 @router.post("/{course_id}/lessons", response_model=schemas.LessonResponseData)
-def add_lesson(course_id: int, lesson_data: schemas.LessonCreate, db: Session = Depends(get_db), 
+async def add_lesson(course_id: int, lesson_data: schemas.LessonCreate, db: AsyncSession = Depends(get_db), 
                       current_user: dict = Depends(oauth2.get_current_user)):
     
     # Check if the specified course exists in the database.
-    course = db.query(models.Course).filter(models.Course.course_id == course_id).first()
+    course = await db.get(models.Course, course_id)
 
     if not course:
         # If the course is not found, raise an HTTP 403 Forbidden error.
@@ -201,19 +339,24 @@ def add_lesson(course_id: int, lesson_data: schemas.LessonCreate, db: Session =
     allowed_roles = ["lecturer", "admin"]
     
     # Check if the current user has the necessary role and permissions to add lessons to the course.
-    if current_user.role not in allowed_roles or course.lecturer_info.username != current_user.username:
+    if current_user.role not in allowed_roles or course.user_role != current_user.user_id:
         # If not, raise an HTTP 403 Forbidden error.
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"You don't have permission to add new lessons to: [ {course.course_name} ] "
         )
     
-    # Retrieve existing lesson titles and contents from the database.
-    lesson_titles = [lesson.lesson_title for lesson in db.query(models.Lesson).all()]
-    lesson_contents = [lesson.lesson_content for lesson in db.query(models.Lesson).all()]
+    # Digest the lesson content so duplicates are found by comparing fixed-size hashes.
+    content_hash = utils.content_digest(lesson_data.lesson_content)
+
+    # Check in a single indexed probe whether the course already has a lesson with this title or content.
+    title_exists, content_exists = (await db.execute(select(
+        exists().where((models.Lesson.course_fkey == course_id) & (models.Lesson.lesson_title == lesson_data.lesson_title)),
+        exists().where((models.Lesson.course_fkey == course_id) & (models.Lesson.lesson_content_hash == content_hash)),
+    ))).one()
 
-    # Check if the submitted lesson title already exists in the database.
-    if lesson_data.lesson_title in lesson_titles:
+    # Check if the submitted lesson title already exists in the course.
+    if title_exists:
         # If it exists, raise an HTTP 403 Forbidden error.
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
@@ -221,22 +364,39 @@ def add_lesson(course_id: int, lesson_data: schemas.LessonCreate, db: Session =
     )
 
     # Check if the submitted lesson content already exists in the course.
-    if lesson_data.lesson_content in lesson_contents:
+    if content_exists:
         # If it exists, raise an HTTP 403 Forbidden error.
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"You've already added this lesson data content to {course.course_name} Course"
     )
     
-    # Create a new lesson object and add it to the database.
-    lesson = models.Lesson(
-        user_fkey=current_user.user_id, 
-        course_fkey=course_id, 
-        **lesson_data.model_dump()
+    # Insert the new lesson. The unique (course_fkey, lesson_title) index still rejects a
+    # duplicate title added concurrently since the probe above.
+    lesson_id = await db.scalar(
+        pg_insert(models.Lesson)
+        .values(user_fkey=current_user.user_id, course_fkey=course_id,
+                lesson_content_hash=content_hash, **lesson_data.model_dump())
+        .on_conflict_do_nothing(index_elements=[models.Lesson.course_fkey, models.Lesson.lesson_title])
+        .returning(models.Lesson.lesson_id)
+    )
+    if lesson_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"You already have a lesson titled [ {lesson_data.lesson_title} ] "
+        )
+
+    # Count the lesson in the course's lesson_count, in the same transaction.
+    await db.execute(
+        update(models.Course)
+        .where(models.Course.course_id == course_id)
+        .values(lesson_count=models.Course.lesson_count + 1)
+        .execution_options(synchronize_session=False)
     )
-    db.add(lesson)
-    db.commit()
-    db.refresh(lesson)
+
+    # Commit, then drop cached lesson lists the new lesson belongs in, and the responses showing the course's count.
+    await response_cache.commit_and_invalidate(db, "lessons", f"course:{course_id}:lessons", f"course:{course_id}")
+    lesson = await _get_lesson(db, lesson_id)
 
     # Return the created lesson as a response.
     return lesson
@@ -244,21 +404,52 @@ def add_lesson(course_id: int, lesson_data: schemas.LessonCreate, db: Session =
 
 ########################### ⚛️ GET LIST OF ALL LESSONS IN A COURSE [ READ ] ###########################
 # Define an endpoint to retrieve a list of all lessons for a given course.
-@router.get("/{course_id}/lessons", response_model=List[schemas.LessonResponseData])
-def get_lessons(course_id: int, db: Session = Depends(get_db)):
-    
-    # Query the database to retrieve all lessons associated with the specified course_id.
-    lessons = db.query(models.Lesson).filter(models.Lesson.course_fkey == course_id).all()
+@router.get("/{course_id}/lessons", response_model=schemas.Page[schemas.LessonResponseData])
+async def get_lessons(course_id: int, request: Request, page: PageParams = Depends(),
+                      db: AsyncSession = Depends(get_db)):
+    # Serve the response straight from the response cache when possible.
+    cached = await response_cache.lookup(request, etags.PUBLIC)
+    if cached is not None:
+        return cached
+
+    # Version the page by its lessons and the course summary embedded in each.
+    versions = await page_versions(
+        db,
+        select(models.Lesson.lesson_id, func.greatest(models.Lesson.updated_at, models.Course.updated_at))
+        .join(models.Lesson.course_info)
+        .where(models.Lesson.course_fkey == course_id),
+        models.Lesson.lesson_id,
+        page,
+    )
 
-    # Check if there are no lessons found for the course, and if so, raise a 404 error.
-    if not lessons:
+    # Check if there are no lessons found for the course (or no such course), and if so, raise a 404 error,
+    # before the ETag check so the ETag of an empty page can't earn a 304.
+    if not versions and page.cursor is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"This course doesn't have a lesson yet"
         )
-    
-    # Return the list of lessons as a response.
-    return lessons
+
+    # Answer 304 if the client has the page already
+    etag = etags.make_etag(versions)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag, etags.PUBLIC)
+    
+    # Query the database to retrieve a page of lessons associated with the specified course_id.
+    lessons = await paginate(
+        db,
+        loaders.LESSON_COLUMNS.select().where(models.Lesson.course_fkey == course_id),
+        models.Lesson.lesson_id,
+        page,
+        projection=loaders.LESSON_COLUMNS,
+    )
+
+    # Return the list of lessons as a response, caching it under the course and every lesson it shows.
+    return await response_cache.store(
+        request, schemas.Page[schemas.LessonResponseData], lessons, etags.PUBLIC, etag=etag,
+        tags=(f"course:{course_id}", f"course:{course_id}:lessons",
+              *(f"lesson:{lesson['lesson_id']}" for lesson in lessons["items"])),
+    )
 
 
 ########################### ⚛️ GET DETAILS OF A SPECIFIC LESSON [ READ ] ###########################
@@ -266,12 +457,18 @@ def get_lessons(course_id: int, db: Session = Depends(get_db)):
 # It expects the course_id and lesson_id as path parameters.
 # The response will be in the format specified by the LessonResponseData schema.
 @router.get("/{course_id}/lessons/{lesson_id}", response_model=schemas.LessonResponseData)
-def get_lesson(course_id: int, lesson_id: int, db: Session = Depends(get_db)):
-    
+async def get_lesson(course_id: int, lesson_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    # Serve the response straight from the response cache when possible.
+    cached = await response_cache.lookup(request, etags.PUBLIC)
+    if cached is not None:
+        return cached
+
     # Query the database to retrieve the lesson information based on the provided course_id and lesson_id.
-    lesson = db.query(models.Lesson).filter(
-        (models.Lesson.course_fkey == course_id) & (models.Lesson.lesson_id == lesson_id)
-    ).first()
+    lesson = await loaders.LESSON_COLUMNS.first(
+        db,
+        loaders.LESSON_COLUMNS.select()
+        .where((models.Lesson.course_fkey == course_id) & (models.Lesson.lesson_id == lesson_id))
+    )
     
     # If the lesson is not found, raise an HTTPException with a 404 Not Found status code and a relevant detail message.
     if not lesson:
@@ -280,26 +477,24 @@ def get_lesson(course_id: int, lesson_id: int, db: Session = Depends(get_db)):
             detail=f"Lesson not found"
         )
 
-    # If the lesson is found, return it as a response.
-    return lesson
+    # If the lesson is found, return it as a response, caching it under the course and the lesson.
+    return await response_cache.store(request, schemas.LessonResponseData, lesson, etags.PUBLIC,
+                                      tags=(f"course:{course_id}", f"lesson:{lesson_id}"))
 
 
 ########################### ⚛️ UPDATE AN EXITING LESSON [ PUT ] ###########################
 # Define a route for updating a lesson using HTTP PUT method
 # The response model is specified as LessonResponseData
 @router.put("/{course_id}/lessons/{lesson_id}", response_model=schemas.LessonResponseData)
-def update_lesson(
+async def update_lesson(
     course_id: int, lesson_id: int, lesson_update: schemas.LessonUpdate,
-    db: Session = Depends(get_db), current_user: dict = Depends(oauth2.get_current_user)
+    db: AsyncSession = Depends(get_db), current_user: dict = Depends(oauth2.get_current_user)
 ):
     # Retrieve the course associated with the given course_id from the database
-    course = db.query(models.Course).filter(models.Course.course_id == course_id).first()
-    
-    # Query the database for the lesson using the provided lesson_id
-    lesson_query = db.query(models.Lesson).filter(models.Lesson.lesson_id == lesson_id)
+    course = await db.get(models.Course, course_id)
     
-    # Retrieve the lesson object from the query
-    lesson = lesson_query.first()
+    # Retrieve the lesson object using the provided lesson_id
+    lesson = await db.get(models.Lesson, lesson_id)
     
     # Check if the course exists, and if not, raise a 404 error
     if not course:
@@ -326,32 +521,48 @@ def update_lesson(
             detail=f"You don't have permission to update this lesson"
         )
     
-    # Update the lesson in the database with the provided lesson_update data
     # Exclude unset attributes to prevent overwriting with None values
-    lesson_query.update(lesson_update.model_dump(exclude_unset=True), synchronize_session=False)
+    lesson_values = lesson_update.model_dump(exclude_unset=True)
+
+    # Keep the content digest in step with the content
+    if lesson_values.get("lesson_content") is not None:
+        lesson_values["lesson_content_hash"] = utils.content_digest(lesson_values["lesson_content"])
+
+    # Update the lesson in the database with the provided lesson_update data
+    try:
+        await db.execute(
+            update(models.Lesson)
+            .where(models.Lesson.lesson_id == lesson_id)
+            .values(**lesson_values)
+            .execution_options(synchronize_session=False)
+        )
+    except IntegrityError as error:
+        # The unique (course_fkey, lesson_title) index rejects a title another lesson of the course has
+        if not utils.is_unique_violation(error):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"You already have a lesson titled [ {lesson_values['lesson_title']} ] "
+        )
     
-    # Commit the changes to the database
-    db.commit()
+    # Commit the changes to the database, then drop every cached response showing this lesson
+    await response_cache.commit_and_invalidate(db, f"lesson:{lesson_id}")
     
-    # Refresh the lesson object to reflect the updated data
-    db.refresh(lesson)
-
-    # Return the updated lesson as the response
-    return lesson
+    # Reload the lesson object to reflect the updated data and return it as the response
+    return await _get_lesson(db, lesson_id)
 
 
 ########################### ⚛️ DELETE A LESSON [ DELETE ] ❌ ###########################
 # This is an API route that handles the deletion of a lesson within a specific course.
 @router.delete("/{course_id}/lessons/{lesson_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_lesson(course_id: int, lesson_id: int, db: Session = Depends(get_db), 
+async def delete_lesson(course_id: int, lesson_id: int, db: AsyncSession = Depends(get_db), 
                   current_user: dict = Depends(oauth2.get_current_user)):
 
     # Fetch the course associated with the provided 'course_id'.
-    course = db.query(models.Course).filter(models.Course.course_id == course_id).first()
+    course = await db.get(models.Course, course_id)
 
     # Query the database to find the lesson with the provided 'lesson_id'.
-    lesson_query = db.query(models.Lesson).filter(models.Lesson.lesson_id == lesson_id)
-    lesson = lesson_query.first()
+    lesson = await db.get(models.Lesson, lesson_id)
 
     # If the course is not found, raise an HTTP 404 Not Found error.
     if not course:
@@ -378,10 +589,26 @@ def delete_lesson(course_id: int, lesson_id: int, db: Session = Depends(get_db),
         )
 
     # Delete the lesson from the database (synchronize_session=False means it won't update the session immediately).
-    lesson_query.delete(synchronize_session=False)
+    lesson_course_id = await db.scalar(
+        delete(models.Lesson)
+        .where(models.Lesson.lesson_id == lesson_id)
+        .returning(models.Lesson.course_fkey)
+        .execution_options(synchronize_session=False)
+    )
+
+    # Uncount it from its course, unless a concurrent request already deleted this lesson
+    tags = [f"lesson:{lesson_id}"]
+    if lesson_course_id is not None:
+        await db.execute(
+            update(models.Course)
+            .where(models.Course.course_id == lesson_course_id)
+            .values(lesson_count=models.Course.lesson_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+        tags.append(f"course:{lesson_course_id}")
 
-    # Commit the changes to the database.
-    db.commit()
+    # Commit the changes to the database, then drop every cached response showing this lesson or its course's count.
+    await response_cache.commit_and_invalidate(db, *tags)
 
     # Return a successful response with a 204 No Content status code to indicate successful deletion.
     return Response(status_code=status.HTTP_204_NO_CONTENT)
@@ -394,11 +621,11 @@ def delete_lesson(course_id: int, lesson_id: int, db: Session = Depends(get_db),
 ########################### 📝 CREATE a NEW Assignment IN a COURSE [ CREATE ] ✅ ###########################
 # This route allows the creation of a new assignment within a course.
 @router.post("/{course_id}/assignments", response_model=schemas.AssignmentResponseData)
-def add_assignment(course_id: int, assignment_data: schemas.AssignmentCreate, db: Session = Depends(get_db), 
+async def add_assignment(course_id: int, assignment_data: schemas.AssignmentCreate, db: AsyncSession = Depends(get_db), 
                       current_user: dict = Depends(oauth2.get_current_user)):
     
     # Retrieve the course information based on the given course_id.
-    course = db.query(models.Course).filter(models.Course.course_id == course_id).first()
+    course = await db.get(models.Course, course_id)
 
     # Check if the course exists; if not, raise a 403 Forbidden error.
     if not course:
@@ -411,49 +638,71 @@ def add_assignment(course_id: int, assignment_data: schemas.AssignmentCreate, db
     allowed_roles = ["lecturer", "admin"]
     
     # Check if the current user's role and username match the allowed roles and the course's lecturer.
-    if current_user.role not in allowed_roles or course.lecturer_info.username != current_user.username:
+    if current_user.role not in allowed_roles or course.user_role != current_user.user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"You don't have permission to add a new assignment to the '{course.course_name}' course"
         )
     
-    # Retrieve existing assignment titles and descriptions from the database.
-    assignment_titles = [assignment.assignment_title for assignment in db.query(models.Assignment).all()]
-    assignment_descriptions = [assignment.assignment_description for assignment in db.query(models.Assignment).all()]
+    # Digest the description so duplicates are found by comparing fixed-size hashes.
+    description_hash = utils.content_digest(assignment_data.assignment_description)
+
+    # Check in a single indexed probe whether the course already has an assignment with this title or description.
+    title_exists, description_exists = (await db.execute(select(
+        exists().where((models.Assignment.course_fkey == course_id) & (models.Assignment.assignment_title == assignment_data.assignment_title)),
+        exists().where((models.Assignment.course_fkey == course_id) & (models.Assignment.assignment_description_hash == description_hash)),
+    ))).one()
 
     # Check if an assignment with the same title or description already exists; if so, raise a 403 Forbidden error.
-    if assignment_data.assignment_title in assignment_titles:
+    if title_exists:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail=f"A Course Assignment with the title '{assignment_data.assignment_title}' already exists"
         )
 
-    if assignment_data.assignment_description in assignment_descriptions:
+    if description_exists:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="An assignment with this description has already been added."
         )
     
-    # Create a new assignment record and add it to the database.
-    assignment = models.Assignment(
-        user_fkey=current_user.user_id, 
-        course_fkey=course_id, 
-        **assignment_data.model_dump()
+    # Create a new assignment record. The unique (course_fkey, assignment_title) index still
+    # rejects a duplicate title added concurrently since the probe above.
+    assignment_id = await db.scalar(
+        pg_insert(models.Assignment)
+        .values(user_fkey=current_user.user_id, course_fkey=course_id,
+                assignment_description_hash=description_hash, **assignment_data.model_dump())
+        .on_conflict_do_nothing(index_elements=[models.Assignment.course_fkey, models.Assignment.assignment_title])
+        .returning(models.Assignment.assignment_id)
+    )
+    if assignment_id is None:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"A Course Assignment with the title '{assignment_data.assignment_title}' already exists"
+        )
+
+    # Count the assignment in the course's assignment_count, in the same transaction.
+    await db.execute(
+        update(models.Course)
+        .where(models.Course.course_id == course_id)
+        .values(assignment_count=models.Course.assignment_count + 1)
+        .execution_options(synchronize_session=False)
     )
-    db.add(assignment)
-    db.commit()
-    db.refresh(assignment)
+
+    # Commit, then drop cached assignment lists the new assignment belongs in, and the responses showing the course's count.
+    await response_cache.commit_and_invalidate(db, "assignments", f"course:{course_id}")
+    assignment = await _get_assignment(db, assignment_id)
 
     # Return the newly created assignment.
     return assignment
 
 
 ########################### 📝 GET LIST OF ALL ASSIGNMENTS IN A COURSE [ READ ] ###########################
-@router.get("/{course_id}/assignments", response_model=List[schemas.AssignmentResponseData])
-def get_assignments(course_id: int, db: Session = Depends(get_db), 
-                      current_user: dict = Depends(oauth2.get_current_user)):
+@router.get("/{course_id}/assignments", response_model=schemas.Page[schemas.AssignmentResponseData])
+async def get_assignments(course_id: int, request: Request, page: PageParams = Depends(),
+                      db: AsyncSession = Depends(get_db), current_user: dict = Depends(oauth2.get_current_user)):
     # Retrieve the course associated with the given course_id
-    course = db.query(models.Course).filter(models.Course.course_id == course_id).first()
+    course = await db.get(models.Course, course_id)
 
     # Check if the course exists; if not, raise an HTTPException with a 403 Forbidden status
     if not course:
@@ -462,28 +711,57 @@ def get_assignments(course_id: int, db: Session = Depends(get_db),
             detail=f"Course with ID: {course_id} is not found"
         )
 
-    # Retrieve all assignments related to the specified course
-    assignments = db.query(models.Assignment).filter(models.Assignment.course_fkey == course_id).all()
+    # Version the page by its assignments and the course summary embedded in each. Only signed-in
+    # users see assignments, so shared caches may not keep them.
+    versions = await page_versions(
+        db,
+        select(models.Assignment.assignment_id, func.greatest(models.Assignment.updated_at, models.Course.updated_at))
+        .join(models.Assignment.course_info)
+        .where(models.Assignment.course_fkey == course_id),
+        models.Assignment.assignment_id,
+        page,
+    )
 
     # If no assignments are found, raise an HTTPException with a 404 Not Found status
-    if not assignments:
+    # (before the ETag check, so the ETag of an empty page can't earn a 304)
+    if not versions and page.cursor is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"Assignment not Found"
         )
-    
-    # Return the list of assignments
-    return assignments
+
+    # Answer 304 if the client has the page already
+    etag = etags.make_etag(versions)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag, etags.PRIVATE)
+
+    # Retrieve a page of assignments related to the specified course
+    assignments = await paginate(
+        db,
+        loaders.ASSIGNMENT_COLUMNS.select().where(models.Assignment.course_fkey == course_id),
+        models.Assignment.assignment_id,
+        page,
+        projection=loaders.ASSIGNMENT_COLUMNS,
+    )
+
+    # Return the list of assignments, serialized with the prebuilt adapter
+    response = serializers.json_response(schemas.Page[schemas.AssignmentResponseData], assignments)
+    etags.set_headers(response, etag, etags.PRIVATE)
+    return response
 
 
 ########################### 📝 GET DETAILS OF A SPECIFIC ASSIGNMENT [ READ ] ###########################
 # This route retrieves details of a specific assignment for a given course.
 # It expects a course ID and an assignment ID as parameters.
 @router.get("/{course_id}/assignments/{assignment_id}", response_model=schemas.AssignmentResponseData)
-def get_lesson(course_id: int, assignment_id: int, db: Session = Depends(get_db)):
-    
+async def get_lesson(course_id: int, assignment_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    # Serve the response straight from the response cache when possible.
+    cached = await response_cache.lookup(request, etags.PUBLIC)
+    if cached is not None:
+        return cached
+
     # Retrieve the course with the specified course ID from the database.
-    course = db.query(models.Course).filter(models.Course.course_id == course_id).first()
+    course = await db.get(models.Course, course_id)
 
     # If the course is not found, raise a 404 Not Found error.
     if not course:
@@ -493,9 +771,11 @@ def get_lesson(course_id: int, assignment_id: int, db: Session = Depends(get_db)
         )
     
     # Retrieve the assignment with the specified assignment ID and associated with the course.
-    assignment = db.query(models.Assignment).filter(
-        (models.Assignment.course_fkey == course_id) & (models.Assignment.assignment_id == assignment_id)
-    ).first()
+    assignment = await loaders.ASSIGNMENT_COLUMNS.first(
+        db,
+        loaders.ASSIGNMENT_COLUMNS.select()
+        .where((models.Assignment.course_fkey == course_id) & (models.Assignment.assignment_id == assignment_id))
+    )
     
     # If the assignment is not found, raise a 404 Not Found error.
     if not assignment:
@@ -504,8 +784,9 @@ def get_lesson(course_id: int, assignment_id: int, db: Session = Depends(get_db)
             detail=f"Assignment not found"
         )
 
-    # Return the retrieved assignment data.
-    return assignment
+    # Return the retrieved assignment data, caching it under the course and the assignment.
+    return await response_cache.store(request, schemas.AssignmentResponseData, assignment, etags.PUBLIC,
+                                      tags=(f"course:{course_id}", f"assignment:{assignment_id}"))
 
 
 ########################### 📝 UPDATE AN EXISTING ASSIGNMENT [ PUT ] ###########################
@@ -518,15 +799,14 @@ def get_lesson(course_id: int, assignment_id: int, db: Session = Depends(get_db)
 # - current_user: The current user (authenticated) dependency.
 
 @router.put("/{course_id}/assignments/{assignment_id}", response_model=schemas.AssignmentResponseData)
-def update_assignment(course_id: int, assignment_id: int, assignment_update: schemas.AssignmentUpdate, 
-               db: Session = Depends(get_db), current_user: dict = Depends(oauth2.get_current_user)):
+async def update_assignment(course_id: int, assignment_id: int, assignment_update: schemas.AssignmentUpdate, 
+               db: AsyncSession = Depends(get_db), current_user: dict = Depends(oauth2.get_current_user)):
     
     # Query the database to retrieve the course associated with the given course_id.
-    course = db.query(models.Course).filter(models.Course.course_id == course_id).first()
+    course = await db.get(models.Course, course_id)
     
     # Query the database to retrieve the assignment to be updated based on assignment_id.
-    assignment_query = db.query(models.Assignment).filter(models.Assignment.assignment_id == assignment_id)
-    assignment = assignment_query.first()
+    assignment = await db.get(models.Assignment, assignment_id)
     
     # Check if the course exists; if not, raise a 404 error.
     if not course:
@@ -552,30 +832,49 @@ def update_assignment(course_id: int, assignment_id: int, assignment_update: sch
             detail=f"You don't have permission to update this assignment"
         )
     
+    # Keep the description digest in step with the description.
+    assignment_values = assignment_update.model_dump(exclude_unset=True)
+    if assignment_values.get("assignment_description") is not None:
+        assignment_values["assignment_description_hash"] = utils.content_digest(assignment_values["assignment_description"])
+
     # Update the assignment in the database with the provided assignment_update data.
-    assignment_query.update(assignment_update.model_dump(exclude_unset=True), synchronize_session=False)
+    try:
+        await db.execute(
+            update(models.Assignment)
+            .where(models.Assignment.assignment_id == assignment_id)
+            .values(**assignment_values)
+            .execution_options(synchronize_session=False)
+        )
+    except IntegrityError as error:
+        # The unique (course_fkey, assignment_title) index rejects a title another assignment of the course has
+        if not utils.is_unique_violation(error):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail=f"A Course Assignment with the title '{assignment_values['assignment_title']}' already exists"
+        )
     
-    # Commit the changes to the database.
-    db.commit()
+    # Commit the changes to the database, then drop every cached response showing this assignment.
+    # A new due date can also move it into lists filtered by deadline, which aren't tagged with it.
+    tags = [f"assignment:{assignment_id}"]
+    if "due_date" in assignment_values:
+        tags.append("assignments")
+    await response_cache.commit_and_invalidate(db, *tags)
     
-    # Refresh the assignment object to reflect the updated data.
-    db.refresh(assignment)
-
-    # Return the updated assignment data as a response.
-    return assignment
+    # Reload the assignment object to reflect the updated data and return it as a response.
+    return await _get_assignment(db, assignment_id)
 
 
 ########################### 📝 DELETE ASSIGNMENT [ DELETE ] ❌ ###########################
 @router.delete("/{course_id}/assignments/{assignment_id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_assignment(course_id: int, assignment_id: int, db: Session = Depends(get_db), 
+async def delete_assignment(course_id: int, assignment_id: int, db: AsyncSession = Depends(get_db), 
                   current_user: dict = Depends(oauth2.get_current_user)):
     
     # Query the database to find the course associated with the given course_id
-    course = db.query(models.Course).filter(models.Course.course_id == course_id).first()
+    course = await db.get(models.Course, course_id)
     
     # Query the database to find the assignment associated with the given assignment_id
-    assignment_query = db.query(models.Assignment).filter(models.Assignment.assignment_id == assignment_id)
-    assignment = assignment_query.first()
+    assignment = await db.get(models.Assignment, assignment_id)
 
     # If the course does not exist, raise a 404 Not Found error
     if not course:
@@ -602,10 +901,26 @@ def delete_assignment(course_id: int, assignment_id: int, db: Session = Depends(
         )
     
     # Delete the assignment from the database without synchronizing with the session
-    assignment_query.delete(synchronize_session=False)
+    assignment_course_id = await db.scalar(
+        delete(models.Assignment)
+        .where(models.Assignment.assignment_id == assignment_id)
+        .returning(models.Assignment.course_fkey)
+        .execution_options(synchronize_session=False)
+    )
+
+    # Uncount it from its course, unless a concurrent request already deleted this assignment
+    tags = [f"assignment:{assignment_id}"]
+    if assignment_course_id is not None:
+        await db.execute(
+            update(models.Course)
+            .where(models.Course.course_id == assignment_course_id)
+            .values(assignment_count=models.Course.assignment_count - 1)
+            .execution_options(synchronize_session=False)
+        )
+        tags.append(f"course:{assignment_course_id}")
     
-    # Commit the changes to the database
-    db.commit()
+    # Commit the changes to the database, then drop every cached response showing this assignment or its course's count
+    await response_cache.commit_and_invalidate(db, *tags)
 
     # Return a response with a 204 No Content status code to indicate successful deletion
     return Response(status_code=status.HTTP_204_NO_CONTENT)
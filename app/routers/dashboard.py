@@ -0,0 +1,87 @@
+from fastapi import Depends, APIRouter, Query
+from sqlalchemy import func, select, true
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models, schemas, oauth2, loaders, serializers
+from ..database import get_db
+from ..pagination import PageParams, paginate
+
+router = APIRouter(
+    prefix='/me'
+)
+
+# At most this many lessons and upcoming assignments are shown per course
+MAX_PER_COURSE = 20
+
+
+# Run statement, a correlated subquery on models.Course.course_id returning the rows of one course,
+# as a LATERAL join over the given courses, and group the rows by course ID.
+# One query for all the courses, each one reading only its own first rows from the index.
+async def _per_course(db, course_ids, statement):
+    rows = statement.lateral("per_course")
+    grouped = {course_id: [] for course_id in course_ids}
+    for row in await db.execute(
+        select(models.Course.course_id, rows)
+        .join(rows, true())
+        .where(models.Course.course_id.in_(course_ids))
+    ):
+        course_id, *columns = row
+        grouped[course_id].append(dict(zip(rows.c.keys(), columns)))
+    return grouped
+
+
+########################### 🏠 STUDENT DASHBOARD [ READ ] ###########################
+# Everything the app's opening screen shows in one request: a page of the courses the current user is
+# enrolled in, each with its `lessons` latest lessons and its `assignments` next assignments not due yet.
+# Three queries whatever the number of courses: the page of enrollments, then one LATERAL join each
+# for the lessons and the assignments of all the courses on the page.
+@router.get("/dashboard", response_model=schemas.Page[schemas.DashboardCourseData])
+async def dashboard(lessons: int = Query(3, ge=0, le=MAX_PER_COURSE), assignments: int = Query(5, ge=0, le=MAX_PER_COURSE),
+                    page: PageParams = Depends(), db: AsyncSession = Depends(get_db),
+                    current_user: dict = Depends(oauth2.get_current_user)):
+
+    # Retrieve a page of the current user's enrollments with their courses, in enrollment order
+    courses = await paginate(
+        db,
+        loaders.DASHBOARD_COURSE_COLUMNS.select()
+        .join(models.Enrollment.course_info)
+        .where(models.Enrollment.student_fkey == current_user.user_id),
+        models.Enrollment.enrollment_id,
+        page,
+        projection=loaders.DASHBOARD_COURSE_COLUMNS,
+    )
+    course_ids = [course["course_id"] for course in courses["items"]]
+
+    # The latest lessons of each course, newest first (an index scan of (course_fkey, lesson_id) per course)
+    latest_lessons = {}
+    if course_ids and lessons:
+        latest_lessons = await _per_course(
+            db,
+            course_ids,
+            select(models.Lesson.lesson_id, models.Lesson.lesson_title, models.Lesson.created_at)
+            .where(models.Lesson.course_fkey == models.Course.course_id)
+            .order_by(models.Lesson.lesson_id.desc())
+            .limit(lessons),
+        )
+
+    # The assignments of each course not due yet, soonest first (an index scan of (course_fkey, due_date) per course)
+    upcoming_assignments = {}
+    if course_ids and assignments:
+        upcoming_assignments = await _per_course(
+            db,
+            course_ids,
+            select(models.Assignment.assignment_id, models.Assignment.assignment_title,
+                   models.Assignment.max_score, models.Assignment.due_date)
+            .where((models.Assignment.course_fkey == models.Course.course_id)
+                   & (models.Assignment.due_date >= func.now()))
+            .order_by(models.Assignment.due_date, models.Assignment.assignment_id)
+            .limit(assignments),
+        )
+
+    # Attach them to their courses
+    for course in courses["items"]:
+        course["latest_lessons"] = latest_lessons.get(course["course_id"], [])
+        course["upcoming_assignments"] = upcoming_assignments.get(course["course_id"], [])
+
+    # Return the page of courses as a response, serialized with the prebuilt adapter
+    return serializers.json_response(schemas.Page[schemas.DashboardCourseData], courses)
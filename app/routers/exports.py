@@ -0,0 +1,93 @@
+import csv
+import io
+from datetime import datetime
+
+import orjson
+from fastapi import Depends, HTTPException, APIRouter, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models, loaders
+from ..config import app_settings
+from ..database import get_db
+from .admin import require_admin
+
+router = APIRouter(
+    prefix='/admin/exports'
+)
+
+# 🔵 Enrollments with the student and course each one links
+ENROLLMENT_COLUMNS = loaders.Projection(
+    [models.Enrollment.enrollment_id, models.Enrollment.created_at],
+    student_info=(models.Enrollment.student_info, [models.User.user_id, models.User.username, models.User.email]),
+    course_info=(models.Enrollment.course_info, [models.Course.course_id, models.Course.course_name]),
+)
+
+# Exportable tables: name -> (columns to export, key column the rows are ordered by)
+EXPORTS = {
+    "users": (loaders.USER_COLUMNS, models.User.user_id),
+    "courses": (loaders.COURSE_COLUMNS, models.Course.course_id),
+    "enrollments": (ENROLLMENT_COLUMNS, models.Enrollment.enrollment_id),
+    "lessons": (loaders.LESSON_COLUMNS, models.Lesson.lesson_id),
+    "assignments": (loaders.ASSIGNMENT_COLUMNS, models.Assignment.assignment_id),
+}
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+# One JSON object per line, nested like the table's response schema
+def _ndjson_chunk(projection, rows):
+    return b"".join(orjson.dumps(item, option=orjson.OPT_UTC_Z | orjson.OPT_APPEND_NEWLINE)
+                    for item in projection.shape(rows))
+
+
+# A CSV cell: lists (e.g. assignment questions) as JSON, timestamps in ISO 8601
+def _csv_value(value):
+    if isinstance(value, list):
+        return orjson.dumps(value).decode()
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+# CSV rows in the projection's flat column order (see Projection.fields)
+def _csv_chunk(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows([_csv_value(value) for value in row] for row in rows)
+    return buffer.getvalue().encode()
+
+
+# Read the table through a server-side cursor, EXPORT_BATCH_SIZE rows at a time, and encode each
+# batch as soon as it arrives, so memory use doesn't grow with the size of the table.
+async def _export_chunks(db, projection, key_column, export_format):
+    if export_format == "csv":
+        yield _csv_chunk([projection.fields])
+
+    result = await db.stream(
+        projection.select().order_by(key_column).execution_options(yield_per=app_settings.EXPORT_BATCH_SIZE)
+    )
+    try:
+        async for rows in result.partitions():
+            yield _ndjson_chunk(projection, rows) if export_format == "ndjson" else _csv_chunk(rows)
+    finally:
+        await result.close()
+
+
+########################### 🛠️ EXPORT A TABLE [ READ ] ###########################
+# Stream every row of a table as NDJSON (default) or CSV.
+@router.get("/{table}")
+async def export_table(table: str, export_format: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+                       db: AsyncSession = Depends(get_db), current_user: dict = Depends(require_admin)):
+    # Check that the table can be exported
+    if table not in EXPORTS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Unknown export: {table}")
+    projection, key_column = EXPORTS[table]
+
+    # Stream with the request's session. Dependencies with yield are closed after the response
+    # has been sent (FastAPI 0.103, pinned in requirements.txt), so it stays open for the whole stream.
+    return StreamingResponse(
+        _export_chunks(db, projection, key_column, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{table}.{export_format}"'},
+    )
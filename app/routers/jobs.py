@@ -0,0 +1,128 @@
+from fastapi import Depends, HTTPException, APIRouter, Response, status
+from pydantic import ValidationError
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models, schemas, oauth2, loaders, jobs
+from ..config import app_settings
+from ..database import get_db
+from ..pagination import PageParams, paginate
+
+router = APIRouter(
+    prefix='/jobs'
+)
+
+# ⏳ Job status columns; params and result are left out (params can hold a roster with passwords)
+JOB_COLUMNS = loaders.Projection([
+    models.Job.job_id, models.Job.kind, models.Job.status, models.Job.progress, models.Job.total,
+    models.Job.error, models.Job.attempts, models.Job.created_at, models.Job.started_at, models.Job.finished_at,
+])
+
+# ⏳ Jobs that work on the whole database rather than one course
+ADMIN_KINDS = {"provision_users", "reconcile_course_stats"}
+
+
+# The job if it exists and the current user may see it (their own job, or any job for an admin)
+def _visible_job(job_id, current_user):
+    statement = JOB_COLUMNS.select().where(models.Job.job_id == job_id)
+    if current_user.role != 'admin':
+        statement = statement.where(models.Job.user_fkey == current_user.user_id)
+    return statement
+
+
+async def _check_course_permission(db, course_id, current_user):
+    # Check if the specified course exists in the database.
+    course = await db.get(models.Course, course_id)
+    if course is None:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail=f"Course with ID: {course_id} is not found")
+
+    # Only the course's lecturer or an admin may change its roster or delete it.
+    if current_user.role != 'admin' and (current_user.role != 'lecturer' or course.user_role != current_user.user_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                            detail=f"You don't have permission to manage: [ {course.course_name} ] ")
+
+
+########################### ⏳ SUBMIT A JOB [ CREATE ] ✅ ###########################
+# Queue a long-running operation for the job workers and answer right away with 202 (Accepted).
+# Poll GET /jobs/{job_id} for its progress, then fetch GET /jobs/{job_id}/result.
+@router.post("/", response_model=schemas.JobResponseData, status_code=status.HTTP_202_ACCEPTED)
+async def submit_job(job_data: schemas.JobCreate, response: Response, db: AsyncSession = Depends(get_db),
+                     current_user: dict = Depends(oauth2.get_current_user)):
+
+    # Validate the params against the schema of the job's kind.
+    try:
+        params = jobs.KINDS[job_data.kind].params.model_validate(job_data.params)
+    except ValidationError as error:
+        raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=error.errors())
+
+    # Check the user may run it: provisioning and reconciliation are admin only, course jobs need the
+    # course's lecturer or an admin.
+    if job_data.kind in ADMIN_KINDS:
+        if current_user.role != 'admin':
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                                detail=f"Only admins are allowed to run {job_data.kind} jobs")
+    else:
+        await _check_course_permission(db, params.course_id, current_user)
+
+    # Refuse rosters larger than the bulk limit.
+    total = jobs.KINDS[job_data.kind].total(params.model_dump())
+    if total is not None and total > app_settings.BULK_PROVISION_MAX_ROWS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"A roster can have at most {app_settings.BULK_PROVISION_MAX_ROWS} rows")
+
+    # Bound how much work one user can have waiting.
+    pending = await db.scalar(
+        select(func.count())
+        .select_from(models.Job)
+        .where((models.Job.user_fkey == current_user.user_id) & models.Job.status.in_(["queued", "running"]))
+    )
+    if pending >= app_settings.JOB_MAX_PENDING_PER_USER:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                            detail=f"You already have {pending} jobs queued or running, please retry once they finish",
+                            headers={"Retry-After": str(int(app_settings.JOB_POLL_SECONDS * 10))})
+
+    # Queue the job and point the client at its status.
+    job = await jobs.submit(db, job_data.kind, params.model_dump(), current_user.user_id)
+    response.headers["Location"] = f"/jobs/{job.job_id}"
+    return job
+
+
+########################### ⏳ GET MY JOBS [ READ ] ###########################
+# A page of the current user's jobs, oldest first.
+@router.get("/", response_model=schemas.Page[schemas.JobResponseData])
+async def my_jobs(page: PageParams = Depends(), db: AsyncSession = Depends(get_db),
+                  current_user: dict = Depends(oauth2.get_current_user)):
+    statement = JOB_COLUMNS.select().where(models.Job.user_fkey == current_user.user_id)
+    return await paginate(db, statement, models.Job.job_id, page, projection=JOB_COLUMNS)
+
+
+########################### ⏳ GET A JOB [ READ ] ###########################
+# A job's status and progress; poll it until the status is succeeded or failed.
+@router.get("/{job_id}", response_model=schemas.JobResponseData)
+async def get_job(job_id: int, db: AsyncSession = Depends(get_db),
+                  current_user: dict = Depends(oauth2.get_current_user)):
+    job = await JOB_COLUMNS.first(db, _visible_job(job_id, current_user))
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Job with ID: {job_id} not found")
+    return job
+
+
+########################### ⏳ GET A JOB'S RESULT [ READ ] ###########################
+# The outcome of a succeeded job, e.g. the report of a provisioning or roster job.
+@router.get("/{job_id}/result")
+async def get_job_result(job_id: int, db: AsyncSession = Depends(get_db),
+                         current_user: dict = Depends(oauth2.get_current_user)):
+    job = (await db.execute(
+        _visible_job(job_id, current_user).add_columns(models.Job.result)
+    )).first()
+    if job is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND,
+                            detail=f"Job with ID: {job_id} not found")
+
+    # Only a succeeded job has a result; the others report their status (and error) at /jobs/{job_id}.
+    if job.status != "succeeded":
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT,
+                            detail=f"Job with ID: {job_id} is {job.status}" + (f": {job.error}" if job.error else ""))
+    return job.result
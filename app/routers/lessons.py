@@ -1,10 +1,11 @@
-from typing import List
-from fastapi import Depends, APIRouter
-from sqlalchemy.orm import Session
-from sqlalchemy import asc
+from fastapi import Depends, APIRouter, Request
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import models, schemas
+from .. import models, schemas, loaders, etags
 from ..database import get_db
+from ..pagination import PageParams, page_versions, paginate
+from ..response_cache import response_cache
 
 router = APIRouter(
     prefix='/lessons'
@@ -13,11 +14,38 @@ router = APIRouter(
 ########################### ⚛️ ALL LESSONS [ READ ] ###########################
 # This endpoint is used to retrieve a list of all lessons.
 # It responds with a JSON list containing lesson data.
-@router.get("/", response_model=List[schemas.LessonResponseData])
-def get_lessons(db: Session = Depends(get_db)):
+@router.get("/", response_model=schemas.Page[schemas.LessonResponseData])
+async def get_lessons(request: Request, page: PageParams = Depends(), db: AsyncSession = Depends(get_db)):
+    # Serve the response straight from the response cache when possible.
+    cached = await response_cache.lookup(request, etags.PUBLIC)
+    if cached is not None:
+        return cached
 
-    # Query the database to retrieve all lessons.
-    lessons = db.query(models.Lesson).order_by(asc(models.Lesson.lesson_id)).all()
+    # Version the page by its lessons and the course summary embedded in each, and answer 304
+    # if the client has it already.
+    versions = await page_versions(
+        db,
+        select(models.Lesson.lesson_id, func.greatest(models.Lesson.updated_at, models.Course.updated_at))
+        .join(models.Lesson.course_info),
+        models.Lesson.lesson_id,
+        page,
+    )
+    etag = etags.make_etag(versions)
+    if etags.matches(request, etag):
+        return etags.not_modified(etag, etags.PUBLIC)
 
-    # Return the list of lessons as the response.
-    return lessons
+    # Query the database to retrieve a page of lessons, ordered by lesson ID.
+    lessons = await paginate(
+        db,
+        loaders.LESSON_COLUMNS.select(),
+        models.Lesson.lesson_id,
+        page,
+        projection=loaders.LESSON_COLUMNS,
+    )
+
+    # Return the page of lessons as the response, caching it under every lesson and course it shows.
+    return await response_cache.store(
+        request, schemas.Page[schemas.LessonResponseData], lessons, etags.PUBLIC, etag=etag,
+        tags=("lessons", *(tag for lesson in lessons["items"]
+                           for tag in (f"lesson:{lesson['lesson_id']}", f"course:{lesson['course_info']['course_id']}"))),
+    )
@@ -0,0 +1,127 @@
+from typing import List, NamedTuple, Optional
+
+from fastapi import Depends, APIRouter, Query
+from sqlalchemy import and_, case, func, literal, select, text, union_all
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .. import models, schemas, serializers
+from ..config import app_settings
+from ..database import get_db
+from ..pagination import PageParams, decode_cursor, encode_cursor
+
+router = APIRouter(
+    prefix='/search'
+)
+
+
+# The columns searched for one result type
+class Searchable(NamedTuple):
+    id: object
+    course_id: object
+    title: object
+    body: object
+    vector: object
+
+
+SEARCHABLE = {
+    "course": Searchable(models.Course.course_id, models.Course.course_id, models.Course.course_name,
+                         models.Course.course_description, models.Course.search_vector),
+    "lesson": Searchable(models.Lesson.lesson_id, models.Lesson.course_fkey, models.Lesson.lesson_title,
+                         models.Lesson.lesson_content, models.Lesson.search_vector),
+    "assignment": Searchable(models.Assignment.assignment_id, models.Assignment.course_fkey, models.Assignment.assignment_title,
+                             models.Assignment.assignment_description, models.Assignment.search_vector),
+}
+
+# Excerpt of the matched text shown with each search result
+SNIPPET_OPTIONS = "MaxWords=35, MinWords=15, MaxFragments=2"
+
+
+# How many rows a search matches depends entirely on its words, so always plan it for the words given.
+# asyncpg prepares statements, and after a few runs Postgres would reuse a generic plan built for an
+# average term, which reads the whole posting list of a very common one (several times slower).
+async def _plan_for_these_words(db):
+    await db.execute(text("SET LOCAL plan_cache_mode = force_custom_plan"))
+
+
+# Escape LIKE wildcards in user input, so "100%" matches literally
+def _like_escape(text):
+    return text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+########################### 🔎 SEARCH [ READ ] ###########################
+# Full-text search over course names and descriptions, lesson titles and content, and assignment
+# titles and descriptions. q takes web search syntax ("quoted phrases", -excluded, or).
+# Rows are matched through the GIN indexes on their search_vector and ranked, title matches first.
+# At most SEARCH_MAX_CANDIDATES matches of each type are ranked, so a term found in most rows
+# doesn't rank the whole table. Results are ranked, not keyed, so the cursor is a position in the ranking.
+@router.get("/", response_model=schemas.Page[schemas.SearchResultData])
+async def search(q: str = Query(min_length=1, max_length=200), type: Optional[List[schemas.SearchType]] = Query(None),
+                 page: PageParams = Depends(), db: AsyncSession = Depends(get_db)):
+    query = func.websearch_to_tsquery("english", q)
+    types = type or list(SEARCHABLE)
+
+    # Rank the matches of each type, narrow columns only
+    matches = union_all(*(
+        select(literal(name).label("type"), searchable.id.label("id"), searchable.course_id.label("course_id"),
+               searchable.title.label("title"), func.ts_rank(searchable.vector, query).label("rank"))
+        .where(searchable.vector.op("@@")(query))
+        .limit(app_settings.SEARCH_MAX_CANDIDATES)
+        for name, searchable in SEARCHABLE.items() if name in types
+    )).subquery("matches")
+
+    offset = decode_cursor(page.cursor) if page.cursor is not None else 0
+    await _plan_for_these_words(db)
+    ranking = (matches.c.rank.desc(), matches.c.type, matches.c.id)
+    hits = select(matches).order_by(*ranking).offset(offset).limit(page.limit + 1).subquery("hits")
+
+    # Build snippets for the rows on the page only, reading each one's text by primary key
+    joins, bodies = hits, []
+    for name, searchable in SEARCHABLE.items():
+        if name in types:
+            joins = joins.outerjoin(searchable.id.table, and_(hits.c.type == name, searchable.id == hits.c.id))
+            bodies.append((hits.c.type == name, searchable.body))
+    snippet = func.ts_headline("english", case(*bodies), query, SNIPPET_OPTIONS)
+
+    items = (await db.execute(
+        select(hits.c.type, hits.c.id, hits.c.course_id, hits.c.title, snippet.label("snippet"), hits.c.rank)
+        .select_from(joins)
+        .order_by(hits.c.rank.desc(), hits.c.type, hits.c.id)
+    )).all()
+
+    next_cursor = None
+    if len(items) > page.limit:
+        items = items[:page.limit]
+        next_cursor = encode_cursor(offset + page.limit)
+
+    return serializers.json_response(schemas.Page[schemas.SearchResultData], {"items": items, "next_cursor": next_cursor})
+
+
+########################### 🔎 SEARCH AS YOU TYPE [ READ ] ###########################
+# Titles starting with q, or with a word starting with q, for suggestions while the user types.
+# Matched through the trigram indexes on the titles; whole-title prefix matches come first, then shorter
+# titles, among at most SEARCH_MAX_CANDIDATES matches of each type. The plain substring match is redundant
+# but is what the planner should look up in the index: the word-start patterns alone also search the
+# trigrams of a leading space, which are in most titles, and look costly enough to make it scan the table.
+@router.get("/suggest", response_model=List[schemas.SearchSuggestionData])
+async def suggest(q: str = Query(min_length=1, max_length=100), type: Optional[List[schemas.SearchType]] = Query(None),
+                  limit: int = Query(10, ge=1, le=50), db: AsyncSession = Depends(get_db)):
+    prefix = _like_escape(q) + "%"
+    types = type or list(SEARCHABLE)
+
+    matches = union_all(*(
+        select(literal(name).label("type"), searchable.id.label("id"), searchable.course_id.label("course_id"),
+               searchable.title.label("title"), searchable.title.ilike(prefix, escape="\\").label("starts_with"))
+        .where(searchable.title.ilike("%" + prefix, escape="\\"))
+        .where(searchable.title.ilike(prefix, escape="\\") | searchable.title.ilike("% " + prefix, escape="\\"))
+        .limit(app_settings.SEARCH_MAX_CANDIDATES)
+        for name, searchable in SEARCHABLE.items() if name in types
+    )).subquery("matches")
+
+    await _plan_for_these_words(db)
+    suggestions = (await db.execute(
+        select(matches.c.type, matches.c.id, matches.c.course_id, matches.c.title)
+        .order_by(matches.c.starts_with.desc(), func.length(matches.c.title), matches.c.type, matches.c.id)
+        .limit(limit)
+    )).all()
+
+    return serializers.json_response(List[schemas.SearchSuggestionData], suggestions)
@@ -1,9 +1,11 @@
-from typing import List
-from fastapi import Depends, Response, HTTPException, APIRouter, status
-from sqlalchemy.orm import Session
+from fastapi import Depends, Request, Response, HTTPException, APIRouter, status
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from .. import models, schemas, oauth2, utils
+from .. import models, schemas, oauth2, utils, loaders, serializers, provisioning
+from ..config import app_settings
 from ..database import get_db
+from ..pagination import PageParams, paginate
+from .admin import require_admin
 
 router = APIRouter(
     prefix='/users'
@@ -14,10 +16,10 @@ router = APIRouter(
 # It expects user data as input and returns the newly created user data.
 # If successful, it responds with a status code 201 (Created).
 @router.post("/", response_model=schemas.UserResponseData, status_code=status.HTTP_201_CREATED)
-def add_user(user_data: schemas.UserCreate, db: Session = Depends(get_db)):
+async def add_user(user_data: schemas.UserCreate, db: AsyncSession = Depends(get_db)):
 
-    # Hash the user's password for security.
-    hash_password = utils.get_password_hash(user_data.password)
+    # Hash the user's password for security (in the password process pool, bcrypt is CPU bound).
+    hash_password = await utils.hash_password_async(user_data.password)
     user_data.password = hash_password
 
     # Create a new user instance using the input data.
@@ -25,21 +27,46 @@ def add_user(user_data: schemas.UserCreate, db: Session = Depends(get_db)):
 
     # Add the new user to the database, commit the transaction, and refresh to get the updated user data.
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
 
     # Return the newly created user data.
     return new_user
 
 
+########################### 👤 BULK ADD USERS [ CREATE ] ✅ ###########################
+# This route creates many users at once from a roster: a JSON array of users, or CSV (Content-Type: text/csv)
+# with a username,password,email,role header. Valid rows are created in one transaction and every
+# rejected row is reported with its reason.
+@router.post("/bulk", response_model=schemas.BulkUserResponseData)
+async def bulk_add_users(request: Request, db: AsyncSession = Depends(get_db),
+                         current_user: dict = Depends(require_admin)):
+
+    # Parse the roster from the request body.
+    try:
+        rows = provisioning.parse_roster(await request.body(),
+                                         is_csv=request.headers.get("content-type", "").startswith("text/csv"))
+    except ValueError as error:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST,
+                            detail=f"Invalid roster: {error}")
+
+    # Refuse rosters too large to process in one request.
+    if len(rows) > app_settings.BULK_PROVISION_MAX_ROWS:
+        raise HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"A roster can have at most {app_settings.BULK_PROVISION_MAX_ROWS} rows")
+
+    # Create the users and return how many were created, with the rows that weren't.
+    return await provisioning.provision_users(db, rows)
+
+
 ########################### 👤 GET ALL USER [ READ ] ###########################
 # This route allows fetching a list of all users from the database by handling GET requests.
 # It retrieves all user records from the database and returns them as a list of user data.
-@router.get("/", response_model=List[schemas.UserResponseData])
-def all_users(db: Session = Depends(get_db)):
+@router.get("/", response_model=schemas.Page[schemas.UserResponseData])
+async def all_users(page: PageParams = Depends(), db: AsyncSession = Depends(get_db)):
 
-    # Query the database to retrieve all user records.
-    users = db.query(models.User).all()
+    # Query the database to retrieve a page of user records, ordered by user ID, without their password hashes.
+    users = await paginate(db, loaders.USER_COLUMNS.select(), models.User.user_id, page, projection=loaders.USER_COLUMNS)
 
-    # Return the list of user data.
-    return users
+    # Return the page of user data, serialized with the prebuilt adapter.
+    return serializers.json_response(schemas.Page[schemas.UserResponseData], users)
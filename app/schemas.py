@@ -1,6 +1,32 @@
-from datetime import datetime
-from typing import List, Optional
-from pydantic import BaseModel, EmailStr
+from datetime import date, datetime, time, timezone
+from typing import Annotated, Any, Generic, List, Literal, Optional, TypeVar, Union
+from pydantic import AfterValidator, BaseModel, EmailStr, WithJsonSchema
+
+ItemT = TypeVar("ItemT")
+
+# Email address in a response. It was validated as an EmailStr when it was stored, so it isn't
+# parsed again on the way out (that dominated the cost of serializing long lists); the
+# OpenAPI schema still documents it as an email.
+StoredEmail = Annotated[str, WithJsonSchema({"type": "string", "format": "email"})]
+
+# A date and time in a request, or a date alone (at time_of_day); without a time zone it is UTC.
+def _utc_datetime(value, time_of_day):
+    if not isinstance(value, datetime):
+        value = datetime.combine(value, time_of_day)
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+# A point in time, e.g. a filter bound; a date alone means the start of that day.
+UTCDatetime = Annotated[Union[datetime, date], AfterValidator(lambda value: _utc_datetime(value, time.min))]
+
+# A deadline; a date alone means the end of that day.
+Deadline = Annotated[Union[datetime, date], AfterValidator(lambda value: _utc_datetime(value, time.max))]
+
+##########################################################📄 PAGINATION SCHEMAS
+# 📄Envelope for keyset-paginated collections; pass next_cursor back as ?cursor= to get the next page
+class Page(BaseModel, Generic[ItemT]):
+    items: List[ItemT]
+    next_cursor: Optional[str] = None
+
 
 ##########################################################👤 USERS SCHEMAS
 class UserBase(BaseModel):
@@ -15,7 +41,7 @@ class UserCreate(UserBase):
 class UserResponseData(BaseModel):
     user_id: int
     username: str
-    email: EmailStr
+    email: StoredEmail
     role: str
     created_at: datetime
 
@@ -23,10 +49,21 @@ class UserResponseData(BaseModel):
         orm_mode = True
 
 
+##########################################################👤 BULK USER SCHEMAS
+# 👤A roster row that wasn't created (rows are numbered from 1, not counting a CSV header)
+class BulkUserError(BaseModel):
+    row: int
+    detail: str
+
+class BulkUserResponseData(BaseModel):
+    created: int
+    errors: List[BulkUserError]
+
+
 ##########################################################👤👤 UserResponseData for LECTURER SCHEMAS
 class LecturerResponseData(BaseModel):
     username: str
-    email: EmailStr
+    email: StoredEmail
 
     class Config:
         orm_mode = True
@@ -39,8 +76,8 @@ class CourseBase(BaseModel):
     course_instructor: str
     course_capacity: int
     course_location: str
-    start_date: str
-    end_date: str
+    start_date: date
+    end_date: date
 
 class CourseCreate(CourseBase):
     pass
@@ -49,13 +86,19 @@ class CourseUpdate(BaseModel):
     course_name: Optional[str] = None
     course_description: Optional[str] = None
     course_instructor: Optional[str] = None
-    course_capacity: Optional[str] = None
+    course_capacity: Optional[int] = None
     course_location: Optional[str] = None
-    start_date: Optional[str] = None
-    end_date: Optional[str] = None
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
 
 class CourseResponseData(CourseBase):
+    # Dates are null for courses whose legacy free-text dates couldn't be converted
+    start_date: Optional[date]
+    end_date: Optional[date]
     course_id: int
+    seats_taken: int
+    lesson_count: int
+    assignment_count: int
     created_at: datetime
     lecturer_info: LecturerResponseData
 
@@ -66,7 +109,7 @@ class CourseResponseData(CourseBase):
 ##########################################################🔵 ENROLLMENT ResponseData for LECTURER SCHEMAS
 class EnrollStudentResponseData(BaseModel):
     username: str
-    email: EmailStr
+    email: StoredEmail
 
     class Config:
         orm_mode = True
@@ -77,8 +120,8 @@ class EnrollCourseResponseData(BaseModel):
     course_instructor: str
     course_capacity: int
     course_location: str
-    start_date: str
-    end_date: str
+    start_date: Optional[date]
+    end_date: Optional[date]
     lecturer_info: LecturerResponseData
 
     class Config:
@@ -87,8 +130,8 @@ class EnrollCourseResponseData(BaseModel):
 class EnrolledResponseData(BaseModel):
     course_name: str
     course_instructor: str
-    start_date: str
-    end_date: str
+    start_date: Optional[date]
+    end_date: Optional[date]
 
     class Config:
         orm_mode = True
@@ -111,6 +154,19 @@ class StudentEnrolledCourseResponseData(BaseModel):
     class Config:
         orm_mode = True
 
+# 🔵Students to enroll in a course, each given by username or email
+class RosterEnrollmentRequest(BaseModel):
+    students: List[str]
+
+# 🔵Outcome of a roster import; the lists echo the roster entries that weren't enrolled
+class RosterEnrollmentResponseData(BaseModel):
+    course_id: int
+    enrolled: int
+    already_enrolled: List[str]
+    not_found: List[str]
+    over_capacity: List[str]
+    seats_taken: int
+
 
 ##########################################################⚛️ CourseInfoResponseData for LESSON SCHEMAS
 class CourseInfoResponseData(BaseModel):
@@ -152,7 +208,7 @@ class AssignmentBase(BaseModel):
     assignment_questions: List[str]
     assignment_instruction: str
     max_score: int
-    due_date: str
+    due_date: Deadline
 
 class AssignmentCreate(AssignmentBase):
     pass
@@ -162,7 +218,7 @@ class AssignmentUpdate(BaseModel):
     assignment_description: Optional[str] = None
     assignment_questions: Optional[List[str]] = None
     assignment_instruction: Optional[str] = None
-    due_date: Optional[str] = None
+    due_date: Optional[Deadline] = None
     max_score: Optional[int] = None
 
 class AssignmentResponseData(BaseModel):
@@ -172,7 +228,7 @@ class AssignmentResponseData(BaseModel):
     assignment_questions: List[str]
     assignment_instruction: str
     max_score: int
-    due_date: str
+    due_date: Optional[datetime]  # null for a legacy free-text date that couldn't be converted
     course_info: CourseInfoResponseData
     created_at: datetime
 
@@ -180,14 +236,147 @@ class AssignmentResponseData(BaseModel):
         orm_mode = True
 
         
+################################🔎 SEARCH SCHEMAS
+# 🔎What a search can return
+SearchType = Literal["course", "lesson", "assignment"]
+
+# 🔎A full-text search hit: the matching row, its course and an excerpt with the matched words in <b></b>
+class SearchResultData(BaseModel):
+    type: SearchType
+    id: int
+    course_id: int
+    title: str
+    snippet: str
+    rank: float
+
+# 🔎A search-as-you-type suggestion: a row whose title starts with, or has a word starting with, the text typed
+class SearchSuggestionData(BaseModel):
+    type: SearchType
+    id: int
+    course_id: int
+    title: str
+
+
+################################🏠 DASHBOARD SCHEMAS
+# 🏠One of the latest lessons of a course (its content is at GET /courses/{course_id}/lessons/{lesson_id})
+class DashboardLessonData(BaseModel):
+    lesson_id: int
+    lesson_title: str
+    created_at: datetime
+
+# 🏠An assignment of a course that isn't due yet
+class DashboardAssignmentData(BaseModel):
+    assignment_id: int
+    assignment_title: str
+    max_score: int
+    due_date: datetime
+
+# 🏠A course the student is enrolled in, with its latest lessons (newest first) and upcoming assignments (soonest first)
+class DashboardCourseData(BaseModel):
+    enrollment_id: int
+    course_id: int
+    course_name: str
+    course_instructor: str
+    course_location: str
+    start_date: Optional[date]
+    end_date: Optional[date]
+    latest_lessons: List[DashboardLessonData]
+    upcoming_assignments: List[DashboardAssignmentData]
+
+
 ################################📜 TOKEN SCHEMAS
 # 📜Schemas for authentication tokens
 
 # 📜Represents an authentication token
 class Token(BaseModel):
     access_token: str
+    refresh_token: str
     token_type: str
 
+# 📜Request body for exchanging a refresh token for a new token pair
+class RefreshTokenRequest(BaseModel):
+    refresh_token: str
+
 # 📜Represents token data for a user
 class TokenData(BaseModel):
-    username: str | None = None
\ No newline at end of file
+    username: str | None = None
+    exp: int | None = None
+    jti: str | None = None
+    sid: str | None = None
+
+# 📜The authenticated user as seen by the routers; small enough to cache per token
+class Principal(BaseModel):
+    user_id: int
+    username: str
+    role: str
+
+    class Config:
+        from_attributes = True
+        frozen = True
+
+################################⏳ JOB SCHEMAS
+# ⏳A background job to submit; params depend on the kind (see the schemas below)
+class JobCreate(BaseModel):
+    kind: Literal["provision_users", "enroll_roster", "delete_course", "reconcile_course_stats"]
+    params: dict[str, Any]
+
+# ⏳provision_users (admin): same rows as POST /users/bulk
+class ProvisionUsersJobParams(BaseModel):
+    users: List[dict[str, Any]]
+
+# ⏳enroll_roster (course lecturer or admin): same as POST /courses/{course_id}/roster
+class EnrollRosterJobParams(BaseModel):
+    course_id: int
+    students: List[str]
+
+# ⏳delete_course (course lecturer or admin): deletes the course with its enrollments, lessons and assignments
+class DeleteCourseJobParams(BaseModel):
+    course_id: int
+
+# ⏳reconcile_course_stats (admin): recounts every course's enrollments, lessons and assignments,
+# repairing the counters that drifted unless repair is false
+class ReconcileCourseStatsJobParams(BaseModel):
+    repair: bool = True
+
+# ⏳Job status, for polling; the outcome is at /jobs/{job_id}/result once it succeeded
+class JobResponseData(BaseModel):
+    job_id: int
+    kind: str
+    status: str
+    progress: int
+    total: Optional[int]
+    error: Optional[str]
+    attempts: int
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
+
+    class Config:
+        from_attributes = True
+
+################################🛠️ ADMIN SCHEMAS
+# 🛠️Connection pool and threadpool usage, for sizing workers against max_connections
+class PoolStatsResponseData(BaseModel):
+    driver: str
+    pool_size: int
+    max_overflow: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    checkouts: int
+    timeouts: int
+    avg_wait_ms: float
+    max_wait_ms: float
+    threadpool_limit: int
+    threadpool_borrowed: int
+
+# 🛠️Size and effectiveness of a cache (fields a shared backend can't report are null)
+class CacheStatsResponseData(BaseModel):
+    name: str
+    entries: int | None
+    max_entries: int | None
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int | None
+    memory_bytes: int | None
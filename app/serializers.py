@@ -0,0 +1,28 @@
+from fastapi import Response, status
+from pydantic import TypeAdapter
+
+# Prebuilt TypeAdapters for the response schemas, so a route can validate and dump its data
+# to JSON bytes in one pass through pydantic-core, instead of FastAPI validating the
+# return value and then encoding the resulting dict again.
+_adapters = {}
+
+
+# The TypeAdapter for a response schema (e.g. schemas.Page[schemas.CourseResponseData]), built once.
+def adapter(response_model):
+    type_adapter = _adapters.get(response_model)
+    if type_adapter is None:
+        type_adapter = _adapters[response_model] = TypeAdapter(response_model)
+    return type_adapter
+
+
+# Serialize data (dicts from a projection, or ORM objects) with response_model to JSON bytes.
+def dump_json(response_model, data):
+    type_adapter = adapter(response_model)
+    return type_adapter.dump_json(type_adapter.validate_python(data, from_attributes=True))
+
+
+# A ready-to-send JSON response serialized with response_model.
+# Routes returning it should still declare response_model=..., which documents the schema.
+def json_response(response_model, data, status_code=status.HTTP_200_OK, headers=None):
+    return Response(content=dump_json(response_model, data), status_code=status_code,
+                    media_type="application/json", headers=headers)
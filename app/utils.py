@@ -1,10 +1,140 @@
+import asyncio
+import base64
+import hashlib
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from fastapi import HTTPException, status
 from passlib.context import CryptContext
+from .config import app_settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=app_settings.BCRYPT_ROUNDS)
 
 def get_password_hash(password):
     return pwd_context.hash(password)
 
 
 def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
\ No newline at end of file
+    return pwd_context.verify(plain_password, hashed_password)
+
+
+# Verify a password and, if the stored hash uses outdated parameters (e.g. fewer bcrypt rounds
+# than BCRYPT_ROUNDS), also return a fresh hash to store. Returns (valid, new_hash or None).
+def verify_and_update_password(plain_password, hashed_password):
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# bcrypt is deliberately slow CPU work, so it runs in a dedicated process pool instead of on
+# request threads. At most PASSWORD_HASH_MAX_PENDING calls may be queued or running per worker;
+# beyond that callers get a 429 rather than piling up behind a login storm.
+_password_pool = None
+_pending_password_jobs = 0
+
+
+async def _run_in_password_pool(func, *args):
+    global _password_pool, _pending_password_jobs
+
+    if _pending_password_jobs >= app_settings.PASSWORD_HASH_MAX_PENDING:
+        raise HTTPException(status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                            detail="Too many password operations in progress, please retry shortly",
+                            headers={"Retry-After": "1"})
+
+    # Start the pool on first use; spawn avoids forking a process that is running threads
+    if _password_pool is None:
+        _password_pool = ProcessPoolExecutor(max_workers=app_settings.PASSWORD_HASH_WORKERS,
+                                             mp_context=multiprocessing.get_context("spawn"))
+
+    _pending_password_jobs += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_password_pool, func, *args)
+    finally:
+        _pending_password_jobs -= 1
+
+
+async def hash_password_async(password):
+    return await _run_in_password_pool(get_password_hash, password)
+
+
+async def verify_and_update_password_async(plain_password, hashed_password):
+    return await _run_in_password_pool(verify_and_update_password, plain_password, hashed_password)
+
+
+# Hash a batch of passwords at the given cost (runs in a bulk hashing process).
+def _hash_password_batch(passwords, rounds):
+    context = pwd_context.copy(bcrypt__rounds=rounds)
+    return [context.hash(password) for password in passwords]
+
+
+# Bulk hashing runs in one more pool of BULK_HASH_WORKERS processes, started on first use and shared
+# by every import, so concurrent imports queue for the same processes instead of each starting its own.
+# It is separate from the login pool, so a large roster doesn't make logins queue or get 429s.
+_bulk_password_pool = None
+
+
+# Hash many passwords at BULK_BCRYPT_ROUNDS (BCRYPT_ROUNDS unless set), spread over the bulk pool.
+# Passwords are sent in batches to keep the inter-process traffic small. Returns hashes in order.
+async def hash_passwords_bulk(passwords):
+    global _bulk_password_pool
+
+    if not passwords:
+        return []
+
+    workers = app_settings.BULK_HASH_WORKERS or os.cpu_count()
+    if _bulk_password_pool is None:
+        _bulk_password_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+
+    rounds = app_settings.BULK_BCRYPT_ROUNDS or app_settings.BCRYPT_ROUNDS
+    batch_size = max(1, -(-len(passwords) // (workers * 4)))
+    loop = asyncio.get_running_loop()
+    batches = await asyncio.gather(*(
+        loop.run_in_executor(_bulk_password_pool, _hash_password_batch, passwords[start:start + batch_size], rounds)
+        for start in range(0, len(passwords), batch_size)
+    ))
+    return [hashed for batch in batches for hashed in batch]
+
+
+# Stop the password hashing processes (called on application shutdown).
+def shutdown_password_pool():
+    global _password_pool, _bulk_password_pool
+    for pool in (_password_pool, _bulk_password_pool):
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+    _password_pool = _bulk_password_pool = None
+
+
+# SHA-256 hex digest of text with surrounding whitespace removed and inner runs of
+# whitespace collapsed, used to detect duplicate lesson/assignment bodies with an index lookup.
+def content_digest(text):
+    normalized = " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+# Secrets the database must hold for a while (e.g. the passwords of a queued provisioning job) are
+# stored encrypted (Fernet: AES-CBC with an HMAC) under a key derived from SECRET_KEY, so the table,
+# its WAL, replicas and backups only ever see ciphertext.
+_fernet = Fernet(base64.urlsafe_b64encode(HKDF(
+    algorithm=hashes.SHA256(), length=32, salt=None, info=b"classroom stored secrets",
+).derive(app_settings.SECRET_KEY.encode())))
+
+
+# Encrypt any JSON-serializable value to a string
+def encrypt_secret(value):
+    return _fernet.encrypt(json.dumps(value).encode()).decode()
+
+
+# The value encrypt_secret encrypted; raises cryptography.fernet.InvalidToken if SECRET_KEY changed meanwhile
+def decrypt_secret(token):
+    return json.loads(_fernet.decrypt(token.encode()))
+
+
+# SQLSTATE Postgres reports when a statement breaks a unique index
+UNIQUE_VIOLATION = "23505"
+
+
+# Whether a sqlalchemy.exc.IntegrityError was raised by a unique index; both drivers expose the SQLSTATE as pgcode
+def is_unique_violation(error):
+    return getattr(error.orig, "pgcode", None) == UNIQUE_VIOLATION
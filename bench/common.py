@@ -0,0 +1,141 @@
+import asyncio
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+import httpx
+import psutil
+
+# Helpers shared by the benchmarks (python -m bench.<name>, from the repository root).
+# A benchmark uses the database named by the app's settings (.env or the environment) and writes to it,
+# so point DATABASE_NAME at a scratch database migrated to head, never at production. Each run tags the
+# rows it creates with RUN, so runs can be repeated on the same database.
+
+ROOT = Path(__file__).resolve().parent.parent
+
+RUN = uuid.uuid4().hex[:8]
+
+
+# The value below which percent % of values fall (nearest rank)
+def percentile(values, percent):
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(len(ordered) * percent / 100) - 1)]
+
+
+# Median and 99th percentile of latencies given in seconds, in milliseconds
+def latency_summary(latencies):
+    return f"p50 {percentile(latencies, 50) * 1000:8.1f} ms  p99 {percentile(latencies, 99) * 1000:8.1f} ms"
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Run the app in a uvicorn process (one worker), with settings overriding the environment's.
+# Yields its base URL and its psutil.Process, for measuring the CPU it uses. Idle connections are kept
+# longer than uvicorn's default 5s, which could close one just as a queued client reuses it.
+@contextmanager
+def serve(**settings):
+    port = _free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning",
+         "--timeout-keep-alive", "120"],
+        cwd=ROOT, env={**os.environ, **{name: str(value) for name, value in settings.items()}},
+    )
+    url = f"http://127.0.0.1:{port}"
+    try:
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                httpx.get(url + "/")
+                break
+            except httpx.TransportError:
+                if process.poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("The app didn't start")
+                time.sleep(0.2)
+        yield url, psutil.Process(process.pid)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+# CPU seconds (user + system) used so far by a server process and its children (e.g. the bcrypt pool)
+def cpu_seconds(process):
+    total = 0.0
+    for member in [process, *process.children(recursive=True)]:
+        try:
+            times = member.cpu_times()
+        except psutil.NoSuchProcess:
+            continue
+        total += times.user + times.system
+    return total
+
+
+# Send count requests to url from concurrency concurrent clients; request(client, n) sends the n-th one.
+# Returns the latency of each request in seconds, the count of each status code and the elapsed seconds.
+def load(url, concurrency, count, request):
+    async def run():
+        latencies, statuses, numbers = [], Counter(), iter(range(count))
+        limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+        async with httpx.AsyncClient(base_url=url, timeout=120, limits=limits) as client:
+            async def user():
+                for n in numbers:
+                    started = time.perf_counter()
+                    response = await request(client, n)
+                    latencies.append(time.perf_counter() - started)
+                    statuses[response.status_code] += 1
+
+            started = time.perf_counter()
+            await asyncio.gather(*(user() for _ in range(concurrency)))
+            return latencies, statuses, time.perf_counter() - started
+
+    return asyncio.run(run())
+
+
+# Insert count users named <prefix>_<RUN>_<n> straight into the database and return their usernames.
+# password is the stored hash; the default can't be logged in with (tokens come from bearer()).
+def insert_users(prefix, count, role="student", password="!"):
+    from sqlalchemy import insert
+
+    from app import models
+    from app.database import engine
+
+    usernames = [f"{prefix}_{RUN}_{n}" for n in range(count)]
+    with engine.begin() as connection:
+        connection.execute(insert(models.User), [
+            {"username": username, "email": f"{username}@example.com", "password": password, "role": role}
+            for username in usernames
+        ])
+    return usernames
+
+
+# Insert count courses named <prefix>_<RUN>_<n>, taught by lecturer (a username), and return their IDs
+def insert_courses(prefix, lecturer, count, capacity=1_000_000):
+    from sqlalchemy import text
+
+    from app.database import engine
+
+    with engine.begin() as connection:
+        return connection.scalars(text(
+            "INSERT INTO courses (course_name, course_description, course_instructor, course_capacity, "
+            "                     course_location, start_date, end_date, user_role) "
+            "SELECT :prefix || n, 'Benchmark course ' || n, 'Instructor', :capacity, 'Online', "
+            "       DATE '2024-01-01', DATE '2024-06-30', (SELECT user_id FROM users WHERE username = :lecturer) "
+            "FROM generate_series(1, :count) n RETURNING course_id"
+        ), {"prefix": f"{prefix}_{RUN}_", "capacity": capacity, "lecturer": lecturer, "count": count}).all()
+
+
+# Authorization headers for a user, with a freshly minted access token
+def bearer(username):
+    from app import oauth2
+
+    return {"Authorization": f"Bearer {oauth2.create_access_token(data={'username': username})}"}
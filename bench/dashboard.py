@@ -0,0 +1,82 @@
+import os
+import statistics
+import time
+from datetime import datetime, timedelta, timezone
+
+from . import common
+
+# The app's opening screen for a student enrolled in COURSES courses, loaded two ways: the fan-out
+# a client makes without the dashboard (GET /my-courses/, then the lessons and the assignments of every
+# course, 1 + 2N requests) and one GET /me/dashboard. Reports the latency of each and the SQL
+# statements it runs.
+#     python -m bench.dashboard
+# Requests go in-process through TestClient with the response cache off, so both ways run their queries.
+
+COURSES = 20
+LESSONS = 30
+ASSIGNMENTS = 10
+
+# Times each way is loaded, after one to warm up
+ROUNDS = 20
+
+
+def main():
+    os.environ["RESPONSE_CACHE_SIZE"] = "0"
+    os.environ["DATABASE_STATEMENT_COUNT_HEADER"] = "1"
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    lecturer, student = (common.bearer(common.insert_users(f"bench_dashboard_{role}", 1, role=role)[0])
+                         for role in ("lecturer", "student"))
+    now = datetime.now(timezone.utc)
+
+    with TestClient(app) as client:
+        # The courses, lessons and assignments go through the API, which keeps the courses' counters
+        course_ids = []
+        for n in range(COURSES):
+            response = client.post("/courses/", headers=lecturer, json={
+                "course_name": f"bench_dashboard_{common.RUN}_{n}", "course_description": "Benchmark course",
+                "course_instructor": "Instructor", "course_capacity": 50, "course_location": "Online",
+                "start_date": "2024-01-01", "end_date": "2030-06-30"})
+            assert response.status_code == 201, response.text
+            course_id = response.json()["course_id"]
+            course_ids.append(course_id)
+            for lesson in range(LESSONS):
+                assert client.post(f"/courses/{course_id}/lessons", headers=lecturer, json={
+                    "lesson_title": f"Lesson {lesson}", "lesson_content": f"Content {n} {lesson}"}).status_code == 200
+            # A few assignments already past their due date, the rest still to come
+            for assignment in range(ASSIGNMENTS):
+                response = client.post(f"/courses/{course_id}/assignments", headers=lecturer, json={
+                    "assignment_title": f"Assignment {assignment}", "assignment_description": f"Assignment {n} {assignment}",
+                    "assignment_questions": ["Question"], "assignment_instruction": "Instruction", "max_score": 10,
+                    "due_date": (now + timedelta(days=assignment - 4, hours=1)).isoformat()})
+                assert response.status_code == 200, response.text
+            assert client.post(f"/courses/{course_id}/enroll", headers=student).status_code == 200
+
+        # Each way returns its responses, so their statements can be counted
+        def fan_out():
+            responses = [client.get("/my-courses/", headers=student)]
+            for course_id in course_ids:
+                responses.append(client.get(f"/courses/{course_id}/lessons", headers=student))
+                responses.append(client.get(f"/courses/{course_id}/assignments", headers=student))
+            return responses
+
+        def dashboard():
+            return [client.get("/me/dashboard", headers=student)]
+
+        for name, load in ((f"fan-out ({1 + 2 * COURSES} requests)", fan_out), ("GET /me/dashboard", dashboard)):
+            responses = load()
+            assert all(response.status_code == 200 for response in responses)
+            statements = sum(int(response.headers["X-DB-Statement-Count"]) for response in responses)
+            latencies = []
+            for _ in range(ROUNDS):
+                started = time.perf_counter()
+                load()
+                latencies.append(time.perf_counter() - started)
+            print(f"{name:24} median {statistics.median(latencies) * 1000:7.1f} ms  "
+                  f"p90 {common.percentile(latencies, 90) * 1000:7.1f} ms  {statements} statements")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import asyncio
+import time
+from threading import Thread
+
+import httpx
+
+from . import common
+
+# A login storm: many users logging in at once (the start of a class), each login a bcrypt verify at
+# BCRYPT_ROUNDS run on the password hashing pool. Reports login throughput and latency, the logins
+# turned away with 429 once PASSWORD_HASH_MAX_PENDING are queued, and the latency of a cheap request
+# (GET /) sent meanwhile, which stays low as long as hashing keeps off the event loop.
+#     python -m bench.login_storm
+# Run it with the app's production BCRYPT_ROUNDS and PASSWORD_HASH_WORKERS (from .env or the environment).
+
+# Logins kept in flight, and logins sent
+CONCURRENCY = 100
+LOGINS = 1000
+
+# Seconds between two requests of the cheap probe
+PROBE_INTERVAL = 0.05
+
+
+def main():
+    from app import utils
+
+    # Every user gets the same password, hashed once (a verify costs the same whatever the password)
+    usernames = common.insert_users("bench_login", LOGINS, password=utils.get_password_hash("password"))
+
+    async def login(client, n):
+        return await client.post("/login/", data={"username": f"{usernames[n]}@example.com", "password": "password"})
+
+    with common.serve() as (url, _):
+        # Probe the event loop from a thread of its own while the storm runs
+        probe_latencies, storm_over = [], False
+
+        async def probe():
+            async with httpx.AsyncClient(base_url=url) as client:
+                while not storm_over:
+                    started = time.perf_counter()
+                    await client.get("/")
+                    probe_latencies.append(time.perf_counter() - started)
+                    await asyncio.sleep(PROBE_INTERVAL)
+
+        prober = Thread(target=asyncio.run, args=(probe(),))
+        prober.start()
+        try:
+            latencies, statuses, elapsed = common.load(url, CONCURRENCY, LOGINS, login)
+        finally:
+            storm_over = True
+            prober.join()
+
+    print(f"logins: {statuses[200] / elapsed:.1f}/s succeeded over {elapsed:.1f} s, statuses {dict(statuses)}")
+    print(f"login latency: {common.latency_summary(latencies)}")
+    print(f"GET / meanwhile: {common.latency_summary(probe_latencies)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+from . import common
+
+# Server CPU per active user-hour when clients keep their session alive with refresh tokens
+# (POST /login/refresh, a SHA-256 lookup) rather than by logging in again (POST /login/, a bcrypt
+# verify at BCRYPT_ROUNDS), once per ACCESS_TOKEN_EXPIRE_MINUTES.
+#     python -m bench.refresh_vs_login
+# CPU is that of the server process and its children (the password hashing pool), so the load
+# generator doesn't count. Run it with the app's production BCRYPT_ROUNDS.
+
+# Logins and refreshes measured, after a few to warm up
+OPERATIONS = 100
+WARMUP = 5
+
+
+def main():
+    from app import utils
+    from app.config import app_settings
+
+    email = f"{common.insert_users('bench_refresh', 1, password=utils.get_password_hash('password'))[0]}@example.com"
+    tokens = {}
+
+    async def login(client, n):
+        response = await client.post("/login/", data={"username": email, "password": "password"})
+        tokens.update(response.json())
+        return response
+
+    # Refresh tokens are single use, so each refresh spends the one the last call returned
+    async def refresh(client, n):
+        response = await client.post("/login/refresh", json={"refresh_token": tokens["refresh_token"]})
+        tokens.update(response.json())
+        return response
+
+    renewals_per_hour = 60 / app_settings.ACCESS_TOKEN_EXPIRE_MINUTES
+    with common.serve() as (url, server):
+        for name, request in (("login", login), ("refresh", refresh)):
+            common.load(url, 1, WARMUP, request)
+            cpu = common.cpu_seconds(server)
+            latencies, statuses, _ = common.load(url, 1, OPERATIONS, request)
+            cpu_each = (common.cpu_seconds(server) - cpu) / OPERATIONS
+            assert statuses == {200: OPERATIONS}, statuses
+            print(f"{name:8} {cpu_each * 1000:7.2f} ms CPU each, {cpu_each * renewals_per_hour * 1000:8.2f} ms CPU "
+                  f"per active user-hour ({renewals_per_hour:g} per hour)  {common.latency_summary(latencies)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+import csv
+import hashlib
+import io
+import os
+import random
+import statistics
+import sys
+import time
+
+from . import common
+
+# Ranked search (GET /search) and search-as-you-type (GET /search/suggest) over a synthetic corpus:
+# LESSONS lessons whose titles and bodies are drawn from a Zipf-distributed vocabulary, so queries
+# range from terms found in nearly every lesson down to rare ones. A few real words head the vocabulary.
+#     python -m bench.search --seed     (once; about 2 GB and a few minutes for 1M lessons)
+#     python -m bench.search
+# Latencies are medians of REPEATS requests sent in-process through TestClient with the response cache
+# off, so each one runs its queries. An unindexed ILIKE scan, what filtering the whole catalog costs
+# without the indexes, is timed for comparison.
+
+# Size and shape of the corpus; the same SEED always builds the same corpus
+LESSONS = 1_000_000
+COURSES = 1000
+VOCABULARY = 20_000
+TITLE_WORDS = 4
+BODY_WORDS = 60
+SEED = 21
+COMMON_WORDS = ["telescope", "galaxy", "photosynthesis", "algebra", "democracy",
+                "molecule", "renaissance", "volcano", "algorithm", "symphony"]
+
+# Lessons sent to the database per COPY
+COPY_ROWS = 50_000
+
+REPEATS = 7
+
+
+# The n-th vocabulary word (n from 1): 4 to 8 letters derived from its number
+def word(n):
+    return hashlib.md5(str(n).encode()).hexdigest()[:4 + n % 5].translate(str.maketrans("0123456789", "ghijklmnop"))
+
+
+def seed():
+    from sqlalchemy import select, text
+
+    from app import models, utils
+    from app.database import engine
+
+    vocabulary = COMMON_WORDS + [word(n) for n in range(len(COMMON_WORDS) + 1, VOCABULARY + 1)]
+    weights = [1 / (rank + 1) ** 1.1 for rank in range(VOCABULARY)]
+    choose = random.Random(SEED).choices
+
+    lecturer = common.insert_users("bench_search", 1, role="lecturer")[0]
+    courses = common.insert_courses("bench_search", lecturer, COURSES)
+    with engine.connect() as connection:
+        lecturer_id = connection.scalar(select(models.User.user_id).where(models.User.username == lecturer))
+
+    # COPY through the driver's own connection, far faster than INSERTs for a corpus this size
+    raw = engine.raw_connection()
+    try:
+        with raw.cursor() as cursor:
+            for start in range(0, LESSONS, COPY_ROWS):
+                rows = io.StringIO()
+                out = csv.writer(rows)
+                for n in range(start, min(start + COPY_ROWS, LESSONS)):
+                    body = " ".join(choose(vocabulary, weights, k=BODY_WORDS))
+                    title = " ".join(choose(vocabulary, weights, k=TITLE_WORDS)) + f" {n}"
+                    out.writerow((title, body, utils.content_digest(body), lecturer_id, courses[n % COURSES]))
+                rows.seek(0)
+                cursor.copy_expert("COPY lessons (lesson_title, lesson_content, lesson_content_hash, user_fkey, course_fkey) "
+                                   "FROM STDIN WITH (FORMAT csv)", rows)
+                print(f"{min(start + COPY_ROWS, LESSONS):,} lessons")
+            # Keep the courses' lesson counters right, as the lesson routes would
+            cursor.execute("UPDATE courses c SET lesson_count = (SELECT count(*) FROM lessons l WHERE l.course_fkey = c.course_id) "
+                           "WHERE c.course_id = ANY(%s)", (list(courses),))
+        raw.commit()
+    finally:
+        raw.close()
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+        connection.execute(text("VACUUM ANALYZE lessons"))
+
+
+# The last response and the median latency in milliseconds of REPEATS requests, after one to warm up
+def timed(client, path, params):
+    client.get(path, params=params)
+    latencies = []
+    for _ in range(REPEATS):
+        started = time.perf_counter()
+        response = client.get(path, params=params)
+        latencies.append(time.perf_counter() - started)
+    assert response.status_code == 200, response.text
+    return response, statistics.median(latencies) * 1000
+
+
+def main():
+    os.environ["RESPONSE_CACHE_SIZE"] = "0"
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func, select, text
+
+    from app import models
+    from app.database import engine
+    from app.main import app
+
+    common_word, mid, rare = COMMON_WORDS[0], word(3000), word(19000)
+    with engine.connect() as connection:
+        print(f"{connection.scalar(select(func.count()).select_from(models.Lesson)):,} lessons")
+
+        with TestClient(app) as client:
+            for q in [common_word, f"{COMMON_WORDS[1]} {COMMON_WORDS[7]}", f'"{common_word} {COMMON_WORDS[1]}"',
+                      mid, rare, f"{common_word} -{COMMON_WORDS[1]}", "nosuchword"]:
+                matches = connection.scalar(select(func.count()).where(
+                    models.Lesson.search_vector.op("@@")(func.websearch_to_tsquery("english", q))))
+                first, first_ms = timed(client, "/search/", {"q": q, "type": "lesson", "limit": 20})
+                cursor = first.json()["next_cursor"]
+                second_ms = timed(client, "/search/", {"q": q, "type": "lesson", "limit": 20, "cursor": cursor})[1] if cursor else 0
+                print(f"search {q!r:26} {matches:9,} matches  page 1 {first_ms:7.1f} ms  page 2 {second_ms:7.1f} ms")
+
+            for q in [common_word[:3], common_word[:6], mid[:3], rare[:4], rare, "zzq"]:
+                response, ms = timed(client, "/search/suggest", {"q": q})
+                print(f"suggest {q!r:12} {len(response.json()):3} titles {ms:7.1f} ms")
+
+        started = time.perf_counter()
+        matches = connection.scalar(text("SELECT count(*) FROM lessons WHERE lesson_content ILIKE :pattern"),
+                                    {"pattern": f"%{rare}%"})
+        print(f"unindexed ILIKE scan for {rare!r}: {matches:,} matches, {(time.perf_counter() - started) * 1000:.0f} ms")
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] not in ([], ["--seed"]):
+        sys.exit("usage: python -m bench.search [--seed]")
+    if sys.argv[1:] == ["--seed"]:
+        seed()
+    main()
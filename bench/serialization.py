@@ -0,0 +1,54 @@
+import os
+import statistics
+import time
+
+from . import common
+
+# Process CPU to build one GET /courses response, from the query to the serialized JSON, for a page
+# far above the API's limit (ROWS courses, as a full catalog download) and for the largest page allowed.
+#     python -m bench.serialization
+# The response cache is off, so every response is built, and the app runs in-process so its CPU
+# (threadpool included) is this process's. Courses are added first if the database has fewer than ROWS.
+
+ROWS = 10_000
+
+# Responses measured for ROWS courses and for the largest page, after a few to warm up
+RESPONSES = 15
+PAGE_RESPONSES = 200
+WARMUP = 3
+
+
+def main():
+    os.environ["RESPONSE_CACHE_SIZE"] = "0"
+    from fastapi.testclient import TestClient
+    from sqlalchemy import func, select
+
+    from app import models
+    from app.database import engine
+    from app.main import app
+    from app.pagination import MAX_PAGE_SIZE, PageParams
+
+    with engine.connect() as connection:
+        missing = ROWS - connection.scalar(select(func.count()).select_from(models.Course))
+    if missing > 0:
+        common.insert_courses("bench_serialization", common.insert_users("bench_lecturer", 1, role="lecturer")[0], missing)
+
+    with TestClient(app) as client:
+        for limit, responses in ((ROWS, RESPONSES), (MAX_PAGE_SIZE, PAGE_RESPONSES)):
+            # ROWS is past the API's page limit, so the page size is set on the dependency directly
+            app.dependency_overrides[PageParams] = lambda: PageParams(cursor=None, limit=limit)
+            for _ in range(WARMUP):
+                client.get("/courses/")
+            cpu = []
+            for _ in range(responses):
+                started = time.process_time()
+                response = client.get("/courses/")
+                cpu.append(time.process_time() - started)
+            assert len(response.json()["items"]) == limit
+            print(f"{limit:6} courses: median CPU {statistics.median(cpu) * 1000:7.1f} ms per response, "
+                  f"{len(response.content):,} bytes")
+        app.dependency_overrides.clear()
+
+
+if __name__ == "__main__":
+    main()
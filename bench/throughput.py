@@ -0,0 +1,45 @@
+from . import common
+
+# Requests per second and latency of a catalog read (GET /courses) and an enrollment (POST
+# /courses/{course_id}/enroll) on both database driver paths: asyncpg with AsyncSession
+# (DATABASE_ASYNC=true) and psycopg2 run in the threadpool (DATABASE_ASYNC=false).
+#     python -m bench.throughput
+# The app runs in one uvicorn process, with the response cache off so every read reaches the database.
+# The load comes from the same machine, so leave it a core or two.
+
+# Requests kept in flight, and requests sent per endpoint and driver
+CONCURRENCY = 64
+REQUESTS = 5000
+
+# Enrollments are spread over this many courses (each student enrolls in all of them), so they
+# measure the driver rather than contention on one course row
+ENROLL_COURSES = 50
+
+
+def main():
+    lecturer = common.insert_users("bench_lecturer", 1, role="lecturer")[0]
+    print(f"{'driver':10} {'endpoint':36} {'req/s':>8}")
+    for driver, database_async in (("asyncpg", True), ("psycopg2", False)):
+        courses = common.insert_courses(f"bench_{driver}", lecturer, ENROLL_COURSES)
+        students = [common.bearer(username) for username in
+                    common.insert_users(f"bench_{driver}", -(-REQUESTS // ENROLL_COURSES))]
+
+        async def read(client, n):
+            return await client.get("/courses/")
+
+        async def enroll(client, n):
+            student, course_id = students[n // ENROLL_COURSES], courses[n % ENROLL_COURSES]
+            return await client.post(f"/courses/{course_id}/enroll", headers=student)
+
+        with common.serve(DATABASE_ASYNC=database_async, RESPONSE_CACHE_SIZE=0) as (url, _):
+            for endpoint, request in (("GET /courses", read), ("POST /courses/{course_id}/enroll", enroll)):
+                # Warm up the pool and the code paths first
+                common.load(url, CONCURRENCY, CONCURRENCY, read)
+                latencies, statuses, elapsed = common.load(url, CONCURRENCY, REQUESTS, request)
+                errors = {status: count for status, count in statuses.items() if status >= 400}
+                print(f"{driver:10} {endpoint:36} {REQUESTS / elapsed:8.0f}  {common.latency_summary(latencies)}"
+                      + (f"  errors {errors}" if errors else ""))
+
+
+if __name__ == "__main__":
+    main()
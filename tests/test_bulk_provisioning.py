@@ -0,0 +1,30 @@
+from sqlalchemy import select
+
+from conftest import unique
+
+# A bulk import hashes at BCRYPT_ROUNDS unless BULK_BCRYPT_ROUNDS opts in to a lower cost, and every
+# import shares the same process pool.
+
+
+def roster(size):
+    return [{"username": username, "password": "password", "email": f"{username}@example.com", "role": "student"}
+            for username in (unique("bulk") for _ in range(size))]
+
+
+def test_bulk_imports_hash_at_bcrypt_rounds_on_a_shared_pool(client, make_user):
+    from app import models, utils
+    from app.config import app_settings
+    from app.database import engine
+
+    admin = make_user("admin")["headers"]
+    users = roster(3)
+
+    assert client.post("/users/bulk", json=users, headers=admin).status_code == 200
+    pool = utils._bulk_password_pool
+    assert client.post("/users/bulk", json=roster(3), headers=admin).status_code == 200
+
+    assert pool is not None and utils._bulk_password_pool is pool
+    with engine.connect() as connection:
+        hashes = connection.scalars(select(models.User.password).where(
+            models.User.username.in_([user["username"] for user in users]))).all()
+    assert [hashed[:7] for hashed in hashes] == [f"$2b${app_settings.BCRYPT_ROUNDS:02d}$"] * 3
@@ -0,0 +1,124 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import httpx
+import pytest
+from sqlalchemy import text
+
+from conftest import ROOT
+
+# Each worker keeps its own response cache, kept coherent by the LISTEN/NOTIFY invalidation bus.
+# Two workers run as separate uvicorn processes on the test database: a write through one must evict
+# the other's cached responses, and while a worker's listener is disconnected its entries must go
+# stale for at most CACHE_INVALIDATION_FALLBACK_TTL seconds.
+FALLBACK_TTL = 2
+
+# How long a worker may take to apply an event from the other one, in seconds
+EVENT_DELAY = 2
+
+WORKER_SETTINGS = {
+    "CACHE_INVALIDATION_FALLBACK_TTL": str(FALLBACK_TTL),
+    # Entries outlive the tests unless evicted, and a lost listener stays lost, so only the bus
+    # and the fallback TTL can make a worker see a change
+    "RESPONSE_CACHE_TTL": "600",
+    "CACHE_INVALIDATION_RETRY_SECONDS": "600",
+}
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Two workers, "a" and "b", each a client for its own uvicorn process. PGAPPNAME names each
+# worker's listener connection in pg_stat_activity.
+@pytest.fixture(scope="module")
+def workers(database):
+    processes, clients = [], {}
+    try:
+        for name in ("a", "b"):
+            port = free_port()
+            processes.append(subprocess.Popen(
+                [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+                cwd=ROOT, env={**os.environ, **WORKER_SETTINGS, "PGAPPNAME": f"cache_test_{name}"},
+            ))
+            clients[name] = httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30)
+        for client in clients.values():
+            deadline = time.monotonic() + 30
+            while True:
+                try:
+                    client.get("/")
+                    break
+                except httpx.TransportError:
+                    assert time.monotonic() < deadline, "worker didn't start"
+                    time.sleep(0.2)
+        yield clients
+    finally:
+        for client in clients.values():
+            client.close()
+        for process in processes:
+            process.terminate()
+            process.wait()
+
+
+# Change a course in the database directly, bypassing the app, so no worker hears about it
+def write_behind_the_app(course_id, description):
+    from app.database import engine
+
+    with engine.begin() as connection:
+        connection.execute(text("UPDATE courses SET course_description = :description WHERE course_id = :course_id"),
+                           {"description": description, "course_id": course_id})
+
+
+def description(worker, course_id):
+    response = worker.get(f"/courses/{course_id}")
+    assert response.status_code == 200, response.text
+    return response.json()["course_description"]
+
+
+# Seconds until worker serves description for the course, failing after timeout
+def time_until(worker, course_id, expected, timeout):
+    started = time.monotonic()
+    while description(worker, course_id) != expected:
+        assert time.monotonic() - started < timeout, f"still stale after {timeout}s"
+        time.sleep(0.05)
+    return time.monotonic() - started
+
+
+def test_a_write_through_one_worker_evicts_the_others_cache(workers, make_user, make_course):
+    lecturer = make_user("lecturer")["headers"]
+    course_id = make_course(lecturer, course_description="v0")["course_id"]
+    assert description(workers["b"], course_id) == "v0"
+
+    # b serves the course from its cache: a change it wasn't told about goes unseen
+    write_behind_the_app(course_id, "unseen")
+    assert description(workers["b"], course_id) == "v0"
+
+    response = workers["a"].put(f"/courses/{course_id}", json={"course_description": "v1"}, headers=lecturer)
+    assert response.status_code == 200, response.text
+
+    time_until(workers["b"], course_id, "v1", EVENT_DELAY)
+
+
+def test_staleness_is_bounded_while_a_listener_is_disconnected(workers, make_user, make_course):
+    from app.database import engine
+
+    course_id = make_course(make_user("lecturer")["headers"], course_description="v0")["course_id"]
+
+    with engine.begin() as connection:
+        terminated = connection.scalar(text(
+            "SELECT count(pg_terminate_backend(pid)) FROM pg_stat_activity "
+            "WHERE application_name = 'cache_test_b' AND query LIKE 'LISTEN%'"
+        ))
+    assert terminated == 1
+    # Let b notice the lost connection (it drops its entries and shortens their lifetime)
+    time.sleep(0.5)
+
+    assert description(workers["b"], course_id) == "v0"
+    write_behind_the_app(course_id, "v1")
+
+    assert time_until(workers["b"], course_id, "v1", FALLBACK_TTL + 3) <= FALLBACK_TTL + 0.5
@@ -0,0 +1,49 @@
+from datetime import date, timedelta
+
+from app import etags
+
+# A list answers 304 only for a page the client really has: a missing course or an empty list is
+# reported as such, even to a client sending the ETag an empty page would have.
+EMPTY_PAGE = {"If-None-Match": etags.make_etag([])}
+
+
+def add_assignment(client, lecturer, course_id):
+    response = client.post(f"/courses/{course_id}/assignments", headers=lecturer, json={
+        "assignment_title": "Assignment", "assignment_description": "Description",
+        "assignment_questions": ["Why?"], "assignment_instruction": "Answer", "max_score": 10,
+        "due_date": str(date.today() + timedelta(days=7)),
+    })
+    assert response.status_code == 200, response.text
+
+
+def test_a_missing_course_has_no_assignments_to_revalidate(client, make_user):
+    student = make_user()["headers"]
+
+    response = client.get("/courses/2147483647/assignments", headers={**student, **EMPTY_PAGE})
+
+    assert response.status_code == 403
+
+
+def test_a_course_without_assignments_is_not_revalidated(client, make_user, make_course):
+    student = make_user()["headers"]
+    course_id = make_course(make_user("lecturer")["headers"])["course_id"]
+
+    response = client.get(f"/courses/{course_id}/assignments", headers={**student, **EMPTY_PAGE})
+
+    assert response.status_code == 404
+
+
+def test_a_missing_course_has_no_lessons_to_revalidate(client):
+    assert client.get("/courses/2147483647/lessons", headers=EMPTY_PAGE).status_code == 404
+
+
+def test_assignments_the_client_has_are_not_modified(client, make_user, make_course):
+    student = make_user()["headers"]
+    lecturer = make_user("lecturer")["headers"]
+    course_id = make_course(lecturer)["course_id"]
+    add_assignment(client, lecturer, course_id)
+
+    etag = client.get(f"/courses/{course_id}/assignments", headers=student).headers["ETag"]
+    response = client.get(f"/courses/{course_id}/assignments", headers={**student, "If-None-Match": etag})
+
+    assert response.status_code == 304
@@ -0,0 +1,77 @@
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from threading import Barrier
+
+from sqlalchemy import func, select
+
+# Enrollments race: a student double-clicks, a client retries, a whole class enrolls the minute a
+# course opens. However many requests arrive at once, a student is enrolled at most once and a
+# course never takes more students than its capacity.
+
+# Requests sent at once by one student, and students sent at a course at once
+PARALLEL_ENROLLS = 300
+STUDENTS = 200
+CAPACITY = 20
+
+# Latency bounds under that contention, in seconds. Requests queue for a pooled connection and for the
+# course row lock; the slowest must still finish well inside DATABASE_POOL_TIMEOUT (30s by default,
+# after which a request would fail), and 99% of them in under half of that.
+MAX_LATENCY = 15
+MAX_P99_LATENCY = 10
+
+
+# Send every request (headers for the enroll route of course_id) at the same moment, each from its
+# own thread; returns the responses and their latencies in seconds
+def enroll_at_once(client, course_id, headers):
+    start = Barrier(len(headers))
+
+    def enroll(student):
+        start.wait()
+        started = time.perf_counter()
+        response = client.post(f"/courses/{course_id}/enroll", headers=student)
+        return response, time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=len(headers)) as pool:
+        results = list(pool.map(enroll, headers))
+    return [response for response, _ in results], sorted(latency for _, latency in results)
+
+
+# Rows in enrollments for the course, and its seats_taken counter
+def enrollment_state(course_id):
+    from app import models
+    from app.database import engine
+
+    with engine.connect() as connection:
+        rows = connection.scalar(select(func.count()).where(models.Enrollment.course_fkey == course_id))
+        seats_taken = connection.scalar(select(models.Course.seats_taken).where(models.Course.course_id == course_id))
+    return rows, seats_taken
+
+
+def test_parallel_enrolls_of_one_student_create_one_enrollment(client, make_user, make_course, make_students):
+    course_id = make_course(make_user("lecturer")["headers"])["course_id"]
+    student = make_students(1)[0]
+
+    responses, _ = enroll_at_once(client, course_id, [student] * PARALLEL_ENROLLS)
+
+    statuses = Counter(response.status_code for response in responses)
+    assert statuses == {200: 1, 403: PARALLEL_ENROLLS - 1}, statuses
+    assert {response.json()["detail"] for response in responses if response.status_code == 403} == {
+        "You've already enrolled in this course."}
+    assert enrollment_state(course_id) == (1, 1)
+
+
+def test_a_crowded_course_is_not_overbooked(client, make_user, make_course, make_students):
+    course_id = make_course(make_user("lecturer")["headers"], course_capacity=CAPACITY)["course_id"]
+    students = make_students(STUDENTS)
+
+    # Every student enrolls twice at once, as after a double click
+    responses, latencies = enroll_at_once(client, course_id, students * 2)
+
+    statuses = Counter(response.status_code for response in responses)
+    assert statuses[200] == CAPACITY, statuses
+    assert set(statuses) <= {200, 403, 409}, statuses
+    assert enrollment_state(course_id) == (CAPACITY, CAPACITY)
+    assert latencies[-1] < MAX_LATENCY, f"slowest enroll took {latencies[-1]:.2f}s"
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    assert p99 < MAX_P99_LATENCY, f"p99 enroll latency {p99:.2f}s"
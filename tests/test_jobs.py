@@ -0,0 +1,66 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import insert, select, update
+
+from conftest import unique
+
+# A provisioning job's roster is only ever stored encrypted, and dropped once the job is over. A running
+# job whose worker died is requeued, or failed once it used up its attempts.
+
+
+def test_a_provisioning_job_stores_its_roster_encrypted(client, make_user):
+    from app import jobs, models
+    from app.database import engine
+
+    username = unique("provisioned")
+    roster = [{"username": username, "password": "plaintext", "email": f"{username}@example.com", "role": "student"}]
+    response = client.post("/jobs/", json={"kind": "provision_users", "params": {"users": roster}},
+                           headers=make_user("admin")["headers"])
+    assert response.status_code == 202, response.text
+    job_id = response.json()["job_id"]
+
+    with engine.begin() as connection:
+        stored = connection.scalar(select(models.Job.params).where(models.Job.job_id == job_id))
+        assert stored["users"] == 1 and "plaintext" not in str(stored)
+        # Claim it as a worker would, leaving other queued jobs alone
+        job = connection.execute(
+            update(models.Job).where(models.Job.job_id == job_id).values(status="running", attempts=1)
+            .returning(models.Job.job_id, models.Job.kind, models.Job.params, models.Job.progress,
+                       models.Job.result, models.Job.attempts)
+        ).first()
+
+    # On the app's event loop, where its database connections live
+    client.portal.call(jobs._execute, job)
+
+    with engine.connect() as connection:
+        finished = connection.execute(select(models.Job).where(models.Job.job_id == job_id)).first()
+        created = connection.scalar(select(models.User.email).where(models.User.username == username))
+    assert (finished.status, finished.params, finished.result["created"]) == ("succeeded", {"users": 1}, 1)
+    assert created == f"{username}@example.com"
+
+
+def test_a_reclaimed_job_that_runs_out_of_attempts_is_failed_and_scrubbed(client, make_user):
+    from app import jobs, models
+    from app.config import app_settings
+    from app.database import engine
+
+    admin = make_user("admin")
+    roster = jobs.KINDS["provision_users"].seal(
+        {"users": [{"username": "reclaimed", "password": "plaintext", "email": "reclaimed@example.com"}]})
+    with engine.begin() as connection:
+        user_id = connection.scalar(select(models.User.user_id).where(models.User.username == admin["username"]))
+        stale = dict(kind="provision_users", params=roster, status="running", user_fkey=user_id,
+                     heartbeat_at=datetime.now(timezone.utc) - timedelta(days=1))
+        exhausted, retried = connection.scalars(insert(models.Job).returning(models.Job.job_id, sort_by_parameter_order=True), [
+            dict(stale, attempts=app_settings.JOB_MAX_ATTEMPTS),
+            dict(stale, attempts=1),
+        ]).all()
+
+    client.portal.call(jobs._reclaim_stale)
+
+    with engine.connect() as connection:
+        rows = {job.job_id: job for job in connection.execute(
+            select(models.Job).where(models.Job.job_id.in_([exhausted, retried])))}
+    assert (rows[exhausted].status, rows[exhausted].params) == ("failed", {"users": 1})
+    assert rows[exhausted].finished_at is not None
+    assert (rows[retried].status, rows[retried].params) == ("queued", roster)
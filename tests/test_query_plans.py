@@ -0,0 +1,279 @@
+import json
+import uuid
+from datetime import date, timedelta
+
+import pytest
+from fastapi.routing import APIRoute
+from sqlalchemy import event, text
+from sqlalchemy.engine.interfaces import ExecuteStyle
+
+# Query plan audit, to catch a missing index before production traffic does. The scenario below calls
+# every route of the API once, each statement the routes send is EXPLAINed (with its actual parameters,
+# before it runs), and the tests fail when a plan reads a large table with a sequential scan, or when a
+# route isn't covered by the scenario.
+# The planner rightly scans small tables, so the test database is first filled with synthetic users,
+# courses, enrollments, lessons and assignments (once; later runs reuse them).
+
+# Tables smaller than this may be read sequentially
+MIN_ROWS = 10_000
+
+# Routes that read a whole table on purpose
+FULL_SCANS = {"GET /admin/exports/{table}"}
+
+# Size of the seed data. Titles end with a random-looking word, so that like real titles they have
+# many distinct words and trigrams, and searching one of them matches a handful of rows.
+SEED_USERS = 20_000
+SEED_LECTURERS = 200
+SEED_COURSES = 20_000
+SEED_ENROLLMENTS_PER_STUDENT = 5
+SEED_LESSONS_PER_COURSE = 5
+SEED_ASSIGNMENTS_PER_COURSE = 3
+
+SEED_STATEMENTS = [
+    """
+    INSERT INTO users (username, email, password, role)
+    SELECT 'plan_audit_user_' || n, 'plan_audit_user_' || n || '@example.com', '!',
+           CASE WHEN n <= :lecturers THEN 'lecturer' ELSE 'student' END
+    FROM generate_series(1, :users) n
+    """,
+    """
+    INSERT INTO courses (course_name, course_description, course_instructor, course_capacity, course_location,
+                         start_date, end_date, user_role)
+    SELECT 'Plan audit course ' || n || ' ' || substr(md5('course/' || n), 1, 10), 'Synthetic course ' || n || ' for the query plan audit', 'Instructor ' || n % 100,
+           1000, 'Room ' || n % 50, DATE '2020-01-01' + n % 2000, DATE '2020-01-01' + n % 2000 + 120, u.user_id
+    FROM generate_series(1, :courses) n
+    JOIN users u ON u.username = 'plan_audit_user_' || (1 + n % :lecturers)
+    """,
+    """
+    INSERT INTO enrollments (student_fkey, course_fkey, enrollment_message)
+    SELECT s.user_id, c.course_id, 'Enrollment successful'
+    FROM (SELECT user_id, row_number() OVER (ORDER BY user_id) AS n FROM users
+          WHERE username LIKE 'plan\\_audit\\_user\\_%' AND role = 'student') s
+    CROSS JOIN generate_series(1, :enrollments_per_student) k
+    JOIN (SELECT course_id, row_number() OVER (ORDER BY course_id) AS n FROM courses
+          WHERE course_name LIKE 'Plan audit course %') c ON c.n = 1 + (s.n * 7 + k * 1009) % :courses
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO lessons (lesson_title, lesson_content, lesson_content_hash, user_fkey, course_fkey)
+    SELECT 'Lesson ' || k || ' ' || substr(md5('lesson/' || c.course_id || '/' || k), 1, 10), 'Synthetic lesson ' || k || ' of course ' || c.course_id, md5(c.course_id || '/' || k),
+           c.user_role, c.course_id
+    FROM courses c CROSS JOIN generate_series(1, :lessons_per_course) k
+    WHERE c.course_name LIKE 'Plan audit course %'
+    """,
+    """
+    INSERT INTO assignments (assignment_title, assignment_description, assignment_description_hash,
+                             assignment_questions, assignment_instruction, due_date, max_score, user_fkey, course_fkey)
+    SELECT 'Assignment ' || k || ' ' || substr(md5('assignment/' || c.course_id || '/' || k), 1, 10), 'Synthetic assignment ' || k || ' of course ' || c.course_id, md5(c.course_id || '/' || k),
+           ARRAY['Question 1', 'Question 2'], 'Answer every question', now() + (k - 1) * interval '1 week', 10,
+           c.user_role, c.course_id
+    FROM courses c CROSS JOIN generate_series(1, :assignments_per_course) k
+    WHERE c.course_name LIKE 'Plan audit course %'
+    """,
+    """
+    UPDATE courses c
+    SET seats_taken = (SELECT count(*) FROM enrollments e WHERE e.course_fkey = c.course_id),
+        lesson_count = :lessons_per_course, assignment_count = :assignments_per_course
+    WHERE c.course_name LIKE 'Plan audit course %'
+    """,
+]
+
+
+# Fill the database with the synthetic data, once, refresh the planner statistics and
+# return the large tables with their estimated row counts
+def seed(engine):
+    with engine.begin() as connection:
+        if not connection.scalar(text("SELECT 1 FROM users WHERE username = 'plan_audit_user_1'")):
+            params = dict(users=SEED_USERS, lecturers=SEED_LECTURERS, courses=SEED_COURSES,
+                          enrollments_per_student=SEED_ENROLLMENTS_PER_STUDENT,
+                          lessons_per_course=SEED_LESSONS_PER_COURSE,
+                          assignments_per_course=SEED_ASSIGNMENTS_PER_COURSE)
+            for statement in SEED_STATEMENTS:
+                connection.execute(text(statement), params)
+        connection.execute(text("ANALYZE"))
+        return dict(connection.execute(text(
+            "SELECT relname, reltuples::bigint FROM pg_class "
+            "WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace AND reltuples >= :min_rows"
+        ), {"min_rows": MIN_ROWS}).all())
+
+
+# Statements sent since the last request, each with its plan (or the error EXPLAIN raised)
+explained = []
+
+
+# EXPLAIN every statement on its own cursor just before it runs, so the plan is made with the
+# same parameters and sees the same transaction. A savepoint keeps a failed EXPLAIN from aborting
+# the transaction.
+def explain_statement(conn, cursor, statement, parameters, context, executemany):
+    if not statement.lstrip().upper().startswith(("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")):
+        return
+    # An executemany runs the statement once per parameter set; explain it with the first one
+    if context is not None and context.execute_style is ExecuteStyle.EXECUTEMANY:
+        parameters = parameters[0]
+    explain = conn.connection.cursor()
+    try:
+        explain.execute("SAVEPOINT plan_audit")
+        try:
+            explain.execute("EXPLAIN (FORMAT JSON) " + statement, parameters)
+            plan = explain.fetchone()[0]
+            explained.append((statement, json.loads(plan) if isinstance(plan, str) else plan))
+        except Exception as error:
+            explain.execute("ROLLBACK TO SAVEPOINT plan_audit")
+            explained.append((statement, error))
+        else:
+            explain.execute("RELEASE SAVEPOINT plan_audit")
+    finally:
+        explain.close()
+
+
+# Tables read by sequential scans anywhere in a plan
+def seq_scans(node):
+    if node.get("Node Type") == "Seq Scan":
+        yield node["Relation Name"]
+    for child in node.get("Plans", ()):
+        yield from seq_scans(child)
+
+
+class Audit:
+    def __init__(self, client, large_tables):
+        self.client = client
+        self.large_tables = large_tables
+        self.covered = set()
+        self.statements = 0
+        self.problems = []
+
+    # Call route (e.g. "GET /courses/{course_id}") at path and check the plans of its statements.
+    # expect is the status code the scenario should get; anything else is reported.
+    def call(self, route, path=None, expect=None, **kwargs):
+        method, template = route.split(" ", 1)
+        explained.clear()
+        response = self.client.request(method, path or template, **kwargs)
+        self.covered.add(route)
+
+        if (response.status_code != expect) if expect is not None else response.status_code >= 400:
+            self.problems.append(f"{route}: answered {response.status_code} {response.text[:200]}")
+        for statement, plan in explained:
+            self.statements += 1
+            if isinstance(plan, Exception):
+                self.problems.append(f"{route}: EXPLAIN failed ({plan})\n    {statement}")
+                continue
+            if route in FULL_SCANS:
+                continue
+            for table in sorted(set(seq_scans(plan[0]["Plan"])) & set(self.large_tables)):
+                self.problems.append(f"{route}: sequential scan of {table} ({self.large_tables[table]:,} rows)\n"
+                                     f"    {' '.join(statement.split())}")
+        return response
+
+
+def login(audit, email):
+    tokens = audit.call("POST /login/", data={"username": email, "password": "plan-audit"}).json()
+    return tokens, {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+# Exercise every route once, as a lecturer running a course and a student taking it, plus an admin.
+# seeded is the ID of a seeded course, whose name's last word is rare enough for an index search.
+def scenario(audit, seeded):
+    run = uuid.uuid4().hex[:8]
+    emails = {}
+    for role in ("admin", "lecturer", "student"):
+        emails[role] = f"plan_audit_{run}_{role}@example.com"
+        audit.call("POST /users/", json={"username": f"plan_audit_{run}_{role}", "password": "plan-audit",
+                                         "email": emails[role], "role": role})
+    _, admin = login(audit, emails["admin"])
+    _, lecturer = login(audit, emails["lecturer"])
+    student_tokens, student = login(audit, emails["student"])
+    student_tokens = audit.call("POST /login/refresh", json={"refresh_token": student_tokens["refresh_token"]}).json()
+    student = {"Authorization": f"Bearer {student_tokens['access_token']}"}
+
+    roster = [{"username": f"plan_audit_{run}_bulk_{n}", "password": "plan-audit",
+               "email": f"plan_audit_{run}_bulk_{n}@example.com", "role": "student"} for n in range(3)]
+    audit.call("POST /users/bulk", json=roster, headers=admin)
+    audit.call("GET /users/")
+
+    # A seeded course, with data around it
+    audit.call("GET /courses/")
+    audit.call("GET /courses/", f"/courses/?active_on={date.today()}")
+    word = audit.call("GET /courses/{course_id}", f"/courses/{seeded}").json()["course_name"].split()[-1]
+    audit.call("GET /courses/{course_id}/lessons", f"/courses/{seeded}/lessons")
+    audit.call("GET /courses/{course_id}/assignments", f"/courses/{seeded}/assignments", headers=student)
+    audit.call("GET /lessons/")
+    audit.call("GET /assignments/", f"/assignments/?due_after={date.today()}&due_before={date.today() + timedelta(days=30)}")
+    audit.call("GET /search/", f"/search/?q={word}")
+    audit.call("GET /search/suggest", f"/search/suggest?q={word[:4]}")
+
+    # The lecturer's course, its lessons and assignments
+    course = {"course_name": f"plan_audit_{run} course", "course_description": "Plan audit", "course_instructor": "Audit",
+              "course_capacity": 10, "course_location": "Online", "start_date": str(date.today()),
+              "end_date": str(date.today() + timedelta(days=90))}
+    course_id = audit.call("POST /courses/", json=course, headers=lecturer).json()["course_id"]
+    audit.call("PUT /courses/{course_id}", f"/courses/{course_id}", json={"course_location": "Room 1"}, headers=lecturer)
+    lesson_id = audit.call("POST /courses/{course_id}/lessons", f"/courses/{course_id}/lessons", headers=lecturer,
+                           json={"lesson_title": "Plan audit", "lesson_content": "Plan audit lesson"}).json()["lesson_id"]
+    lesson = f"/courses/{course_id}/lessons/{lesson_id}"
+    audit.call("GET /courses/{course_id}/lessons/{lesson_id}", lesson)
+    audit.call("PUT /courses/{course_id}/lessons/{lesson_id}", lesson, json={"lesson_title": "Plan audit 2"}, headers=lecturer)
+    assignment_id = audit.call("POST /courses/{course_id}/assignments", f"/courses/{course_id}/assignments", headers=lecturer, json={
+        "assignment_title": "Plan audit", "assignment_description": "Plan audit assignment", "assignment_questions": ["Why?"],
+        "assignment_instruction": "Answer", "max_score": 10, "due_date": str(date.today() + timedelta(days=7)),
+    }).json()["assignment_id"]
+    assignment = f"/courses/{course_id}/assignments/{assignment_id}"
+    audit.call("GET /courses/{course_id}/assignments/{assignment_id}", assignment, headers=student)
+    audit.call("PUT /courses/{course_id}/assignments/{assignment_id}", assignment, json={"max_score": 20}, headers=lecturer)
+
+    # The student's side
+    enrollment_id = audit.call("POST /courses/{course_id}/enroll", f"/courses/{course_id}/enroll",
+                               headers=student).json()["enrollment_id"]
+    audit.call("POST /courses/{course_id}/roster", f"/courses/{course_id}/roster", headers=lecturer,
+               json={"students": [user["username"] for user in roster]})
+    audit.call("GET /my-courses/", headers=student)
+    audit.call("GET /my-courses/{enrollment_id}", f"/my-courses/{enrollment_id}", headers=student)
+    audit.call("GET /me/dashboard", headers=student)
+
+    # Operations
+    audit.call("GET /admin/pool", headers=admin)
+    audit.call("GET /admin/caches", headers=admin)
+    audit.call("GET /admin/exports/{table}", "/admin/exports/courses", headers=admin)
+    job_id = audit.call("POST /jobs/", json={"kind": "enroll_roster", "params": {"course_id": course_id, "students": []}},
+                        headers=lecturer).json()["job_id"]
+    audit.call("GET /jobs/", headers=lecturer)
+    audit.call("GET /jobs/{job_id}", f"/jobs/{job_id}", headers=lecturer)
+    audit.call("GET /jobs/{job_id}/result", f"/jobs/{job_id}/result", expect=409, headers=lecturer)
+    audit.call("GET /")
+
+    # Clean up, through the delete routes
+    audit.call("DELETE /courses/{course_id}/lessons/{lesson_id}", lesson, headers=lecturer)
+    audit.call("DELETE /courses/{course_id}/assignments/{assignment_id}", assignment, headers=lecturer)
+    audit.call("DELETE /my-courses/{enrollment_id}", f"/my-courses/{enrollment_id}", headers=student)
+    audit.call("DELETE /courses/{course_id}", f"/courses/{course_id}", headers=lecturer)
+    audit.call("DELETE /login/", headers=student)
+
+
+# The scenario, run once on the seeded database with every statement explained
+@pytest.fixture(scope="module")
+def audit(client):
+    from app.database import active_engine, engine
+
+    large_tables = seed(engine)
+    assert large_tables, f"no table has {MIN_ROWS:,} rows after seeding"
+    with engine.connect() as connection:
+        seeded = connection.scalar(text("SELECT min(course_id) FROM courses WHERE course_name LIKE 'Plan audit course %'"))
+
+    event.listen(active_engine, "before_cursor_execute", explain_statement)
+    try:
+        audit = Audit(client, large_tables)
+        scenario(audit, seeded)
+    finally:
+        event.remove(active_engine, "before_cursor_execute", explain_statement)
+    return audit
+
+
+def test_no_route_scans_a_large_table(audit):
+    assert audit.statements
+    assert not audit.problems, "\n".join(audit.problems)
+
+
+def test_the_scenario_covers_every_route(audit):
+    from app.main import app
+
+    routes = {f"{method} {route.path}" for route in app.routes if isinstance(route, APIRoute) for method in route.methods}
+    assert sorted(routes - audit.covered) == []
@@ -0,0 +1,61 @@
+import uuid
+from datetime import date, timedelta
+
+import pytest
+
+# A list endpoint must send the same number of SQL statements for one row as for many:
+# a count that grows with the rows is an N+1 (a lazy load or a query per item).
+ROWS = 10
+
+
+def statements(response):
+    assert response.status_code == 200, response.text
+    return int(response.headers["X-DB-Statement-Count"])
+
+
+# Query parameters no earlier request used, so the response cache can't answer
+def fresh(**params):
+    return {**params, "nocache": uuid.uuid4().hex}
+
+
+# ROWS courses with a lesson and an assignment each, so every list below has at least ROWS rows
+@pytest.fixture
+def catalog_rows(client, make_user, make_course):
+    lecturer = make_user("lecturer")["headers"]
+    for n in range(ROWS):
+        course = make_course(lecturer)
+        response = client.post(f"/courses/{course['course_id']}/lessons", headers=lecturer,
+                               json={"lesson_title": f"Lesson {n}", "lesson_content": f"Content {n}"})
+        assert response.status_code == 200, response.text
+        response = client.post(f"/courses/{course['course_id']}/assignments", headers=lecturer, json={
+            "assignment_title": f"Assignment {n}", "assignment_description": f"Description {n}",
+            "assignment_questions": ["Why?"], "assignment_instruction": "Answer", "max_score": 10,
+            "due_date": str(date.today() + timedelta(days=n + 1)),
+        })
+        assert response.status_code == 200, response.text
+
+
+@pytest.mark.parametrize("path", ["/courses/", "/lessons/", "/assignments/"])
+def test_catalog_lists_send_the_same_statements_for_1_and_n_rows(client, catalog_rows, path):
+    one = client.get(path, params=fresh(limit=1))
+    many = client.get(path, params=fresh(limit=ROWS))
+
+    assert len(one.json()["items"]) == 1
+    assert len(many.json()["items"]) == ROWS
+    assert statements(many) == statements(one)
+
+
+def test_my_courses_sends_the_same_statements_for_1_and_n_enrollments(client, make_user, make_course):
+    lecturer = make_user("lecturer")["headers"]
+    one_course, many_courses = make_user()["headers"], make_user()["headers"]
+    for n in range(ROWS):
+        course_id = make_course(lecturer)["course_id"]
+        for student in ([one_course, many_courses] if n == 0 else [many_courses]):
+            assert client.post(f"/courses/{course_id}/enroll", headers=student).status_code == 200
+
+    one = client.get("/my-courses/", params={"limit": ROWS}, headers=one_course)
+    many = client.get("/my-courses/", params={"limit": ROWS}, headers=many_courses)
+
+    assert len(one.json()["items"]) == 1
+    assert len(many.json()["items"]) == ROWS
+    assert statements(many) == statements(one)
@@ -0,0 +1,49 @@
+from datetime import date, timedelta
+
+# Course names, and lesson and assignment titles within a course, are unique. Renaming a row
+# to a name another row already has is refused like a duplicate create, with a 403.
+
+
+def test_renaming_a_course_to_a_taken_name_is_refused(client, make_user, make_course):
+    lecturer = make_user("lecturer")["headers"]
+    taken = make_course(lecturer)["course_name"]
+    course_id = make_course(lecturer)["course_id"]
+
+    response = client.put(f"/courses/{course_id}", json={"course_name": taken}, headers=lecturer)
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == f"{taken} is already added"
+
+
+def test_renaming_a_lesson_to_a_taken_title_is_refused(client, make_user, make_course):
+    lecturer = make_user("lecturer")["headers"]
+    course_id = make_course(lecturer)["course_id"]
+    lesson_ids = [
+        client.post(f"/courses/{course_id}/lessons", headers=lecturer,
+                    json={"lesson_title": f"Lesson {n}", "lesson_content": f"Content {n}"}).json()["lesson_id"]
+        for n in range(2)
+    ]
+
+    response = client.put(f"/courses/{course_id}/lessons/{lesson_ids[1]}", json={"lesson_title": "Lesson 0"}, headers=lecturer)
+
+    assert response.status_code == 403
+    assert client.get(f"/courses/{course_id}/lessons/{lesson_ids[1]}").json()["lesson_title"] == "Lesson 1"
+
+
+def test_renaming_an_assignment_to_a_taken_title_is_refused(client, make_user, make_course):
+    lecturer = make_user("lecturer")["headers"]
+    course_id = make_course(lecturer)["course_id"]
+    assignment_ids = [
+        client.post(f"/courses/{course_id}/assignments", headers=lecturer, json={
+            "assignment_title": f"Assignment {n}", "assignment_description": f"Description {n}",
+            "assignment_questions": ["Why?"], "assignment_instruction": "Answer", "max_score": 10,
+            "due_date": str(date.today() + timedelta(days=7)),
+        }).json()["assignment_id"]
+        for n in range(2)
+    ]
+
+    response = client.put(f"/courses/{course_id}/assignments/{assignment_ids[1]}",
+                          json={"assignment_title": "Assignment 0"}, headers=lecturer)
+
+    assert response.status_code == 403
+    assert response.json()["detail"] == "A Course Assignment with the title 'Assignment 0' already exists"